@@ -1,92 +1,90 @@
 # Agents/Agent_CTA.py
 ## Imports
-import json
-from typing import Any, Dict, List
-from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import tool
+from typing import List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+from App.enrutador_modelos import llm_para
+from App.memoria_sesiones import obtener_memoria_sesiones
+from App.historial import recortar_historial
+from Tools.herramienta_llm import herramienta_llm
+from Tools.indice_local import crear_herramienta_material
+from Agents.esquemas import RespuestaAgente, entregar_respuesta
 
 # =========================================
 # LLM Y MEMORIA
 # =========================================
-llm = ChatOpenAI(temperature=0.35, model="gpt-4o-mini")
-memory = MemorySaver()
+llm = llm_para("agente:Ciencia y Tecnología")
+memory = obtener_memoria_sesiones()  # compartida, un hilo por (curso, sesión)
 
 # =========================================
 # HERRAMIENTAS (TOOLS)
 # =========================================
 
 # 1) Explicación científica → definición o descripción de fenómeno
-@tool
-def explicacion_cientifica(concepto: str) -> str:
+@herramienta_llm()
+def explicacion_cientifica(concepto: str) -> List[BaseMessage]:
     """
     Explica un fenómeno natural, proceso biológico o físico de forma clara, correcta y comprensible.
     No propone experimentos ni análisis, solo explicación teórica.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
     system = SystemMessage(content=(
         "Eres un profesor de Ciencias, Tecnología y Ambiente. "
         "Explica de forma clara, rigurosa y comprensible conceptos científicos o procesos naturales. "
         "No generes ejemplos experimentales aquí."
     ))
-    resp = llm.invoke([system, HumanMessage(content=f"Explica: {concepto}")])
-    return resp.content.strip()
+    return [system, HumanMessage(content=f"Explica: {concepto}")]
 
 
-# 2) Experimento sugerido → híbrido Tavily + LLM
-@tool
-def experimento_sugerido(concepto: str) -> str:
+# 2) Experimento sugerido → híbrido búsqueda (Data/ o Tavily) + LLM
+@herramienta_llm(
+    consulta=lambda concepto: f"Experimento educativo sobre {concepto}",
+    curso="Ciencia y Tecnología", max_results=4,
+)
+def experimento_sugerido(concepto: str, contexto: str) -> List[BaseMessage]:
     """
     Propone un experimento educativo o simulación sencilla para comprobar un fenómeno científico.
-    Usa Tavily para buscar ideas o contextos experimentales y redacta una versión práctica y segura.
+    Busca ideas o contextos experimentales (material del curso o web) y redacta una versión práctica y segura.
     """
-    contexto_text = ""
-    try:
-        tavily = TavilySearchResults(max_results=4)
-        raw_results = tavily.invoke({"query": f"Experimento educativo sobre {concepto}"})
-        if isinstance(raw_results, list):
-            contexto_text = "\n".join([r.get("content", "") for r in raw_results if isinstance(r, dict)])
-        else:
-            contexto_text = str(raw_results)
-    except Exception as e:
-        contexto_text = f"(No se pudo obtener contexto de Tavily: {e})"
-
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.45)
     system = SystemMessage(content=(
         "Eres un profesor de CTA que sugiere experimentos seguros y didácticos para estudiantes de secundaria. "
         "Usa el CONTEXTO si es útil, pero describe solo un experimento breve y realista."
     ))
     human = HumanMessage(content=(
-        f"CONTEXTO web:\n{contexto_text}\n\n"
+        f"CONTEXTO (material del curso o búsqueda web):\n{contexto}\n\n"
         f"Propón un experimento sencillo para comprobar o demostrar: {concepto}"
     ))
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
 
 # 3) Análisis de impacto → reflexión sobre sostenibilidad
-@tool
-def analisis_impacto(tema: str) -> str:
+@herramienta_llm()
+def analisis_impacto(tema: str) -> List[BaseMessage]:
     """
     Analiza los impactos ambientales o tecnológicos de un tema y propone soluciones sostenibles.
     Usa solo el LLM, sin búsqueda externa.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     system = SystemMessage(content=(
         "Eres un especialista en sostenibilidad y medio ambiente. "
         "Analiza de forma objetiva los efectos positivos y negativos del tema, "
         "y plantea una o dos soluciones prácticas sostenibles."
     ))
-    resp = llm.invoke([system, HumanMessage(content=f"Analiza los impactos ambientales o tecnológicos de: {tema}")])
-    return resp.content.strip()
+    return [system, HumanMessage(content=f"Analiza los impactos ambientales o tecnológicos de: {tema}")]
 
 
 # Lista de herramientas
-tools = [explicacion_cientifica, experimento_sugerido, analisis_impacto]
+# Material del curso en Data/ (índice local; Tavily solo si no hay material relevante)
+buscar_material = crear_herramienta_material("Ciencia y Tecnología")
+
+tools = [explicacion_cientifica, experimento_sugerido, analisis_impacto, buscar_material, entregar_respuesta]
+
+# Ruteo directo: intenciones claras → herramienta, sin pasar por el ciclo ReAct
+# (patrones sobre el texto en minúscula y sin tildes; ver App/ruteo_directo.py)
+RUTAS_DIRECTAS = [
+    (r"\b(que es|que son|explica|explicame|define|definicion de|como funciona)\b", explicacion_cientifica, "explicacion_profunda"),
+    (r"\b(experimentos?|simulacion)\b", experimento_sugerido, "parrafo_ejemplo"),
+    (r"\b(impactos?|consecuencias)\b", analisis_impacto, "explicacion_profunda"),
+]
 
 # =========================================
 # PROMPT BASE DEL AGENTE CTA
@@ -98,18 +96,18 @@ Tu tarea es analizar la pregunta del usuario y decidir qué herramienta usar:
 - Si el usuario pide una **explicación o definición** de un concepto o fenómeno, usa **explicacion_cientifica**.
 - Si el usuario pide un **experimento o simulación**, usa **experimento_sugerido**.
 - Si el usuario pide un **análisis de impacto ambiental o tecnológico**, usa **analisis_impacto**.
+- Si necesitas contenido del material del curso (libros o fichas de la institución), usa **buscar_material**.
 
-Responde siempre en formato JSON con los siguientes campos:
-{
-  "explicacion_profunda": "Explicación o análisis del fenómeno o tema",
-  "parrafo_ejemplo": "Ejemplo, experimento o propuesta aplicada (vacío si no aplica)"
-}
+Cuando tengas la información, entrega la respuesta final llamando a **entregar_respuesta** (en parrafo_ejemplo va el ejemplo, experimento o propuesta aplicada; vacío si no aplica).
 """
 
 # =========================================
 # CREACIÓN DEL AGENTE REACT
 # =========================================
-agent = create_react_agent(llm, tools, checkpointer=memory, prompt=prompt)
+agent = create_react_agent(
+    llm, tools, checkpointer=memory, prompt=prompt,
+    pre_model_hook=recortar_historial,  # ventana de historial + resumen de turnos antiguos
+)
 
 # =========================================
 # FUNCIÓN PARA STREAMLIT / ORQUESTADOR
@@ -125,9 +123,6 @@ def get_cta_agent():
         global_llm_with_tools = agent
         print("✅ Agente CTA inicializado correctamente.")
 
-    schema = {
-        "explicacion_profunda": "str",
-        "parrafo_ejemplo": "str"
-    }
+    schema = RespuestaAgente
 
     return global_llm_with_tools, schema
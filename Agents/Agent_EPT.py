@@ -1,86 +1,86 @@
 # Agents/Agent_ept.py
-import json
-from typing import Any, Dict, List
-from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import tool
+from typing import List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+from App.enrutador_modelos import llm_para
+from App.memoria_sesiones import obtener_memoria_sesiones
+from App.historial import recortar_historial
+from Tools.herramienta_llm import herramienta_llm
+from Tools.indice_local import crear_herramienta_material
+from Agents.esquemas import RespuestaAgente, entregar_respuesta
 
 # =========================================
 # LLM Y MEMORIA
 # =========================================
-llm = ChatOpenAI(temperature=0.4, model="gpt-4o-mini")
-memory = MemorySaver()
+llm = llm_para("agente:Educación para el Trabajo")
+memory = obtener_memoria_sesiones()  # compartida, un hilo por (curso, sesión)
 
 # =========================================
 # TOOLS DEFINIDAS (EPT)
 # =========================================
 
 # 1) Planificación de proyectos educativos
-@tool
-def plan_proyecto(tema: str) -> str:
+@herramienta_llm()
+def plan_proyecto(tema: str) -> List[BaseMessage]:
     """
     Genera la estructura completa de un proyecto educativo sobre un tema dado.
     Incluye objetivos, materiales, pasos y evaluación.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.25)
     system = SystemMessage(content=(
         "Eres un docente de Educación para el Trabajo (EPT). "
         "Estructura un proyecto educativo claro con objetivos, materiales, pasos y evaluación."
     ))
     human = HumanMessage(content=f"Tema del proyecto: {tema}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
 
 # 2) Explicación de conceptos tecnológicos
-@tool
-def concepto_tecnologico(concepto: str) -> str:
+@herramienta_llm(
+    consulta=lambda concepto: f"Concepto tecnológico educativo: {concepto}",
+    curso="Educación para el Trabajo", max_results=3,
+)
+def concepto_tecnologico(concepto: str, contexto: str) -> List[BaseMessage]:
     """
     Explica un concepto o herramienta tecnológica de forma clara y concisa,
     incluyendo su aplicación práctica en proyectos educativos.
     """
-    contexto_text = ""
-    try:
-        tavily = TavilySearchResults(max_results=3)
-        raw_results = tavily.invoke({"query": f"Concepto tecnológico educativo: {concepto}"})
-        if isinstance(raw_results, list):
-            contexto_text = "\n".join([r.get("content", "") for r in raw_results if isinstance(r, dict)])
-    except Exception as e:
-        contexto_text = f"(No se pudo obtener contexto de Tavily: {e})"
-
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     system = SystemMessage(content=(
         "Eres un profesor de EPT especializado en tecnología. "
         "Explica el concepto de forma pedagógica y añade un ejemplo práctico simple."
     ))
-    human = HumanMessage(content=f"Concepto: {concepto}\n\nContexto:\n{contexto_text}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    human = HumanMessage(content=f"Concepto: {concepto}\n\nContexto (material del curso o búsqueda web):\n{contexto}")
+    return [system, human]
 
 
 # 3) Evaluación de proyectos
-@tool
-def evaluacion_proyecto(descripcion: str) -> str:
+@herramienta_llm()
+def evaluacion_proyecto(descripcion: str) -> List[BaseMessage]:
     """
     Evalúa la viabilidad pedagógica de un proyecto educativo.
     Sugiere mejoras en objetivos, metodología o recursos.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
     system = SystemMessage(content=(
         "Eres un especialista pedagógico en evaluación de proyectos de EPT. "
         "Analiza la viabilidad del proyecto y da sugerencias claras de mejora."
     ))
     human = HumanMessage(content=f"Descripción del proyecto:\n{descripcion}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
 
 # Lista de herramientas
-tools = [plan_proyecto, concepto_tecnologico, evaluacion_proyecto]
+# Material del curso en Data/ (índice local; Tavily solo si no hay material relevante)
+buscar_material = crear_herramienta_material("Educación para el Trabajo")
+
+tools = [plan_proyecto, concepto_tecnologico, evaluacion_proyecto, buscar_material, entregar_respuesta]
+
+# Ruteo directo: intenciones claras → herramienta, sin pasar por el ciclo ReAct
+# (patrones sobre el texto en minúscula y sin tildes; ver App/ruteo_directo.py)
+RUTAS_DIRECTAS = [
+    (r"\b(planifica|planificar|estructura|organiza|plan\s+de\s+proyecto)\b", plan_proyecto, "explicacion_profunda"),
+    (r"\b(que es|que son|explica|explicame|define|para que sirve)\b", concepto_tecnologico, "explicacion_profunda"),
+    (r"\b(evalua|evaluar|mejorar?\s+(mi|el|este)\s+proyecto)\b", evaluacion_proyecto, "explicacion_profunda"),
+]
 
 # =========================================
 # PROMPT BASE REACT
@@ -92,18 +92,18 @@ Tu tarea es analizar la solicitud del usuario y decidir qué herramienta usar.
 - Si el usuario pide estructurar o planificar un proyecto, usa la herramienta **plan_proyecto**.
 - Si el usuario pide la definición o explicación de un concepto tecnológico, usa **concepto_tecnologico**.
 - Si el usuario pide evaluar o mejorar un proyecto, usa **evaluacion_proyecto**.
+- Si necesitas contenido del material del curso (libros o fichas de la institución), usa **buscar_material**.
 
-Responde siempre en formato JSON con los siguientes campos:
-{
-  "explicacion_profunda": "explicación o desarrollo del tema solicitado",
-  "parrafo_ejemplo": "ejemplo o aplicación práctica si aplica, o vacío si no aplica"
-}
+Cuando tengas la información, entrega la respuesta final llamando a **entregar_respuesta** (en parrafo_ejemplo va el ejemplo o aplicación práctica; vacío si no aplica).
 """
 
 # =========================================
 # CREAR EL AGENTE REACT CON HERRAMIENTAS
 # =========================================
-agent = create_react_agent(llm, tools, checkpointer=memory, prompt=prompt)
+agent = create_react_agent(
+    llm, tools, checkpointer=memory, prompt=prompt,
+    pre_model_hook=recortar_historial,  # ventana de historial + resumen de turnos antiguos
+)
 
 # =========================================
 # FUNCIÓN PARA STREAMLIT
@@ -119,9 +119,6 @@ def get_ept_agent():
         global_llm_with_tools = agent
         print("✅ Agente EPT inicializado correctamente.")
 
-    schema = {
-        "explicacion_profunda": "str",
-        "parrafo_ejemplo": "str"
-    }
+    schema = RespuestaAgente
 
     return global_llm_with_tools, schema
@@ -1,65 +1,51 @@
 ## Imports
-import json
-from typing import Any, Dict, List
-from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import tool
+from typing import List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+from App.enrutador_modelos import llm_para
+from App.memoria_sesiones import obtener_memoria_sesiones
+from App.historial import recortar_historial
+from Tools.herramienta_llm import herramienta_llm
+from Tools.indice_local import crear_herramienta_material
+from Agents.esquemas import RespuestaAgente, entregar_respuesta
 
 # =========================================
 # LLM Y MEMORIA
 # =========================================
-llm = ChatOpenAI(temperature=0.4, model="gpt-4o-mini")
-memory = MemorySaver()
+llm = llm_para("agente:Comunicación")
+memory = obtener_memoria_sesiones()  # compartida, un hilo por (curso, sesión)
 
 # =========================================
 # TOOLS DEFINIDAS
 # =========================================
 
 # 1) Comprensión de definiciones → solo LLM
-@tool
-def comprension_texto(texto: str) -> str:
+@herramienta_llm()
+def comprension_texto(texto: str) -> List[BaseMessage]:
     """
     Explica o define un concepto o tipo de texto de forma clara y concisa.
     No genera ejemplos ni corrige textos.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.15)
     system = SystemMessage(content=(
         "Eres un especialista en comunicación y lenguaje. Da definiciones claras y concisas, "
         "pensadas para estudiantes de secundaria. Si la pregunta es breve, responde con una definición corta. "
         "No añadas ejemplos ni formato JSON aquí — esta herramienta solo devuelve texto plano."
     ))
-    resp = llm.invoke([system, HumanMessage(content=texto)])
-    return resp.content.strip()
+    return [system, HumanMessage(content=texto)]
 
 
-# 2) Producción de ejemplos → híbrido Tavily + LLM
-@tool
-def produccion_texto(tema_o_tipo_texto: str) -> str:
+# 2) Producción de ejemplos → híbrido búsqueda (Data/ o Tavily) + LLM
+@herramienta_llm(
+    consulta=lambda tema_o_tipo_texto: f"Ejemplo educativo: {tema_o_tipo_texto}",
+    curso="Comunicación", max_results=4,
+)
+def produccion_texto(tema_o_tipo_texto: str, contexto: str) -> List[BaseMessage]:
     """
     SOLO genera ejemplos o párrafos aplicados (nunca definiciones ni explicaciones teóricas).
-    Usa Tavily para obtener contexto y redacta un ejemplo educativo práctico 
+    Obtiene contexto (material del curso o web) y redacta un ejemplo educativo práctico 
     para estudiantes de secundaria.
     """
-    contexto_text = ""
-    try:
-        tavily = TavilySearchResults(max_results=4)
-        raw_results = tavily.invoke({"query": f"Ejemplo educativo: {tema_o_tipo_texto}"})
-        if isinstance(raw_results, list):
-            contexto_text = "\n".join(
-                [r.get("content", "") for r in raw_results if isinstance(r, dict)]
-            )
-        else:
-            contexto_text = str(raw_results)
-    except Exception as e:
-        contexto_text = f"(No se pudo obtener contexto de Tavily: {e})"
-
-    # Modelo con ligera creatividad
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.45)
-
     # Reforzamos el rol y el límite del tipo de salida
     system = SystemMessage(content=(
         "Eres un redactor educativo especializado en crear ejemplos prácticos. "
@@ -71,32 +57,40 @@ def produccion_texto(tema_o_tipo_texto: str) -> str:
     # Prompt explícito sobre qué producir
     human = HumanMessage(content=(
         f"Tema o tipo de texto: {tema_o_tipo_texto}\n\n"
-        f"CONTEXTO web relevante:\n{contexto_text}\n\n"
+        f"CONTEXTO relevante (material del curso o búsqueda web):\n{contexto}\n\n"
         "Genera un solo párrafo de ejemplo aplicado (nunca una definición). "
         "Debe mostrar cómo se usa o aplica el tema en una situación real o educativa."
     ))
 
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
 # 3) Validación de texto → solo LLM
-@tool
-def validacion_texto(texto_a_validar: str) -> str:
+@herramienta_llm()
+def validacion_texto(texto_a_validar: str) -> List[BaseMessage]:
     """
     Valida gramática, coherencia y estilo; sugiere mejoras y devuelve versión corregida.
     Usa solo LLM (no Tavily).
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
     system = SystemMessage(content=(
         "Eres un corrector y editor. Revisa el texto en términos de ortografía, gramática, coherencia y estilo. "
         "Devuelve primero una breve nota (1-2 líneas) con observaciones, y luego una versión corregida del texto."
     ))
-    resp = llm.invoke([system, HumanMessage(content=texto_a_validar)])
-    return resp.content.strip()
+    return [system, HumanMessage(content=texto_a_validar)]
 
 
 # Lista de herramientas
-tools = [comprension_texto, produccion_texto, validacion_texto]
+# Material del curso en Data/ (índice local; Tavily solo si no hay material relevante)
+buscar_material = crear_herramienta_material("Comunicación")
+
+tools = [comprension_texto, produccion_texto, validacion_texto, buscar_material, entregar_respuesta]
+
+# Ruteo directo: intenciones claras → herramienta, sin pasar por el ciclo ReAct
+# (patrones sobre el texto en minúscula y sin tildes; ver App/ruteo_directo.py)
+RUTAS_DIRECTAS = [
+    (r"\b(que es|que son|definicion de|concepto de|significado de)\b", comprension_texto, "explicacion_profunda"),
+    (r"\b(dame\s+(un\s+)?ejemplos?\s+de|ejemplos?\s+de|redacta|escribe\s+un\s+parrafo)\b", produccion_texto, "parrafo_ejemplo"),
+    (r"\b(corrige|revisa|mejora)\b", validacion_texto, "explicacion_profunda"),
+]
 
 # =========================================
 # PROMPT BASE REACT
@@ -108,18 +102,18 @@ Tu tarea es analizar la solicitud del usuario y decidir cuál herramienta usar.
 - Si el usuario pide una definición, explicación o significado (por ejemplo: "qué es", "definición de", "concepto de"), usa la herramienta **comprension_texto**.
 - Si el usuario pide un ejemplo, redacción o párrafo aplicado, usa la herramienta **produccion_texto**.
 - Si el usuario pide que revises, corrijas o mejores un texto, usa la herramienta **validacion_texto**.
+- Si necesitas contenido del material del curso (libros o fichas de la institución), usa **buscar_material**.
 
-Responde siempre en formato JSON con los siguientes campos:
-{
-  "explicacion_profunda": "definición o explicación del tema",
-  "parrafo_ejemplo": "ejemplo textual si aplica, o vacío si no aplica"
-}
+Cuando tengas la información, entrega la respuesta final llamando a **entregar_respuesta** (en parrafo_ejemplo va el ejemplo textual; vacío si no aplica).
 """
 
 # =========================================
 # Crear el agente ReAct con herramientas
 # =========================================
-agent = create_react_agent(llm, tools, checkpointer=memory, prompt=prompt)
+agent = create_react_agent(
+    llm, tools, checkpointer=memory, prompt=prompt,
+    pre_model_hook=recortar_historial,  # ventana de historial + resumen de turnos antiguos
+)
 
 # =========================================
 # FUNCIÓN PARA STREAMLIT
@@ -136,10 +130,7 @@ def get_comunicacion_agent():
         print("✅ Agente Comunicación inicializado correctamente.")
 
     # Estructura esperada (el orquestador recibe 2 elementos)
-    schema = {
-        "explicacion_profunda": "str",
-        "parrafo_ejemplo": "str"
-    }
+    schema = RespuestaAgente
 
     return global_llm_with_tools, schema
 
@@ -2,85 +2,89 @@
 # Agent_ingles.py - Agente Especialista en Inglés (EVA)
 # =======================================================================
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import tool
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+from App.enrutador_modelos import llm_para
+from App.memoria_sesiones import obtener_memoria_sesiones
+from App.historial import recortar_historial
+from Tools.herramienta_llm import herramienta_llm
+from Tools.indice_local import crear_herramienta_material
+from Agents.esquemas import RespuestaAgente, entregar_respuesta
 
 # =========================================
 # LLM Y MEMORIA
 # =========================================
-llm = ChatOpenAI(temperature=0.4, model="gpt-4o-mini")
-memory = MemorySaver()
+llm = llm_para("agente:Inglés")
+memory = obtener_memoria_sesiones()  # compartida, un hilo por (curso, sesión)
 
 # =========================================
 # TOOLS DEFINIDAS
 # =========================================
 
 # 1) Explicación y ejemplo del tema
-@tool
-def generar_explicacion(tema: str) -> str:
+@herramienta_llm()
+def generar_explicacion(tema: str) -> List[BaseMessage]:
     """
     Explica un tema de inglés (gramática, vocabulario o expresión)
     de forma clara y pedagógica, con un ejemplo breve al final.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
     system = SystemMessage(content=(
         "Eres un profesor de inglés para secundaria. Explica el tema solicitado "
         "de forma sencilla y añade un ejemplo breve al final. No uses formato JSON."
     ))
     human = HumanMessage(content=f"Tema: {tema}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
 
 # 2) Búsqueda de vocabulario o significado contextual
-@tool
-def buscar_vocabulario(palabra: str) -> str:
+@herramienta_llm(
+    consulta=lambda palabra: f"meaning and examples of '{palabra}' in English",
+    curso="Inglés", max_results=3,
+)
+def buscar_vocabulario(palabra: str, contexto: str) -> List[BaseMessage]:
     """
     Busca el significado y ejemplos de uso de una palabra o frase en inglés.
-    Combina resultados web (Tavily) con una explicación educativa breve.
+    Combina el material del curso o resultados web con una explicación educativa breve.
     """
-    contexto = ""
-    try:
-        tavily = TavilySearchResults(max_results=3)
-        raw_results = tavily.invoke({"query": f"meaning and examples of '{palabra}' in English"})
-        if isinstance(raw_results, list):
-            contexto = "\n".join([r.get("content", "") for r in raw_results if isinstance(r, dict)])
-    except Exception as e:
-        contexto = f"(No se pudo obtener contexto: {e})"
-
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.35)
     system = SystemMessage(content=(
         "Eres un profesor de inglés que explica vocabulario de forma contextual y sencilla. "
         "Resume los significados principales y da un ejemplo en inglés con su traducción al español."
     ))
-    human = HumanMessage(content=f"Palabra o frase: {palabra}\n\nContexto web:\n{contexto}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    human = HumanMessage(content=f"Palabra o frase: {palabra}\n\nContexto (material del curso o búsqueda web):\n{contexto}")
+    return [system, human]
 
 
 # 3) Generación de ejercicios prácticos
-@tool
-def generar_practica(tema: str) -> str:
+@herramienta_llm()
+def generar_practica(tema: str) -> List[BaseMessage]:
     """
     Crea un ejercicio corto (1–3 oraciones) con su solución
     sobre el tema o estructura gramatical indicada.
     """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.45)
     system = SystemMessage(content=(
         "Eres un docente de inglés. Crea un ejercicio corto de práctica "
         "y proporciona la respuesta correcta. No des explicaciones teóricas."
     ))
     human = HumanMessage(content=f"Tema o estructura: {tema}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
 
 # Lista de herramientas
-tools = [generar_explicacion, buscar_vocabulario, generar_practica]
+# Material del curso en Data/ (índice local; Tavily solo si no hay material relevante)
+buscar_material = crear_herramienta_material("Inglés")
+
+tools = [generar_explicacion, buscar_vocabulario, generar_practica, buscar_material, entregar_respuesta]
+
+# Ruteo directo: intenciones claras → herramienta, sin pasar por el ciclo ReAct
+# (patrones sobre el texto en minúscula y sin tildes; ver App/ruteo_directo.py)
+RUTAS_DIRECTAS = [
+    (r"\b(que significa|significado de|traduce|traducir|como se dice|meaning of)\b", buscar_vocabulario, "explicacion_profunda"),
+    (r"\b(explica|explicame|que es|como se usa|explain)\b", generar_explicacion, "explicacion_profunda"),
+    (r"\b(ejercicios?|practica|practicar|exercises?)\b", generar_practica, "parrafo_ejemplo"),
+]
 
 # =========================================
 # PROMPT BASE REACT
@@ -92,18 +96,18 @@ Tu tarea es analizar la solicitud del estudiante y decidir qué herramienta usar
 - Si el usuario pide una explicación o definición de un tema, usa **generar_explicacion**.
 - Si el usuario pide significado, traducción o uso de una palabra o frase, usa **buscar_vocabulario**.
 - Si el usuario pide ejercicios o prácticas, usa **generar_practica**.
+- Si necesitas contenido del material del curso (libros o fichas de la institución), usa **buscar_material**.
 
-Responde siempre en formato JSON con los siguientes campos:
-{
-  "explicacion_profunda": "explicación o desarrollo del tema solicitado",
-  "parrafo_ejemplo": "ejemplo, vocabulario o práctica generada"
-}
+Cuando tengas la información, entrega la respuesta final llamando a **entregar_respuesta** (en parrafo_ejemplo va el ejemplo, vocabulario o práctica generada).
 """
 
 # =========================================
 # CREAR EL AGENTE REACT CON HERRAMIENTAS
 # =========================================
-agent = create_react_agent(llm, tools, checkpointer=memory, prompt=prompt)
+agent = create_react_agent(
+    llm, tools, checkpointer=memory, prompt=prompt,
+    pre_model_hook=recortar_historial,  # ventana de historial + resumen de turnos antiguos
+)
 
 # =========================================
 # FUNCIÓN PARA STREAMLIT
@@ -119,10 +123,7 @@ def get_ingles_agent():
         global_llm_with_tools = agent
         print("✅ Agente Inglés inicializado correctamente.")
 
-    schema = {
-        "explicacion_profunda": "str",
-        "parrafo_ejemplo": "str"
-    }
+    schema = RespuestaAgente
 
     return global_llm_with_tools, schema
 
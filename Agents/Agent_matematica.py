@@ -2,34 +2,34 @@
 # Agents/Agent_matematica.py - Agente Especialista en Matemáticas
 # =======================================================================
 
-from typing import Any, Dict
-from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import tool
-from langchain_community.tools.tavily_search import TavilySearchResults
+from typing import List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
+
+from App.enrutador_modelos import llm_para
+from App.memoria_sesiones import obtener_memoria_sesiones
+from App.historial import recortar_historial
+from Tools.herramienta_llm import herramienta_llm
+from Tools.indice_local import crear_herramienta_material
+from Agents.esquemas import RespuestaAgente, entregar_respuesta
 
 # =========================================
 # 0. Inicialización LLM y memoria
 # =========================================
-llm = ChatOpenAI(temperature=0.4, model="gpt-4o-mini")
-memory = MemorySaver()
-tavily_tool = TavilySearchResults(max_results=4)
+llm = llm_para("agente:Matemática")
+memory = obtener_memoria_sesiones()  # compartida, un hilo por (curso, sesión)
 
 # =========================================
 # 1. Schema de salida
 # =========================================
-class RespuestaMatematica(BaseModel):
-    explicacion_profunda: str = Field(description="Explicación detallada del concepto, procedimiento o verificación.")
-    parrafo_ejemplo: str = Field(description="Ejemplo práctico o problema resuelto que ilustra la explicación.")
+# RespuestaAgente (Agents/esquemas.py), común a todos los cursos: el agente lo
+# entrega llamando a la herramienta entregar_respuesta.
 
 # =========================================
 # 2. Herramientas Matemáticas
 # =========================================
-@tool
-def resolucion_problemas(problema: str) -> str:
+@herramienta_llm()
+def resolucion_problemas(problema: str) -> List[BaseMessage]:
     """Resuelve problemas matemáticos paso a paso."""
     system = SystemMessage(content=(
         "Eres un asistente de matemáticas para secundaria. "
@@ -37,33 +37,23 @@ def resolucion_problemas(problema: str) -> str:
         "Indica cómo verificar la solución si aplica."
     ))
     human = HumanMessage(content=problema)
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
-@tool
-def explicacion_concepto(concepto: str) -> str:
+@herramienta_llm(
+    consulta=lambda concepto: f"Definición y ejemplos: {concepto} matemáticas secundaria",
+    curso="Matemática", max_results=4,
+)
+def explicacion_concepto(concepto: str, contexto: str) -> List[BaseMessage]:
     """Explica conceptos matemáticos con ejemplos."""
-    # Intentamos obtener contexto de Tavily
-    contexto_text = ""
-    try:
-        raw_results = tavily_tool.invoke({"query": f"Definición y ejemplos: {concepto} matemáticas secundaria"})
-        if isinstance(raw_results, list):
-            contexto_text = "\n".join([r.get("content", "") for r in raw_results if isinstance(r, dict)])
-        else:
-            contexto_text = str(raw_results)
-    except Exception as e:
-        contexto_text = f"(No se pudo obtener contexto: {e})"
-
     system = SystemMessage(content=(
-        f"Eres un profesor de matemáticas para secundaria. Usa el contexto cuando sea útil:\n{contexto_text}\n"
+        f"Eres un profesor de matemáticas para secundaria. Usa el contexto cuando sea útil:\n{contexto}\n"
         "Explica el concepto claramente e incluye un ejemplo breve."
     ))
     human = HumanMessage(content=concepto)
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
 
-@tool
-def verificacion_resultado(enunciado: str, respuesta_alumno: str) -> str:
+@herramienta_llm()
+def verificacion_resultado(enunciado: str, respuesta_alumno: str) -> List[BaseMessage]:
     """Verifica la coherencia de la respuesta de un alumno y da retroalimentación."""
     system = SystemMessage(content=(
         "Eres un verificador pedagógico en matemáticas. "
@@ -71,10 +61,20 @@ def verificacion_resultado(enunciado: str, respuesta_alumno: str) -> str:
         "Indica si es correcta, explica por qué o por qué no, y sugiere pasos de corrección."
     ))
     human = HumanMessage(content=f"Enunciado: {enunciado}\nRespuesta del alumno: {respuesta_alumno}")
-    resp = llm.invoke([system, human])
-    return resp.content.strip()
+    return [system, human]
+
+# Material del curso en Data/ (índice local; Tavily solo si no hay material relevante)
+buscar_material = crear_herramienta_material("Matemática")
+
+tools = [resolucion_problemas, explicacion_concepto, verificacion_resultado, buscar_material, entregar_respuesta]
 
-tools = [resolucion_problemas, explicacion_concepto, verificacion_resultado]
+# Ruteo directo: intenciones claras → herramienta, sin pasar por el ciclo ReAct
+# (patrones sobre el texto en minúscula y sin tildes; ver App/ruteo_directo.py)
+RUTAS_DIRECTAS = [
+    (r"\b(resuelve|resolver|calcula|calcular|halla|hallar|cuanto es|despeja)\b", resolucion_problemas, "explicacion_profunda"),
+    (r"\b(que es|que son|explica|explicame|definicion de|concepto de)\b", explicacion_concepto, "explicacion_profunda"),
+    # verificacion_resultado necesita enunciado y respuesta del alumno: lo decide el agente
+]
 
 # =========================================
 # 3. Prompt general para el agente
@@ -86,18 +86,18 @@ Tu tarea es analizar la solicitud del usuario y decidir cuál herramienta usar:
 - Si el usuario pide resolver un problema paso a paso, usa la herramienta **resolucion_problemas**.
 - Si el usuario pide una explicación de un concepto matemático, usa la herramienta **explicacion_concepto**.
 - Si el usuario pide verificar o corregir una respuesta de alumno, usa la herramienta **verificacion_resultado**.
+- Si necesitas contenido del material del curso (libros o fichas de la institución), usa **buscar_material**.
 
-Responde SIEMPRE en formato JSON compatible con Pydantic:
-{{
-  "explicacion_profunda": "Explicación detallada del concepto, procedimiento o verificación.",
-  "parrafo_ejemplo": "Ejemplo práctico o problema resuelto que ilustra la explicación."
-}}
+Cuando tengas la información, entrega la respuesta final llamando a **entregar_respuesta** (en parrafo_ejemplo va el ejemplo práctico o problema resuelto).
 """
 
 # =========================================
 # 4. Crear agente ReAct
 # =========================================
-agent = create_react_agent(llm, tools, checkpointer=memory, prompt=PROMPT_GENERAL)
+agent = create_react_agent(
+    llm, tools, checkpointer=memory, prompt=PROMPT_GENERAL,
+    pre_model_hook=recortar_historial,  # ventana de historial + resumen de turnos antiguos
+)
 
 # =========================================
 # 5. Función para Streamlit
@@ -112,8 +112,5 @@ def get_matematica_agent():
         global_llm_with_tools = agent
         print("✅ Agente Matemáticas inicializado correctamente.")
 
-    schema = {
-        "explicacion_profunda": "str",
-        "parrafo_ejemplo": "str"
-    }
+    schema = RespuestaAgente
     return global_llm_with_tools, schema
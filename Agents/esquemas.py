@@ -0,0 +1,66 @@
+# =======================================================================
+# Agents/esquemas.py - Esquema de Respuesta Compartido por los Agentes
+# =======================================================================
+# Los cinco agentes entregan su respuesta final llamando a la herramienta
+# `entregar_respuesta`, cuyos argumentos son el esquema RespuestaAgente.
+# La API valida los argumentos contra el esquema y el grafo termina ahí
+# (return_direct), así que el orquestador recibe un dict ya estructurado:
+# sin ```json que limpiar ni json.loads que pueda fallar.
+
+import uuid
+from typing import List, Optional, Sequence
+
+from pydantic import BaseModel, Field, ValidationError
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+NOMBRE_HERRAMIENTA_RESPUESTA = "entregar_respuesta"
+CONFIRMACION_ENTREGA = "Respuesta entregada al estudiante."
+
+
+# =========================================
+# 1. Schema de salida (común a todos los cursos)
+# =========================================
+class RespuestaAgente(BaseModel):
+    explicacion_profunda: str = Field(description="Explicación detallada del concepto, procedimiento, análisis o corrección.")
+    parrafo_ejemplo: str = Field(description="Ejemplo práctico, problema resuelto, experimento o práctica que ilustra la explicación (vacío si no aplica).")
+
+
+# =========================================
+# 2. Herramienta de entrega
+# =========================================
+@tool(NOMBRE_HERRAMIENTA_RESPUESTA, args_schema=RespuestaAgente, return_direct=True)
+def entregar_respuesta(explicacion_profunda: str, parrafo_ejemplo: str) -> str:
+    """Entrega la respuesta final al estudiante. Llámala una sola vez, cuando la respuesta esté lista."""
+    return CONFIRMACION_ENTREGA
+
+
+# =========================================
+# 3. Lectura y construcción de la respuesta en el hilo
+# =========================================
+def extraer_respuesta(mensajes: Sequence[BaseMessage]) -> Optional[RespuestaAgente]:
+    """
+    Devuelve la RespuestaAgente del turno actual (la última llamada a entregar_respuesta
+    posterior al último mensaje del usuario), o None si el agente no la entregó.
+    """
+    for m in reversed(mensajes):
+        if isinstance(m, HumanMessage):
+            break
+        for llamada in getattr(m, "tool_calls", None) or []:
+            if llamada["name"] == NOMBRE_HERRAMIENTA_RESPUESTA:
+                try:
+                    return RespuestaAgente.model_validate(llamada["args"])
+                except ValidationError:
+                    return None
+    return None
+
+
+def mensajes_de_respuesta(respuesta: RespuestaAgente) -> List[BaseMessage]:
+    """Par (llamada a entregar_respuesta, confirmación) tal como lo deja el agente ReAct en el hilo."""
+    id_llamada = f"call_{uuid.uuid4().hex[:24]}"
+    return [
+        AIMessage(content="", tool_calls=[{
+            "name": NOMBRE_HERRAMIENTA_RESPUESTA, "args": respuesta.model_dump(), "id": id_llamada,
+        }]),
+        ToolMessage(content=CONFIRMACION_ENTREGA, name=NOMBRE_HERRAMIENTA_RESPUESTA, tool_call_id=id_llamada),
+    ]
@@ -0,0 +1,405 @@
+# app/banco_respuestas.py
+# =====================================================
+# 🔹 EVA - Banco de Respuestas Pregeneradas (antes de cualquier LLM)
+# =====================================================
+# Trabajo sin conexión que expande descripcion_cursos (App/courses_data.py)
+# en las preguntas más probables de cada grado × curso, las pasa una vez por
+# el flujo completo de main y guarda las respuestas exitosas en:
+#   - banco.jsonl   → grado, curso, pregunta, pregunta normalizada y respuesta
+#   - nucleos.npy   → embedding float16 del núcleo de cada pregunta
+# Al servir, el banco se consulta antes que el validador y los agentes:
+# coincidencia exacta por (grado, curso, pregunta normalizada) o, si no, el
+# vecino más cercano del mismo grado y curso por encima de EVA_BANCO_UMBRAL.
+# El vecino se busca por el núcleo de la pregunta (sin palabras de encuadre como
+# "qué es", "explícame", "dame un ejemplo" y con cada palabra en singular), así
+# "¿Me explicas las fracciones?" o "¿Qué es una fracción?" encuentran
+# "¿Qué son las fracciones?"; entre núcleos iguales gana la plantilla más parecida.
+# Igual que en la caché semántica, las preguntas que remiten a la conversación no
+# se responden desde el banco y un vecino solo vale si tiene los mismos números.
+#
+# Generar (o completar) el banco:
+#   python -m App.banco_respuestas
+#   python -m App.banco_respuestas --grados "1° Secundaria" --cursos Matemática --hilos 2
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from App.cache_respuestas import depende_del_contexto, normalizar_pregunta, numeros_de
+from App.clasificador_curso import normalizar_texto
+from App.config import LOGS_DIR
+from App.courses_data import cursos_por_grado, descripcion_cursos
+from Tools.embeddings import vectorizar_lote, vectorizar_texto
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+BANCO_ACTIVO = os.getenv("EVA_BANCO_RESPUESTAS", "1") == "1"
+RUTA_BANCO = os.getenv("EVA_BANCO_RUTA", os.path.join(LOGS_DIR, "banco_respuestas"))
+UMBRAL_SIMILITUD = float(os.getenv("EVA_BANCO_UMBRAL", "0.92"))
+
+# Preguntas de alto tráfico por cada tema de la descripción del curso. {el_tema} lleva
+# artículo ("las fracciones"); {es} y {sirve} concuerdan en número con el tema.
+PLANTILLAS = [
+    "¿Qué {es} {el_tema}?",
+    "Explícame {el_tema} con un ejemplo.",
+    "¿Para qué {sirve} {el_tema}?",
+    "Dame un ejemplo de {tema}.",
+]
+
+# Palabras que enmarcan la pregunta sin decir de qué trata (se quitan del núcleo). Las
+# negaciones se quedan ("¿Qué no es una fracción?" es otra pregunta), salvo el "no" de
+# "no entiendo las fracciones", que solo pide la explicación.
+PALABRAS_DE_ENCUADRE = {
+    "que", "es", "son", "el", "la", "los", "las", "lo", "un", "una", "unos", "unas", "de", "del", "al",
+    "a", "en", "y", "o", "por", "para", "con", "me", "mi", "te", "se", "como", "cual", "cuales",
+    "explica", "explicame", "explicas", "explicar", "explicarme", "puedes", "podrias", "ayuda",
+    "ayudame", "ayudas", "dame", "da", "ejemplo", "ejemplos", "sirve", "sirven", "usa", "usan",
+    "significa", "significado", "entiendo", "quiero", "aprender", "sobre", "funciona", "funcionan",
+    "favor", "porfa", "hola", "tema", "comprendo", "recuerdo",
+}
+_VERBOS_DE_DUDA = {"entiendo", "comprendo", "recuerdo"}
+
+# Comienzos de descripción que no forman parte del tema ("Aprenderás operaciones…")
+_PREFIJOS = re.compile(r"^(aprenderás|introducción (al|a la|a)|uso básico de|fundamentos de)\s+", re.IGNORECASE)
+# Tramos (entre comas) que empiezan con un verbo: describen una actividad, no un tema, y
+# tampoco lo es lo que sigue a su "y" ("describir tu rutina y gustos" → ni "gustos")
+_VERBO = re.compile(r"^\w+[aei]r(te|se)?\b")
+# Partes que no nombran un tema: adjetivos sueltos tras partir por "y" ("Sistemas físicos
+# y biológicos con experimentos" → "biológicos con …") y metas del curso ("preparación para…")
+_NO_TEMA = re.compile(r"^(\w+ic[oa]s|preparacion|consolidacion|fluidez)\b")
+# Frases con complemento ("programas como Word", "proyectos con programación"): la
+# plantilla no sabe dónde termina el sustantivo, así que no se generan preguntas
+_COMPLEMENTO = re.compile(r"\s(como|con)\s")
+
+# Género del primer sustantivo: terminaciones femeninas y excepciones
+_TERMINACIONES_FEMENINAS = ("a", "ion", "dad", "tad", "ud", "umbre", "ez")
+_MASCULINOS_EN_A = {"problema", "sistema", "programa", "tema", "mapa", "dia", "clima", "idioma"}
+_FEMENINOS_EN_E = {"frase", "clase", "base", "fase", "parte"}
+
+
+# ----------------------------------------------------
+# 2. PREGUNTAS A PARTIR DE LAS DESCRIPCIONES
+# ----------------------------------------------------
+def temas_de_descripcion(descripcion: str) -> List[str]:
+    """
+    'Fracciones, potencias y proporcionalidad.' → ['fracciones', 'potencias', 'proporcionalidad'].
+    Solo frases nominales: se saltan actividades ("describir tu rutina"), metas y complementos.
+    """
+    temas = []
+    for posicion_tramo, tramo in enumerate(re.split(r",|:", descripcion.strip().rstrip("."))):
+        tramo = _PREFIJOS.sub("", tramo.strip())
+        if _VERBO.match(normalizar_texto(tramo)):
+            continue
+        for posicion, parte in enumerate(re.split(r"\s+y\s+", tramo)):
+            tema = parte.strip()
+            if len(tema) <= 2 or _NO_TEMA.match(normalizar_texto(tema)) or _COMPLEMENTO.search(tema):
+                continue
+            if posicion_tramo == posicion == 0:  # mayúscula de inicio de frase; las demás son nombres propios ("Excel")
+                tema = tema[0].lower() + tema[1:]
+            if tema not in temas:
+                temas.append(tema)
+    return temas
+
+
+def _singular(palabra: str) -> str:
+    """Singular aproximado de una palabra ya normalizada: 'fracciones' → 'fraccion'."""
+    if len(palabra) > 4 and palabra.endswith("es") and palabra[-3] in "lnrdjzy":
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith("s") and not palabra.endswith(("is", "us")):
+        return palabra[:-1]
+    return palabra
+
+
+def nucleo_pregunta(pregunta: str) -> str:
+    """'¿Me explicas las fracciones?' → 'fraccion': de qué trata la pregunta, sin su encuadre."""
+    tokens = normalizar_pregunta(pregunta).split()
+    return " ".join(
+        _singular(t) for i, t in enumerate(tokens)
+        if t not in PALABRAS_DE_ENCUADRE and not (t == "no" and tokens[i + 1:i + 2] and tokens[i + 1] in _VERBOS_DE_DUDA)
+    )
+
+
+def formas_del_tema(tema: str) -> Dict[str, str]:
+    """
+    Campos para las plantillas: 'fracciones' → el_tema='las fracciones', es='son', sirve='sirven'.
+    Los nombres propios ('Excel') van sin artículo.
+    """
+    primera = tema.split()[0]
+    base = normalizar_texto(primera)
+    plural = base.endswith("s") and not base.endswith(("is", "us"))
+    if primera[0].isupper():
+        return {"tema": tema, "el_tema": tema, "es": "es", "sirve": "sirve"}
+
+    singular = base
+    if plural:
+        singular = base[:-2] if base.endswith("es") and base[:-2].endswith(_TERMINACIONES_FEMENINAS[1:]) else base[:-1]
+    femenino = singular not in _MASCULINOS_EN_A and (
+        singular.endswith(_TERMINACIONES_FEMENINAS) or singular in _FEMENINOS_EN_E
+    )
+    if plural:
+        articulo = "las" if femenino else "los"
+    else:
+        # "el álgebra": femenino singular que empieza con a tónica
+        articulo = "la" if femenino and not primera.lower().startswith(("á", "ha")) else "el"
+    return {
+        "tema": tema,
+        "el_tema": f"{articulo} {tema}",
+        "es": "son" if plural else "es",
+        "sirve": "sirven" if plural else "sirve",
+    }
+
+
+def preguntas_frecuentes(grado: str, curso: str) -> List[str]:
+    """Preguntas probables de un grado × curso según su descripción."""
+    descripcion = descripcion_cursos.get(grado, {}).get(curso, "")
+    return [
+        plantilla.format(**formas_del_tema(tema))
+        for tema in temas_de_descripcion(descripcion) for plantilla in PLANTILLAS
+    ]
+
+
+def celdas(grados: Optional[List[str]] = None, cursos: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """(grado, curso) de courses_data, filtrados opcionalmente."""
+    return [
+        (grado, curso)
+        for grado, cursos_grado in cursos_por_grado.items() if not grados or grado in grados
+        for curso in cursos_grado if not cursos or curso in cursos
+    ]
+
+
+# ----------------------------------------------------
+# 3. BANCO EN MEMORIA (solo lectura)
+# ----------------------------------------------------
+class BancoRespuestas:
+    """Entradas del banco indexadas por clave exacta y, por (grado, curso), para vecinos."""
+
+    def __init__(self, ruta: str = RUTA_BANCO, umbral: float = UMBRAL_SIMILITUD):
+        self.ruta = ruta
+        self.umbral = umbral
+        self.entradas: List[Dict[str, str]] = []
+        archivo = os.path.join(ruta, "banco.jsonl")
+        if os.path.exists(archivo):
+            with open(archivo, "r", encoding="utf-8") as f:
+                self.entradas = [json.loads(linea) for linea in f if linea.strip()]
+        archivo_nucleos = os.path.join(ruta, "nucleos.npy")
+        if not self.entradas:
+            self.vectores = np.zeros((0, 0), dtype=np.float32)
+        elif os.path.exists(archivo_nucleos):
+            self.vectores = np.load(archivo_nucleos).astype(np.float32)
+        else:  # banco generado antes de los núcleos: se vectoriza al cargar
+            self.vectores = _vectores_de(self.entradas).astype(np.float32)
+
+        self._exactas: Dict[Tuple[str, str, str], int] = {}
+        self._filas_por_celda: Dict[Tuple[str, str], List[int]] = {}
+        self._numeros = [numeros_de(entrada["normalizada"]) for entrada in self.entradas]
+        for fila, entrada in enumerate(self.entradas):
+            self._exactas[(entrada["grado"], entrada["curso"], entrada["normalizada"])] = fila
+            self._filas_por_celda.setdefault((entrada["grado"], entrada["curso"]), []).append(fila)
+        self._filas_por_celda = {celda: np.array(filas) for celda, filas in self._filas_por_celda.items()}
+
+        self._lock = threading.Lock()
+        self._contadores = {"aciertos_exactos": 0, "aciertos_semanticos": 0, "fallos": 0, "no_cacheables": 0}
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+    def _contar(self, clave: str):
+        with self._lock:
+            self._contadores[clave] += 1
+
+    def buscar(self, grado: str, curso: str, pregunta: str) -> Optional[str]:
+        """Respuesta pregenerada para la pregunta (o una casi idéntica), o None."""
+        if depende_del_contexto(pregunta):
+            self._contar("no_cacheables")
+            return None
+
+        normalizada = normalizar_pregunta(pregunta)
+        fila = self._exactas.get((grado, curso, normalizada))
+        if fila is not None:
+            self._contar("aciertos_exactos")
+            return self.entradas[fila]["respuesta"]
+
+        filas = self._filas_por_celda.get((grado, curso))
+        if filas is not None:
+            numeros = numeros_de(normalizada)
+            filas = filas[[self._numeros[f] == numeros for f in filas]]
+        if filas is not None and len(filas):
+            similitudes = self.vectores[filas] @ vectorizar_texto(nucleo_pregunta(pregunta))
+            maximo = float(similitudes.max())
+            if maximo >= self.umbral:
+                # Varias plantillas comparten núcleo: gana la que más palabras comparte con la pregunta
+                palabras = set(normalizada.split())
+                empatadas = filas[similitudes >= maximo - 1e-3]
+                mejor = max(empatadas, key=lambda f: len(palabras & set(self.entradas[f]["normalizada"].split())))
+                self._contar("aciertos_semanticos")
+                return self.entradas[mejor]["respuesta"]
+
+        self._contar("fallos")
+        return None
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            datos = dict(self._contadores)
+        datos["entradas"] = len(self.entradas)
+        datos["celdas"] = len(self._filas_por_celda)
+        return datos
+
+
+_banco: Optional[BancoRespuestas] = None
+_banco_lock = threading.Lock()
+
+
+def obtener_banco() -> Optional[BancoRespuestas]:
+    """Banco cargado una sola vez; None si está desactivado o aún no se generó."""
+    global _banco
+    if not BANCO_ACTIVO:
+        return None
+    banco = _banco
+    if banco is None:
+        with _banco_lock:
+            if _banco is None:
+                _banco = BancoRespuestas()
+                if len(_banco):
+                    print(f"🏦 Banco de respuestas: {len(_banco)} respuestas pregeneradas")
+            banco = _banco
+    return banco if len(banco) else None
+
+
+def recargar_banco() -> None:
+    """Descarta el banco en memoria; la próxima consulta lee la versión en disco."""
+    global _banco
+    with _banco_lock:
+        _banco = None
+
+
+def buscar_en_banco(grado: str, curso: str, pregunta: str) -> Optional[str]:
+    banco = obtener_banco()
+    return banco.buscar(grado, curso, pregunta) if banco is not None else None
+
+
+# ----------------------------------------------------
+# 4. GENERACIÓN SIN CONEXIÓN
+# ----------------------------------------------------
+def _vectores_de(entradas: List[Dict[str, str]]) -> np.ndarray:
+    return vectorizar_lote([nucleo_pregunta(e["normalizada"]) for e in entradas])
+
+
+def guardar_banco(entradas: List[Dict[str, str]], destino: str = RUTA_BANCO) -> None:
+    """Escribe banco.jsonl y nucleos.npy (se reemplazan de forma atómica)."""
+    os.makedirs(destino, exist_ok=True)
+    vectores = _vectores_de(entradas).astype(np.float16) if entradas else np.zeros((0, 0), dtype=np.float16)
+    with open(os.path.join(destino, "nucleos.tmp.npy"), "wb") as f:
+        np.save(f, vectores)
+    with open(os.path.join(destino, "banco.jsonl.tmp"), "w", encoding="utf-8") as f:
+        for entrada in entradas:
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+    os.replace(os.path.join(destino, "nucleos.tmp.npy"), os.path.join(destino, "nucleos.npy"))
+    os.replace(os.path.join(destino, "banco.jsonl.tmp"), os.path.join(destino, "banco.jsonl"))
+
+
+def generar_banco(
+    procesar: Callable[[str, str, str, str], str],
+    grados: Optional[List[str]] = None,
+    cursos: Optional[List[str]] = None,
+    destino: str = RUTA_BANCO,
+    hilos: int = 4,
+) -> Dict[str, Any]:
+    """
+    Pasa las preguntas frecuentes de cada celda por `procesar` (procesar_pregunta de main)
+    y guarda las respuestas exitosas. Las preguntas ya presentes en el banco no se repiten;
+    las de las celdas generadas que las plantillas ya no producen se retiran.
+    """
+    generadas = celdas(grados, cursos)
+    vigentes = {
+        (grado, curso, normalizar_pregunta(pregunta))
+        for grado, curso in generadas for pregunta in preguntas_frecuentes(grado, curso)
+    }
+    existentes = [
+        e for e in BancoRespuestas(destino).entradas
+        if (e["grado"], e["curso"]) not in generadas or (e["grado"], e["curso"], e["normalizada"]) in vigentes
+    ]
+    ya_hechas = {(e["grado"], e["curso"], e["normalizada"]) for e in existentes}
+    pendientes = [
+        (grado, curso, pregunta)
+        for grado, curso in generadas
+        for pregunta in preguntas_frecuentes(grado, curso)
+        if (grado, curso, normalizar_pregunta(pregunta)) not in ya_hechas
+    ]
+
+    def _responder(tarea):
+        grado, curso, pregunta = tarea
+        try:
+            respuesta = procesar(pregunta, grado, curso, f"banco_{uuid.uuid4().hex}")
+        except Exception as e:
+            respuesta = f"❌ {type(e).__name__}: {e}"
+        return grado, curso, pregunta, respuesta
+
+    inicio = time.perf_counter()
+    nuevas, rechazadas = [], 0
+    with ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="eva-banco") as pool:
+        for grado, curso, pregunta, respuesta in pool.map(_responder, pendientes):
+            if respuesta.startswith("✅"):
+                nuevas.append({
+                    "grado": grado, "curso": curso, "pregunta": pregunta,
+                    "normalizada": normalizar_pregunta(pregunta), "respuesta": respuesta,
+                })
+            else:
+                rechazadas += 1
+                print(f"⚠️ Sin respuesta para [{grado} · {curso}] {pregunta}: {respuesta[:80]}")
+
+    entradas = existentes + nuevas
+    guardar_banco(entradas, destino)
+    if os.path.abspath(destino) == os.path.abspath(RUTA_BANCO):
+        recargar_banco()
+    reporte = {
+        "preguntas": len(pendientes),
+        "nuevas": len(nuevas),
+        "rechazadas": rechazadas,
+        "entradas": len(entradas),
+        "segundos": round(time.perf_counter() - inicio, 1),
+        "tamano_bytes": sum(os.path.getsize(os.path.join(destino, a)) for a in ("banco.jsonl", "nucleos.npy")),
+    }
+    print(
+        f"🏦 Banco de respuestas: {reporte['nuevas']} nuevas, {reporte['rechazadas']} rechazadas, "
+        f"{reporte['entradas']} en total ({reporte['tamano_bytes'] / 1e6:.2f} MB) en {reporte['segundos']}s"
+    )
+    return reporte
+
+
+# ----------------------------------------------------
+# 5. EJECUCIÓN
+# ----------------------------------------------------
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pregenera respuestas para las preguntas frecuentes de cada grado × curso.")
+    parser.add_argument("--grados", nargs="*")
+    parser.add_argument("--cursos", nargs="*")
+    parser.add_argument("--hilos", type=int, default=4)
+    parser.add_argument("--listar", action="store_true", help="Solo muestra las preguntas que se generarían.")
+    args = parser.parse_args()
+
+    if args.listar:
+        for grado, curso in celdas(args.grados, args.cursos):
+            for pregunta in preguntas_frecuentes(grado, curso):
+                print(f"{grado} · {curso} · {pregunta}")
+        return
+
+    # Cada pregunta debe recorrer el flujo real: ni la caché ni el propio banco responden
+    os.environ["EVA_CACHE_RESPUESTAS"] = "0"
+    os.environ["EVA_BANCO_RESPUESTAS"] = "0"
+    import main as eva
+
+    generar_banco(eva.procesar_pregunta, args.grados, args.cursos, hilos=args.hilos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# app/cache_respuestas.py
+# =====================================================
+# 🔹 EVA - Caché Semántica de Respuestas (antes de procesar_pregunta)
+# =====================================================
+# Clave exacta (grado, curso, pregunta normalizada) + búsqueda del vecino más
+# cercano por embeddings dentro del mismo grado/curso. Con TTL, desalojo LRU
+# y contadores de aciertos/fallos para ajustar el umbral de similitud.
+#
+# Solo se cachean preguntas autocontenidas: las cortas o las que dependen de
+# la conversación ("dame otro ejemplo", "¿y el siguiente paso?") se responden
+# siempre con el historial de la sesión. Un vecino semántico solo vale si
+# tiene exactamente los mismos números que la pregunta (base 4 ≠ base 5).
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from App.clasificador_curso import tokenizar
+from Tools.embeddings import vectorizar_texto
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+CACHE_ACTIVA = os.getenv("EVA_CACHE_RESPUESTAS", "1") == "1"
+UMBRAL_SIMILITUD = float(os.getenv("EVA_CACHE_UMBRAL", "0.9"))
+TTL_SEGUNDOS = float(os.getenv("EVA_CACHE_TTL", str(24 * 3600)))
+MAX_ENTRADAS = int(os.getenv("EVA_CACHE_MAX", "5000"))
+MARGEN_CASI_ACIERTO = 0.05  # fallos con similitud en [umbral - margen, umbral)
+MIN_PALABRAS_CACHEABLE = 3
+
+# Palabras (normalizadas) que remiten a turnos anteriores de la conversación
+MARCADORES_CONTEXTO = {
+    "otro", "otra", "otros", "otras", "siguiente", "anterior", "anteriormente", "eso", "esto",
+    "aquello", "mismo", "misma", "dijiste", "explicaste", "mencionaste", "ultimo", "ultima",
+    "repite", "repiteme", "continua", "sigue", "tambien", "mas",
+}
+
+
+def normalizar_pregunta(pregunta: str) -> str:
+    """Forma canónica de la pregunta: sin tildes, signos ni mayúsculas."""
+    return " ".join(tokenizar(pregunta))
+
+
+def depende_del_contexto(pregunta: str) -> bool:
+    """True si la pregunta es corta o remite a la conversación ("¿y el siguiente?", "otro ejemplo")."""
+    tokens = tokenizar(pregunta)
+    return (
+        len(tokens) < MIN_PALABRAS_CACHEABLE
+        or tokens[0] == "y"
+        or any(token in MARCADORES_CONTEXTO for token in tokens)
+    )
+
+
+def numeros_de(normalizada: str) -> Tuple[str, ...]:
+    """Números de la pregunta normalizada, en orden: dos preguntas solo son la misma si coinciden."""
+    return tuple(re.findall(r"\d+", normalizada))
+
+
+# ----------------------------------------------------
+# 2. CACHÉ
+# ----------------------------------------------------
+class CacheSemantica:
+    """
+    Caché LRU con TTL y coincidencia por similitud coseno dentro de cada (grado, curso),
+    restringida a preguntas con los mismos números.
+    """
+
+    def __init__(
+        self,
+        umbral: float = UMBRAL_SIMILITUD,
+        ttl_segundos: Optional[float] = TTL_SEGUNDOS,
+        max_entradas: Optional[int] = MAX_ENTRADAS,
+        vectorizar: Callable[[str], np.ndarray] = vectorizar_texto,
+    ):
+        self.umbral = umbral
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.vectorizar = vectorizar
+        self._lock = threading.Lock()
+        # clave -> {"respuesta", "vector", "numeros", "creado"}; el orden es el de uso (LRU)
+        self._entradas: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        # (grado, curso) -> claves de ese grupo, para la búsqueda por vecinos
+        self._grupos: Dict[Tuple[str, str], set] = {}
+        self._contadores = {
+            "aciertos_exactos": 0,
+            "aciertos_semanticos": 0,
+            "fallos": 0,
+            "casi_aciertos": 0,
+            "expirados": 0,
+            "desalojados": 0,
+            "no_cacheables": 0,
+        }
+
+    def _expirada(self, entrada: Dict[str, Any], ahora: float) -> bool:
+        return self.ttl_segundos is not None and ahora - entrada["creado"] > self.ttl_segundos
+
+    def _eliminar(self, clave: Tuple[str, str, str]):
+        self._entradas.pop(clave, None)
+        grupo = self._grupos.get(clave[:2])
+        if grupo is not None:
+            grupo.discard(clave)
+
+    def buscar(self, grado: str, curso: str, pregunta: str) -> Optional[str]:
+        """Devuelve la respuesta cacheada (exacta o casi duplicada) o None."""
+        if depende_del_contexto(pregunta):
+            with self._lock:
+                self._contadores["no_cacheables"] += 1
+            return None
+
+        normalizada = normalizar_pregunta(pregunta)
+        numeros = numeros_de(normalizada)
+        clave = (grado, curso, normalizada)
+        ahora = time.time()
+
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if not self._expirada(entrada, ahora):
+                    self._entradas.move_to_end(clave)
+                    self._contadores["aciertos_exactos"] += 1
+                    return entrada["respuesta"]
+                self._eliminar(clave)
+                self._contadores["expirados"] += 1
+
+            candidatas = list(self._grupos.get((grado, curso), ()))
+
+        mejor_clave, mejor_similitud = None, -1.0
+        if candidatas:
+            vector = self.vectorizar(normalizada)
+            with self._lock:
+                for candidata in candidatas:
+                    entrada = self._entradas.get(candidata)
+                    if entrada is None or entrada["numeros"] != numeros:
+                        continue
+                    similitud = float(np.dot(vector, entrada["vector"]))
+                    if similitud > mejor_similitud:
+                        mejor_clave, mejor_similitud = candidata, similitud
+
+        with self._lock:
+            if mejor_clave is not None and mejor_similitud >= self.umbral:
+                entrada = self._entradas.get(mejor_clave)
+                if entrada is not None and not self._expirada(entrada, ahora):
+                    self._entradas.move_to_end(mejor_clave)
+                    self._contadores["aciertos_semanticos"] += 1
+                    return entrada["respuesta"]
+
+            self._contadores["fallos"] += 1
+            if mejor_similitud >= self.umbral - MARGEN_CASI_ACIERTO:
+                self._contadores["casi_aciertos"] += 1
+            return None
+
+    def guardar(self, grado: str, curso: str, pregunta: str, respuesta: str):
+        """Guarda una respuesta y desaloja la menos usada si se supera max_entradas."""
+        if depende_del_contexto(pregunta):
+            return
+        normalizada = normalizar_pregunta(pregunta)
+        clave = (grado, curso, normalizada)
+        vector = self.vectorizar(normalizada)
+
+        with self._lock:
+            self._entradas[clave] = {
+                "respuesta": respuesta, "vector": vector, "numeros": numeros_de(normalizada), "creado": time.time(),
+            }
+            self._entradas.move_to_end(clave)
+            self._grupos.setdefault((grado, curso), set()).add(clave)
+
+            while self.max_entradas is not None and len(self._entradas) > self.max_entradas:
+                clave_antigua = next(iter(self._entradas))
+                self._eliminar(clave_antigua)
+                self._contadores["desalojados"] += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de aciertos/fallos y tasa de acierto actual."""
+        with self._lock:
+            datos = dict(self._contadores)
+            datos["entradas"] = len(self._entradas)
+        aciertos = datos["aciertos_exactos"] + datos["aciertos_semanticos"]
+        total = aciertos + datos["fallos"]
+        datos["tasa_acierto"] = aciertos / total if total else 0.0
+        datos["umbral"] = self.umbral
+        return datos
@@ -0,0 +1,201 @@
+# app/clasificador_curso.py
+# =====================================================
+# 🔹 EVA - Clasificador Local de Curso (ruta rápida antes de curso_chain)
+# =====================================================
+# Reglas de palabras clave + Naive Bayes multinomial entrenado con las
+# descripciones de cursos, preguntas semilla y las preguntas ya etiquetadas
+# por curso_chain (Logs/preguntas_clasificadas.jsonl). Solo si la confianza
+# es baja el validador recurre al LLM.
+
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from App.config import LOGS_DIR
+from App.courses_data import descripcion_cursos
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+CURSOS = ["Matemática", "Comunicación", "Ciencia y Tecnología", "Educación para el Trabajo", "Inglés"]
+
+UMBRAL_CONFIANZA = float(os.getenv("EVA_UMBRAL_CLASIFICADOR", "0.85"))
+PESO_PALABRA_CLAVE = 2.5
+# Registro de preguntas ya clasificadas (reentrena el modelo al arrancar); vacío = no se registra
+RUTA_PREGUNTAS_CLASIFICADAS = os.getenv(
+    "EVA_CLASIFICADOR_REGISTROS", os.path.join(LOGS_DIR, "preguntas_clasificadas.jsonl")
+) or None
+
+# Palabras clave (sin tildes, en minúscula) que delatan el curso casi sin ambigüedad.
+# Quedan fuera las palabras vacías del inglés (the, is, what…) y las que se usan igual
+# en varios cursos (proyecto, texto, simple, área, función…): esas las decide el modelo.
+PALABRAS_CLAVE = {
+    "Matemática": [
+        "ecuacion", "ecuaciones", "fraccion", "fracciones", "decimal", "decimales", "porcentaje",
+        "algebra", "algebraica", "geometria", "triangulo", "perimetro", "angulo", "potencia", "potencias", "raiz", "cuadrada", "proporcionalidad", "proporcion",
+        "suma", "resta", "multiplicacion", "division", "calcula", "calcular", "resuelve", "despeja",
+        "polinomio", "teorema", "pitagoras", "probabilidad", "estadistica", "mcm", "mcd",
+    ],
+    "Comunicación": [
+        "narrativo", "argumentativo", "expositivo", "informativo", "parrafo",
+        "ensayo", "redaccion", "redacta", "ortografia", "tilde", "tildes", "gramatica", "sustantivo",
+        "adjetivo", "oracion", "sujeto", "predicado", "cuento", "poema", "fabula", "leyenda",
+        "metafora", "sinonimo", "antonimo", "lectura", "lectora", "conectores", "coherencia",
+    ],
+    "Ciencia y Tecnología": [
+        "fotosintesis", "celula", "celulas", "ecosistema", "atomo", "molecula", "energia",
+        "experimento", "quimica", "quimico", "fisica", "genetica", "adn", "gen", "organismo",
+        "digestivo", "respiratorio", "circulatorio", "planeta", "fuerza", "gravedad",
+        "climatico", "ambiental", "contaminacion", "bacteria", "virus", "mezcla",
+    ],
+    "Educación para el Trabajo": [
+        "emprendimiento", "emprender", "negocio", "excel", "word", "powerpoint",
+        "ofimatica", "computadora", "programacion", "programar", "python", "scratch", "algoritmo",
+        "software", "hardware", "internet", "presupuesto", "marketing", "prototipo",
+    ],
+    "Inglés": [
+        "ingles", "english", "traduce", "traducir", "traduccion", "vocabulary", "vocabulario",
+        "verb", "tense", "continuous", "meaning", "speaking", "greeting", "grammar",
+    ],
+}
+
+# Preguntas semilla para arrancar el modelo antes de tener registros
+PREGUNTAS_SEMILLA = {
+    "Matemática": [
+        "cómo resuelvo una ecuación lineal", "qué es una fracción", "cómo se calcula el área de un triángulo",
+        "qué es el teorema de pitágoras", "cómo saco el porcentaje de un número", "qué es una función lineal",
+    ],
+    "Comunicación": [
+        "qué es un texto argumentativo", "dame un ejemplo de texto narrativo", "corrige mi párrafo",
+        "qué es una metáfora", "cómo redactar un ensayo", "cuándo se pone tilde",
+    ],
+    "Ciencia y Tecnología": [
+        "qué es la fotosíntesis", "cómo funciona el sistema digestivo", "qué es una célula",
+        "propón un experimento sobre la energía", "cuál es el impacto de la contaminación del agua",
+        "qué es el adn",
+    ],
+    "Educación para el Trabajo": [
+        "cómo planifico un proyecto de emprendimiento", "qué es excel", "cómo hago un presupuesto",
+        "qué es un algoritmo en programación", "evalúa mi proyecto de reciclaje", "cómo usar word",
+    ],
+    "Inglés": [
+        "qué significa apple en inglés", "explain the present simple", "cómo se dice hola en inglés",
+        "what is the past tense of go", "dame un ejercicio del verbo to be", "traduce good morning",
+    ],
+}
+
+
+# ----------------------------------------------------
+# 2. NORMALIZACIÓN Y TOKENIZACIÓN
+# ----------------------------------------------------
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.split())
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Devuelve los tokens alfanuméricos de un texto normalizado."""
+    return re.findall(r"[a-z0-9ñ]+", normalizar_texto(texto))
+
+
+# ----------------------------------------------------
+# 3. CLASIFICADOR
+# ----------------------------------------------------
+class ClasificadorCurso:
+    """Naive Bayes multinomial con refuerzo por palabras clave y aprendizaje incremental."""
+
+    def __init__(self, ruta_registros: Optional[str] = RUTA_PREGUNTAS_CLASIFICADAS):
+        self.ruta_registros = ruta_registros
+        self._lock = threading.Lock()
+        self._conteos: Dict[str, Counter] = defaultdict(Counter)
+        self._total_tokens: Counter = Counter()
+        self._documentos: Counter = Counter()
+        self._vocabulario = set()
+        self._exportador = None  # escritura del registro en disco, por lotes y en segundo plano
+        self._palabras_clave = {
+            curso: set(palabras) for curso, palabras in PALABRAS_CLAVE.items()
+        }
+        self._entrenar_inicial()
+
+    def _entrenar_inicial(self):
+        for descripciones in descripcion_cursos.values():
+            for curso, descripcion in descripciones.items():
+                self._aprender(descripcion, curso)
+        for curso, preguntas in PREGUNTAS_SEMILLA.items():
+            for pregunta in preguntas:
+                self._aprender(pregunta, curso)
+
+        if self.ruta_registros and os.path.exists(self.ruta_registros):
+            with open(self.ruta_registros, "r", encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue
+                    if registro.get("curso") in CURSOS:
+                        self._aprender(registro.get("pregunta", ""), registro["curso"])
+
+    def _aprender(self, texto: str, curso: str):
+        tokens = tokenizar(texto)
+        self._conteos[curso].update(tokens)
+        self._total_tokens[curso] += len(tokens)
+        self._documentos[curso] += 1
+        self._vocabulario.update(tokens)
+
+    def predecir(self, pregunta: str) -> Tuple[Optional[str], float]:
+        """
+        Devuelve (curso, confianza). La confianza es la probabilidad a posteriori del curso ganador.
+        Las palabras clave solo refuerzan cuando todas apuntan al mismo curso; si la pregunta
+        mezcla palabras clave de varios cursos decide solo Naive Bayes (y, con poca
+        confianza, el LLM).
+        """
+        tokens = tokenizar(pregunta)
+        if not tokens:
+            return None, 0.0
+
+        cursos_con_clave = {curso for curso in CURSOS if self._palabras_clave[curso].intersection(tokens)}
+        reforzar = len(cursos_con_clave) == 1
+
+        with self._lock:
+            total_docs = sum(self._documentos.values())
+            tam_vocabulario = len(self._vocabulario) + 1
+            puntajes = {}
+            for curso in CURSOS:
+                puntaje = math.log((self._documentos[curso] + 1) / (total_docs + len(CURSOS)))
+                denominador = self._total_tokens[curso] + tam_vocabulario
+                conteos = self._conteos[curso]
+                for token in tokens:
+                    puntaje += math.log((conteos[token] + 1) / denominador)
+                    if reforzar and token in self._palabras_clave[curso]:
+                        puntaje += PESO_PALABRA_CLAVE
+                puntajes[curso] = puntaje
+
+        maximo = max(puntajes.values())
+        exponenciales = {curso: math.exp(p - maximo) for curso, p in puntajes.items()}
+        suma = sum(exponenciales.values())
+        curso = max(exponenciales, key=exponenciales.get)
+        return curso, exponenciales[curso] / suma
+
+    def registrar(self, pregunta: str, curso: str):
+        """
+        Incorpora una pregunta etiquetada (por el LLM) al modelo y la encola para el
+        registro en disco. Nunca hace E/S en el hilo que llama (ni en el event loop).
+        """
+        if curso not in CURSOS or not pregunta.strip():
+            return
+        with self._lock:
+            self._aprender(pregunta, curso)
+            if self.ruta_registros and self._exportador is None:
+                from App.trazas import ExportadorLotes
+                self._exportador = ExportadorLotes(ruta=self.ruta_registros, url_colector="")
+                atexit.register(self._exportador.cerrar)
+        if self._exportador is not None:
+            self._exportador.enviar({"pregunta": pregunta, "curso": curso})
@@ -0,0 +1,279 @@
+# app/clientes_llm.py
+# =====================================================
+# 🔹 EVA - Registro Compartido de Clientes LLM (pool HTTP keep-alive)
+# =====================================================
+# Un único ChatOpenAI por (modelo, temperatura) y un único pool HTTP para
+# todo el proceso: validador, agentes y herramientas reutilizan las mismas
+# conexiones TLS en lugar de abrir un cliente nuevo en cada llamada.
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import httpx
+
+from App.limitador import CODIGOS_REINTENTABLES, LIMITADOR_ACTIVO, MAX_REINTENTOS, obtener_limitador
+from App.metricas import MANEJADOR_METRICAS, METRICAS_ACTIVAS
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# ----------------------------------------------------
+# 1. PARÁMETROS DEL POOL
+# ----------------------------------------------------
+MAX_CONEXIONES = int(os.getenv("EVA_POOL_MAX_CONEXIONES", "64"))
+MAX_CONEXIONES_KEEPALIVE = int(os.getenv("EVA_POOL_MAX_KEEPALIVE", "32"))
+EXPIRACION_KEEPALIVE = float(os.getenv("EVA_POOL_KEEPALIVE_SEGUNDOS", "90"))
+CONEXIONES_PRECALENTADAS = int(os.getenv("EVA_POOL_PRECALENTAR", "4"))
+URL_BASE_OPENAI = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+_lock = threading.Lock()
+_clientes: Dict[Tuple, Any] = {}  # ChatOpenAI; langchain_openai se importa al crear el primero
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_estadisticas = {"clientes_creados": 0, "reutilizaciones": 0, "peticiones_http": 0, "precalentadas": 0}
+
+
+def _contar_peticion(request):
+    with _lock:
+        _estadisticas["peticiones_http"] += 1
+
+
+async def _contar_peticion_async(request):
+    _contar_peticion(request)
+
+
+def _limites() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONEXIONES,
+        max_keepalive_connections=MAX_CONEXIONES_KEEPALIVE,
+        keepalive_expiry=EXPIRACION_KEEPALIVE,
+    )
+
+
+# ----------------------------------------------------
+# 1b. TRANSPORTE CON LIMITADOR (cuota, AIMD y reintentos)
+# ----------------------------------------------------
+# Todas las llamadas a OpenAI (validador, agentes y herramientas) pasan por estos
+# clientes HTTP, así que el limitador se aplica aquí, en el transporte.
+def _limitador_para(request: httpx.Request):
+    clave = request.headers.get("authorization", "").removeprefix("Bearer ")
+    return obtener_limitador("openai", clave)
+
+
+def _estimar_tokens(request: httpx.Request) -> float:
+    """Tokens de la petición (~4 caracteres por token) más los de salida solicitados."""
+    try:
+        cuerpo = request.content
+    except httpx.RequestNotRead:
+        return 0.0
+    if not cuerpo:
+        return 0.0
+    salida = 512
+    try:
+        datos = json.loads(cuerpo)
+        salida = datos.get("max_completion_tokens") or datos.get("max_tokens") or salida
+    except (ValueError, AttributeError):
+        pass
+    return len(cuerpo) / 4 + salida
+
+
+def _es_reintentable(respuesta: Optional[httpx.Response]) -> bool:
+    return respuesta is None or respuesta.status_code in CODIGOS_REINTENTABLES
+
+
+class TransporteLimitado(httpx.BaseTransport):
+    def __init__(self, interno: httpx.HTTPTransport):
+        self.interno = interno
+        self._pool = interno._pool  # para estadisticas_pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        limitador, tokens = _limitador_para(request), _estimar_tokens(request)
+        for intento in range(MAX_REINTENTOS + 1):
+            respuesta = None
+            with limitador.permiso(tokens) as resultado:
+                try:
+                    respuesta = self.interno.handle_request(request)
+                except (httpx.TimeoutException, httpx.NetworkError):
+                    resultado.marcar(error=True)
+                    if intento == MAX_REINTENTOS:
+                        raise
+                else:
+                    resultado.marcar(limitado=respuesta.status_code == 429, error=respuesta.status_code >= 500)
+                    if not _es_reintentable(respuesta) or intento == MAX_REINTENTOS:
+                        return respuesta
+            espera = limitador.espera_reintento(intento, respuesta.headers.get("retry-after") if respuesta else None)
+            if respuesta is not None:
+                respuesta.close()
+            time.sleep(espera)
+
+    def close(self):
+        self.interno.close()
+
+
+class TransporteLimitadoAsync(httpx.AsyncBaseTransport):
+    def __init__(self, interno: httpx.AsyncHTTPTransport):
+        self.interno = interno
+        self._pool = interno._pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limitador, tokens = _limitador_para(request), _estimar_tokens(request)
+        for intento in range(MAX_REINTENTOS + 1):
+            respuesta = None
+            async with limitador.apermiso(tokens) as resultado:
+                try:
+                    respuesta = await self.interno.handle_async_request(request)
+                except (httpx.TimeoutException, httpx.NetworkError):
+                    resultado.marcar(error=True)
+                    if intento == MAX_REINTENTOS:
+                        raise
+                else:
+                    resultado.marcar(limitado=respuesta.status_code == 429, error=respuesta.status_code >= 500)
+                    if not _es_reintentable(respuesta) or intento == MAX_REINTENTOS:
+                        return respuesta
+            espera = limitador.espera_reintento(intento, respuesta.headers.get("retry-after") if respuesta else None)
+            if respuesta is not None:
+                await respuesta.aclose()
+            await asyncio.sleep(espera)
+
+    async def aclose(self):
+        await self.interno.aclose()
+
+
+def obtener_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Devuelve los clientes HTTP (síncrono y asíncrono) compartidos por todo el proceso."""
+    global _http_client, _http_async_client
+    with _lock:
+        if _http_client is None:
+            transporte = httpx.HTTPTransport(limits=_limites())
+            transporte_async = httpx.AsyncHTTPTransport(limits=_limites())
+            if LIMITADOR_ACTIVO:
+                transporte = TransporteLimitado(transporte)
+                transporte_async = TransporteLimitadoAsync(transporte_async)
+            _http_client = httpx.Client(
+                transport=transporte, timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_contar_peticion]},
+            )
+            _http_async_client = httpx.AsyncClient(
+                transport=transporte_async, timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_contar_peticion_async]},
+            )
+        return _http_client, _http_async_client
+
+
+# ----------------------------------------------------
+# 2. REGISTRO DE CLIENTES
+# ----------------------------------------------------
+def obtener_llm(modelo: str = "gpt-4o-mini", temperatura: float = 0.0, **extra: Any) -> "ChatOpenAI":
+    """
+    Devuelve el ChatOpenAI compartido para (modelo, temperatura[, extra]).
+    Todos usan el mismo pool HTTP, así que las conexiones keep-alive se reutilizan.
+    """
+    clave = (modelo, float(temperatura), tuple(sorted(extra.items())))
+    with _lock:
+        cliente = _clientes.get(clave)
+        if cliente is not None:
+            _estadisticas["reutilizaciones"] += 1
+            return cliente
+
+    from langchain_openai import ChatOpenAI
+
+    if LIMITADOR_ACTIVO:
+        extra.setdefault("max_retries", 0)  # los reintentos los hace el transporte limitado
+    if METRICAS_ACTIVAS:
+        extra.setdefault("callbacks", [MANEJADOR_METRICAS])  # latencia y tokens por etapa
+    http_client, http_async_client = obtener_http_clients()
+    with _lock:
+        cliente = _clientes.get(clave)
+        if cliente is None:
+            cliente = ChatOpenAI(
+                model=modelo,
+                temperature=temperatura,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **extra,
+            )
+            _clientes[clave] = cliente
+            _estadisticas["clientes_creados"] += 1
+        else:
+            _estadisticas["reutilizaciones"] += 1
+        return cliente
+
+
+# ----------------------------------------------------
+# 3. PRECALENTAMIENTO Y ESTADÍSTICAS
+# ----------------------------------------------------
+def _cabeceras_api() -> Optional[Dict[str, str]]:
+    """Cabeceras para GET /models, o None sin OPENAI_API_KEY (no hay nada que precalentar)."""
+    clave = os.getenv("OPENAI_API_KEY")
+    return {"Authorization": f"Bearer {clave}"} if clave else None
+
+
+def precalentar_conexiones(cantidad: int = CONEXIONES_PRECALENTADAS) -> int:
+    """
+    Abre `cantidad` conexiones TLS en paralelo contra la API (GET /models, sin costo)
+    para que las primeras peticiones reales no paguen el handshake. Devuelve las abiertas.
+    """
+    cabeceras = _cabeceras_api()
+    if cabeceras is None:
+        return 0
+    http_client, _ = obtener_http_clients()
+    abiertas = []
+
+    def _abrir():
+        try:
+            http_client.get(f"{URL_BASE_OPENAI}/models", headers=cabeceras)
+            abiertas.append(1)
+        except httpx.HTTPError as e:
+            print(f"   ⚠️ No se pudo precalentar una conexión: {e}")
+
+    hilos = [threading.Thread(target=_abrir, daemon=True) for _ in range(cantidad)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    with _lock:
+        _estadisticas["precalentadas"] += len(abiertas)
+    return len(abiertas)
+
+
+async def aprecalentar_conexiones(cantidad: int = CONEXIONES_PRECALENTADAS) -> int:
+    """
+    Igual que precalentar_conexiones, pero sobre el pool asíncrono. Sus conexiones quedan
+    ligadas al event loop, así que se llama desde el loop que luego atiende las preguntas.
+    """
+    cabeceras = _cabeceras_api()
+    if cabeceras is None:
+        return 0
+    _, http_async_client = obtener_http_clients()
+
+    async def _abrir() -> int:
+        try:
+            await http_async_client.get(f"{URL_BASE_OPENAI}/models", headers=cabeceras)
+            return 1
+        except httpx.HTTPError as e:
+            print(f"   ⚠️ No se pudo precalentar una conexión async: {e}")
+            return 0
+
+    abiertas = sum(await asyncio.gather(*(_abrir() for _ in range(cantidad))))
+    with _lock:
+        _estadisticas["precalentadas"] += abiertas
+    return abiertas
+
+
+def estadisticas_pool() -> Dict[str, Any]:
+    """Clientes creados/reutilizados, peticiones HTTP y conexiones vivas en el pool."""
+    with _lock:
+        datos = dict(_estadisticas)
+        datos["clientes_registrados"] = len(_clientes)
+        http_client = _http_client
+
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    conexiones = list(getattr(pool, "connections", []) or [])
+    datos["conexiones_abiertas"] = len(conexiones)
+    datos["conexiones_ociosas"] = sum(1 for c in conexiones if c.is_idle())
+    return datos
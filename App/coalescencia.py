@@ -0,0 +1,238 @@
+# app/coalescencia.py
+# =====================================================
+# 🔹 EVA - Coalescencia de Peticiones Idénticas en Curso (single-flight)
+# =====================================================
+# Cuando 30 estudiantes envían a la vez la pregunta que el docente proyecta,
+# solo la primera (el "líder") ejecuta el flujo; las demás con la misma clave
+# normalizada esperan ese cálculo y reciben el mismo resultado.
+#
+# Semántica:
+#   - Solo se agrupan llamadas simultáneas: al terminar el líder la clave se
+#     libera y la siguiente llamada calcula de nuevo (la reutilización
+#     posterior es trabajo de las cachés).
+#   - Fallo: la excepción del líder se propaga a todos los que esperaban; no
+#     reintentan por su cuenta (30 reintentos simultáneos es justo lo que se
+#     quiere evitar). Las respuestas de error en texto ("❌ ...") se comparten
+#     igual que cualquier otro resultado.
+#   - Espera máxima: si el líder tarda más de `espera_max_s`, el seguidor deja
+#     de esperar y calcula por su cuenta; el líder sigue y su resultado llega
+#     solo a quienes sigan esperando.
+#   - Cancelación (async): si se cancela el líder, sus seguidores calculan por
+#     su cuenta; si se cancela un seguidor, el líder no se ve afectado.
+#   - Streaming (ejecutar_eventos): el líder reenvía sus eventos a su llamador;
+#     los seguidores reciben solo el resultado final, como un único evento. Si
+#     el líder termina sin resultado (la UI abandonó el stream), calculan por
+#     su cuenta.
+# Las llamadas síncronas y asíncronas se agrupan por separado; las síncronas y
+# las de streaming comparten vuelos (ambas guardan el mismo tipo de resultado).
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional
+
+from App.metricas import REGISTRO
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+COALESCENCIA_ACTIVA = os.getenv("EVA_COALESCENCIA", "1") == "1"
+ESPERA_MAX_PREGUNTAS_S = float(os.getenv("EVA_COALESCENCIA_ESPERA_S", "120"))
+ESPERA_MAX_HERRAMIENTAS_S = float(os.getenv("EVA_COALESCENCIA_HERRAMIENTAS_ESPERA_S", "60"))
+
+
+# ----------------------------------------------------
+# 2. GRUPO DE VUELOS
+# ----------------------------------------------------
+class _Vuelo:
+    """Un cálculo en curso: los seguidores esperan su evento."""
+
+    __slots__ = ("evento", "resultado", "completo", "error", "seguidores")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.completo = False  # False si el líder terminó sin resultado (stream abandonado)
+        self.error: Optional[BaseException] = None
+        self.seguidores = 0
+
+
+class GrupoVuelos:
+    """Agrupa llamadas concurrentes con la misma clave en un solo cálculo."""
+
+    def __init__(self, nombre: str, espera_max_s: float):
+        self.nombre = nombre
+        self.espera_max_s = espera_max_s
+        self._lock = threading.Lock()
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self._vuelos_async: Dict[Hashable, asyncio.Future] = {}
+        self.contadores = {
+            "lideres": 0, "coalescidas": 0, "esperas_agotadas": 0, "errores_compartidos": 0, "sin_resultado": 0,
+        }
+
+    def _contar(self, clave: str):
+        with self._lock:
+            self.contadores[clave] += 1
+        REGISTRO.sumar("eva_coalescencia_total", grupo=self.nombre, resultado=clave)
+
+    def _unirse(self, clave: Hashable):
+        """(vuelo, True si esta llamada es la líder)."""
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+            else:
+                vuelo.seguidores += 1
+        if lider:
+            self._contar("lideres")
+        return vuelo, lider
+
+    def _aterrizar(self, clave: Hashable, vuelo: _Vuelo):
+        with self._lock:
+            if self._vuelos.get(clave) is vuelo:
+                del self._vuelos[clave]
+        vuelo.evento.set()
+
+    def _esperar(self, vuelo: _Vuelo) -> bool:
+        """True si hay un resultado del líder que compartir; False si el seguidor debe calcular."""
+        if not vuelo.evento.wait(self.espera_max_s):
+            self._contar("esperas_agotadas")
+            return False
+        if vuelo.error is not None:
+            self._contar("errores_compartidos")
+            raise vuelo.error
+        if not vuelo.completo:
+            self._contar("sin_resultado")
+            return False
+        self._contar("coalescidas")
+        return True
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[[], Any]) -> Any:
+        """Devuelve funcion() o, si ya hay un cálculo con esa clave en curso, su resultado."""
+        if not COALESCENCIA_ACTIVA:
+            return funcion()
+
+        vuelo, lider = self._unirse(clave)
+        if lider:
+            try:
+                vuelo.resultado = funcion()
+                vuelo.completo = True
+                return vuelo.resultado
+            except BaseException as e:
+                vuelo.error = e
+                raise
+            finally:
+                self._aterrizar(clave, vuelo)
+
+        return vuelo.resultado if self._esperar(vuelo) else funcion()
+
+    def ejecutar_eventos(
+        self,
+        clave: Hashable,
+        generar: Callable[[], Iterator[Any]],
+        resultado_de: Callable[[Any], Any],
+        evento_de: Callable[[Any], Any],
+    ) -> Iterator[Any]:
+        """
+        Versión para generadores de eventos. El líder reenvía los eventos de generar() y
+        comparte el primero para el que resultado_de(evento) no es None; los seguidores
+        emiten solo evento_de(resultado).
+        """
+        if not COALESCENCIA_ACTIVA:
+            yield from generar()
+            return
+
+        vuelo, lider = self._unirse(clave)
+        if lider:
+            try:
+                for evento in generar():
+                    resultado = resultado_de(evento)
+                    if resultado is not None and not vuelo.completo:
+                        vuelo.resultado, vuelo.completo = resultado, True
+                        self._aterrizar(clave, vuelo)  # los seguidores no esperan al resto del stream
+                    yield evento
+            except Exception as e:
+                vuelo.error = e
+                raise
+            finally:
+                self._aterrizar(clave, vuelo)
+            return
+
+        if self._esperar(vuelo):
+            yield evento_de(vuelo.resultado)
+        else:
+            yield from generar()
+
+    async def aejecutar(self, clave: Hashable, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        """Versión asíncrona: `fabrica` crea la corrutina solo si esta llamada es la líder."""
+        if not COALESCENCIA_ACTIVA:
+            return await fabrica()
+
+        futuro = self._vuelos_async.get(clave)
+        if futuro is None:
+            futuro = self._vuelos_async[clave] = asyncio.get_running_loop().create_future()
+            self._contar("lideres")
+            try:
+                resultado = await fabrica()
+                futuro.set_result(resultado)
+                return resultado
+            except asyncio.CancelledError:
+                futuro.cancel()
+                raise
+            except BaseException as e:
+                futuro.set_exception(e)
+                futuro.exception()  # marcada como leída aunque nadie esperara
+                raise
+            finally:
+                if self._vuelos_async.get(clave) is futuro:
+                    del self._vuelos_async[clave]
+
+        try:
+            resultado = await asyncio.wait_for(asyncio.shield(futuro), self.espera_max_s)
+        except asyncio.TimeoutError:
+            self._contar("esperas_agotadas")
+            return await fabrica()
+        except asyncio.CancelledError:
+            if not futuro.cancelled():
+                raise  # se canceló este seguidor, no el líder
+            self._contar("esperas_agotadas")
+            return await fabrica()
+        except Exception:
+            self._contar("errores_compartidos")
+            raise
+        self._contar("coalescidas")
+        return resultado
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            datos = dict(self.contadores)
+            datos["en_curso"] = len(self._vuelos) + len(self._vuelos_async)
+        llamadas = (
+            datos["lideres"] + datos["coalescidas"] + datos["esperas_agotadas"]
+            + datos["errores_compartidos"] + datos["sin_resultado"]
+        )
+        datos["tasa_coalescencia"] = (datos["coalescidas"] + datos["errores_compartidos"]) / llamadas if llamadas else 0.0
+        return datos
+
+
+# ----------------------------------------------------
+# 3. GRUPOS COMPARTIDOS
+# ----------------------------------------------------
+_grupos: List[GrupoVuelos] = []
+
+
+def crear_grupo(nombre: str, espera_max_s: float) -> GrupoVuelos:
+    grupo = GrupoVuelos(nombre, espera_max_s)
+    _grupos.append(grupo)
+    return grupo
+
+
+VUELOS_PREGUNTAS = crear_grupo("procesar_pregunta", ESPERA_MAX_PREGUNTAS_S)
+VUELOS_HERRAMIENTAS = crear_grupo("herramienta", ESPERA_MAX_HERRAMIENTAS_S)
+VUELOS_BUSQUEDAS = crear_grupo("busqueda_web", ESPERA_MAX_HERRAMIENTAS_S)
+
+
+def estadisticas_coalescencia() -> Dict[str, Dict[str, Any]]:
+    """Líderes, llamadas coalescidas, esperas agotadas y errores compartidos por grupo."""
+    return {grupo.nombre: grupo.estadisticas() for grupo in _grupos}
@@ -24,10 +24,12 @@ def _load_api_key(filename):
 # 2. FUNCIÓN PRINCIPAL: Carga de Configuración de Entorno
 # =======================================================================
 
-def load_config_and_keys():
+def load_config_and_keys(obligatorio: bool = True):
     """
     Carga todas las claves API y configura las variables de entorno
-    requeridas para OpenAI, LangSmith y Tavily.
+    requeridas para OpenAI y Tavily (y LangSmith si EVA_LANGSMITH=1).
+    Con obligatorio=False (benchmarks y pruebas sin conexión) la falta de
+    claves solo se avisa y el proceso continúa.
     """
     print("🚀 Cargando configuración de entorno...")
 
@@ -36,11 +38,14 @@ def load_config_and_keys():
         os.environ["OPENAI_API_KEY"] = _load_api_key("clave_api.txt")
         print("   ✅ Clave OpenAI cargada.")
 
-        # 📊 LangSmith (Trazabilidad y Observabilidad)
-        os.environ["LANGSMITH_API_KEY"] = _load_api_key("langgraphapi.txt")
-        os.environ["LANGCHAIN_TRACING_V2"] = "true"
-        os.environ["LANGCHAIN_PROJECT"] = "EVA_Project_Tracing"
-        print("   ✅ Configuración de LangSmith cargada.")
+        # 📊 LangSmith (opcional): por defecto las trazas son locales y muestreadas
+        # (App/trazas.py); EVA_LANGSMITH=1 lo activa con la misma tasa de muestreo
+        if os.getenv("EVA_LANGSMITH", "0") == "1":
+            os.environ["LANGSMITH_API_KEY"] = _load_api_key("langgraphapi.txt")
+            os.environ["LANGCHAIN_TRACING_V2"] = "true"
+            os.environ["LANGCHAIN_PROJECT"] = "EVA_Project_Tracing"
+            os.environ.setdefault("LANGSMITH_TRACING_SAMPLING_RATE", os.getenv("EVA_TRAZAS_MUESTREO", "0.05"))
+            print("   ✅ Configuración de LangSmith cargada.")
 
         # 🌐 Tavily (Búsqueda contextual)
         os.environ["TAVILY_API_KEY"] = _load_api_key("tavily_api.txt")
@@ -49,8 +54,14 @@ def load_config_and_keys():
         # 🔧 Aquí puedes añadir futuras integraciones (ej. HuggingFace, SerpAPI, etc.)
 
     except FileNotFoundError as e:
+        if not obligatorio:
+            print(f"   ⚠️ {e} (se continúa sin esta clave)")
+            return
         print(f"🛑 ERROR CRÍTICO: {e}")
         sys.exit(1)
     except Exception as e:
+        if not obligatorio:
+            print(f"   ⚠️ Configuración incompleta: {e} (se continúa)")
+            return
         print(f"🛑 ERROR CRÍTICO durante la carga de configuración: {e}")
         sys.exit(1)
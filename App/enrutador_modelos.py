@@ -0,0 +1,353 @@
+# app/enrutador_modelos.py
+# =====================================================
+# 🔹 EVA - Enrutamiento de Modelos por Etapa y Herramienta
+# =====================================================
+# Tabla (etapa/herramienta → nivel de modelo y temperatura) + una política
+# por complejidad del argumento:
+#   - definición corta               → nivel "rapido" (modelo pequeño)
+#   - solución de varios pasos       → nivel "fuerte"
+#   - resto                          → lo que diga la tabla
+# Si la salida del modelo barato no pasa la validación del esquema (agente
+# sin entregar_respuesta, curso fuera de la lista), se escala al nivel fuerte.
+#
+# Cada decisión se registra (sin bloquear) en logs/enrutamiento.jsonl con su
+# latencia, tokens y costo estimado; resumen_enrutamiento() agrega lo mismo
+# por (clave, modelo) para ajustar la tabla con datos.
+# La tabla se puede sobrescribir con un JSON en EVA_TABLA_MODELOS.
+
+import atexit
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from App.clasificador_curso import normalizar_texto
+from App.clientes_llm import obtener_llm
+from App.config import LOGS_DIR
+from App.metricas import REGISTRO, registrar_observador
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+ENRUTADOR_ACTIVO = os.getenv("EVA_ENRUTADOR", "1") == "1"
+ESCALADO_ACTIVO = os.getenv("EVA_ESCALADO", "1") == "1"
+RUTA_TABLA = os.getenv("EVA_TABLA_MODELOS", "")
+RUTA_DECISIONES = os.getenv("EVA_ENRUTADOR_LOG", os.path.join(LOGS_DIR, "enrutamiento.jsonl"))
+
+MODELOS = {
+    "rapido": os.getenv("EVA_MODELO_RAPIDO", "gpt-4o-mini"),
+    "fuerte": os.getenv("EVA_MODELO_FUERTE", "gpt-4o"),
+}
+
+# USD por millón de tokens (entrada, salida)
+PRECIOS_POR_MILLON = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+# Umbrales de la política por complejidad (en palabras del argumento)
+PALABRAS_DEFINICION_CORTA = 12
+PALABRAS_ENUNCIADO_LARGO = 80
+
+
+# ----------------------------------------------------
+# 2. TABLA DE MODELOS
+# ----------------------------------------------------
+# politica "complejidad": el argumento puede subir o bajar el nivel; "fija": siempre el de la tabla
+TABLA_MODELOS: Dict[str, Dict[str, Any]] = {
+    "validador": {"nivel": "rapido", "temperatura": 0.2, "politica": "fija"},
+
+    "agente:Matemática": {"nivel": "rapido", "temperatura": 0.4, "politica": "fija"},
+    "agente:Comunicación": {"nivel": "rapido", "temperatura": 0.4, "politica": "fija"},
+    "agente:Ciencia y Tecnología": {"nivel": "rapido", "temperatura": 0.35, "politica": "fija"},
+    "agente:Educación para el Trabajo": {"nivel": "rapido", "temperatura": 0.4, "politica": "fija"},
+    "agente:Inglés": {"nivel": "rapido", "temperatura": 0.4, "politica": "fija"},
+
+    # Matemática
+    "resolucion_problemas": {"nivel": "rapido", "temperatura": 0.4, "politica": "complejidad"},
+    "explicacion_concepto": {"nivel": "rapido", "temperatura": 0.4, "politica": "complejidad"},
+    "verificacion_resultado": {"nivel": "rapido", "temperatura": 0.4, "politica": "complejidad"},
+    # Comunicación
+    "comprension_texto": {"nivel": "rapido", "temperatura": 0.15, "politica": "fija"},
+    "produccion_texto": {"nivel": "rapido", "temperatura": 0.45, "politica": "fija"},
+    "validacion_texto": {"nivel": "rapido", "temperatura": 0.0, "politica": "complejidad"},
+    # Ciencia y Tecnología
+    "explicacion_cientifica": {"nivel": "rapido", "temperatura": 0.2, "politica": "complejidad"},
+    "experimento_sugerido": {"nivel": "rapido", "temperatura": 0.45, "politica": "fija"},
+    "analisis_impacto": {"nivel": "rapido", "temperatura": 0.3, "politica": "complejidad"},
+    # Educación para el Trabajo
+    "plan_proyecto": {"nivel": "rapido", "temperatura": 0.25, "politica": "complejidad"},
+    "concepto_tecnologico": {"nivel": "rapido", "temperatura": 0.3, "politica": "fija"},
+    "evaluacion_proyecto": {"nivel": "rapido", "temperatura": 0.2, "politica": "complejidad"},
+    # Inglés
+    "generar_explicacion": {"nivel": "rapido", "temperatura": 0.3, "politica": "fija"},
+    "buscar_vocabulario": {"nivel": "rapido", "temperatura": 0.35, "politica": "fija"},
+    "generar_practica": {"nivel": "rapido", "temperatura": 0.45, "politica": "fija"},
+}
+ENTRADA_POR_DEFECTO = {"nivel": "rapido", "temperatura": 0.3, "politica": "fija"}
+
+
+def _cargar_tabla(ruta: str) -> None:
+    """Sobrescribe entradas de TABLA_MODELOS (y los modelos de cada nivel en la clave "niveles")."""
+    if not ruta or not os.path.exists(ruta):
+        return
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    MODELOS.update(datos.pop("niveles", {}))
+    for clave, entrada in datos.items():
+        TABLA_MODELOS[clave] = {**TABLA_MODELOS.get(clave, ENTRADA_POR_DEFECTO), **entrada}
+
+
+_cargar_tabla(RUTA_TABLA)
+
+
+# ----------------------------------------------------
+# 3. POLÍTICA Y DECISIÓN
+# ----------------------------------------------------
+class Decision(NamedTuple):
+    clave: str
+    nivel: str
+    modelo: str
+    temperatura: float
+    motivo: str  # tabla | definicion_corta | multi_paso | escalado
+
+
+_PATRON_DEFINICION = re.compile(r"^(que es|que son|que significa|define|definicion|concepto de|significado de)\b")
+_PATRON_MULTIPASO = re.compile(
+    r"\b(paso a paso|sistema de ecuaciones|demuestra|demostrar|justifica|inecuacion|factoriza|"
+    r"simplifica|plantea|derivada|integral|compara y|analiza y)\b"
+)
+
+
+def evaluar_complejidad(texto: str) -> Optional[Tuple[str, str]]:
+    """(nivel, motivo) según el argumento, o None si la política no tiene opinión."""
+    normalizado = normalizar_texto(texto)
+    palabras = len(normalizado.split())
+    numeros = len(re.findall(r"\d+(?:[.,]\d+)?", texto))
+    operadores = len(re.findall(r"[+\-*/^=×÷]", texto))
+    if (
+        _PATRON_MULTIPASO.search(normalizado)
+        or texto.count("=") >= 2
+        or (numeros >= 3 and operadores >= 2)
+        or palabras > PALABRAS_ENUNCIADO_LARGO
+    ):
+        return "fuerte", "multi_paso"
+    if palabras <= PALABRAS_DEFINICION_CORTA and (_PATRON_DEFINICION.search(normalizado) or not numeros):
+        return "rapido", "definicion_corta"
+    return None
+
+
+def decidir(clave: str, texto: str = "", escalado: bool = False) -> Decision:
+    """Modelo y temperatura para una etapa o herramienta (y su argumento, si lo hay)."""
+    entrada = TABLA_MODELOS.get(clave, ENTRADA_POR_DEFECTO)
+    nivel, motivo = entrada["nivel"], "tabla"
+    if escalado:
+        nivel, motivo = "fuerte", "escalado"
+    elif ENRUTADOR_ACTIVO and entrada.get("politica") == "complejidad" and texto:
+        nivel, motivo = evaluar_complejidad(texto) or (nivel, motivo)
+    return Decision(clave, nivel, MODELOS[nivel], float(entrada["temperatura"]), motivo)
+
+
+_decision_actual: contextvars.ContextVar[Optional[Decision]] = contextvars.ContextVar("eva_decision", default=None)
+_registro_actual: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("eva_registro_decision", default=None)
+
+
+def llm_para(clave: str, **extra: Any):
+    """
+    ChatOpenAI compartido para `clave`: el de la decisión en curso (dentro de enrutar)
+    o, fuera de ella, el que indica la tabla.
+    """
+    decision = _decision_actual.get()
+    if decision is None or decision.clave != clave:
+        decision = decidir(clave)
+    return obtener_llm(decision.modelo, decision.temperatura, **extra)
+
+
+# ----------------------------------------------------
+# 4. REGISTRO DE DECISIONES, LATENCIA Y COSTO
+# ----------------------------------------------------
+def costo_usd(modelo: str, tokens_prompt: int, tokens_completion: int) -> float:
+    entrada, salida = PRECIOS_POR_MILLON.get(modelo, (0.0, 0.0))
+    return (tokens_prompt * entrada + tokens_completion * salida) / 1e6
+
+
+class ObservadorCostos:
+    """Observador de App/metricas.py: tokens y costo de cada llamada al LLM por (clave, modelo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agregados: Dict[tuple, Dict[str, float]] = {}
+
+    @staticmethod
+    def _clave(tramo: Dict[str, Any]) -> str:
+        if tramo.get("herramienta"):
+            return tramo["herramienta"]
+        if tramo.get("etapa") == "planificacion_agente":
+            return f"agente:{tramo.get('curso', '')}"
+        return "validador" if tramo.get("etapa") in ("deteccion_curso", "cadena4") else tramo.get("etapa", "")
+
+    def en_tramo(self, tramo: Dict[str, Any]) -> None:
+        if not tramo.get("llm"):
+            return
+        prompt, completado = tramo.get("tokens_prompt", 0) or 0, tramo.get("tokens_completion", 0) or 0
+        costo = costo_usd(tramo.get("modelo", ""), prompt, completado)
+        clave = self._clave(tramo)
+        with self._lock:
+            agregado = self._agregados.setdefault((clave, tramo.get("modelo", "")), {
+                "llamadas": 0, "errores": 0, "segundos": 0.0, "tokens_prompt": 0, "tokens_completion": 0, "costo_usd": 0.0,
+            })
+            agregado["llamadas"] += 1
+            agregado["errores"] += 1 if tramo.get("error") else 0
+            agregado["segundos"] += tramo.get("segundos", 0.0)
+            agregado["tokens_prompt"] += prompt
+            agregado["tokens_completion"] += completado
+            agregado["costo_usd"] += costo
+        if costo:
+            REGISTRO.sumar("eva_llm_costo_usd_total", costo, clave=clave, modelo=tramo.get("modelo", ""))
+
+        # Si la llamada ocurre dentro de enrutar(), también se suma a esa decisión
+        registro = _registro_actual.get()
+        if registro is not None:
+            registro["tokens_prompt"] += prompt
+            registro["tokens_completion"] += completado
+            registro["costo_usd"] += costo
+
+    def en_fin_traza(self, identificador: str, segundos: float) -> None:
+        pass
+
+    def resumen(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            filas = [{"clave": c, "modelo": m, **dict(a)} for (c, m), a in self._agregados.items()]
+        for fila in filas:
+            fila["segundos_medios"] = round(fila["segundos"] / fila["llamadas"], 4) if fila["llamadas"] else 0.0
+            fila["costo_medio_usd"] = fila["costo_usd"] / fila["llamadas"] if fila["llamadas"] else 0.0
+        return sorted(filas, key=lambda f: -f["costo_usd"])
+
+
+OBSERVADOR_COSTOS = ObservadorCostos()
+registrar_observador(OBSERVADOR_COSTOS)
+
+_exportador = None
+_exportador_lock = threading.Lock()
+_decisiones = {"decisiones": 0, "escaladas": 0, "por_nivel": {}, "por_motivo": {}}
+
+
+def _registrar(registro: Dict[str, Any]) -> None:
+    """Cuenta la decisión y la encola para logs/enrutamiento.jsonl (nunca bloquea)."""
+    global _exportador
+    with _exportador_lock:
+        _decisiones["decisiones"] += 1
+        _decisiones["escaladas"] += 1 if registro["motivo"] == "escalado" else 0
+        _decisiones["por_nivel"][registro["nivel"]] = _decisiones["por_nivel"].get(registro["nivel"], 0) + 1
+        _decisiones["por_motivo"][registro["motivo"]] = _decisiones["por_motivo"].get(registro["motivo"], 0) + 1
+        if _exportador is None and RUTA_DECISIONES:
+            from App.trazas import ExportadorLotes
+            _exportador = ExportadorLotes(ruta=RUTA_DECISIONES, url_colector="")
+            atexit.register(_exportador.cerrar)
+    REGISTRO.sumar("eva_enrutamiento_decisiones_total", clave=registro["clave"], nivel=registro["nivel"], motivo=registro["motivo"])
+    if _exportador is not None:
+        _exportador.enviar(registro)
+
+
+@contextmanager
+def enrutar(clave: str, texto: str = "", escalado: bool = False):
+    """
+    Decide el modelo de `clave` y lo deja activo para llm_para() dentro del bloque.
+    Al salir registra la decisión con su latencia, tokens, costo y si vino de caché
+    (el bloque puede marcarlo con registro["desde_cache"] = True).
+    """
+    decision = decidir(clave, texto, escalado)
+    registro = {
+        "ts": time.time(), **decision._asdict(), "segundos": 0.0, "desde_cache": False, "error": None,
+        "tokens_prompt": 0, "tokens_completion": 0, "costo_usd": 0.0,
+    }
+    fichas = (_decision_actual.set(decision), _registro_actual.set(registro))
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    except Exception as e:
+        registro["error"] = type(e).__name__
+        raise
+    finally:
+        registro["segundos"] = round(time.perf_counter() - inicio, 4)
+        registro["costo_usd"] = round(registro["costo_usd"], 6)
+        _registro_actual.reset(fichas[1])
+        _decision_actual.reset(fichas[0])
+        _registrar(registro)
+
+
+def resumen_enrutamiento() -> Dict[str, Any]:
+    """Decisiones por nivel y motivo, y latencia/tokens/costo acumulados por (clave, modelo)."""
+    with _exportador_lock:
+        decisiones = json.loads(json.dumps(_decisiones))
+    return {**decisiones, "modelos": dict(MODELOS), "por_clave_modelo": OBSERVADOR_COSTOS.resumen()}
+
+
+# ----------------------------------------------------
+# 5. ESCALADO CUANDO FALLA EL ESQUEMA
+# ----------------------------------------------------
+def _mensajes_escalado(mensajes: Sequence[Any], curso: str) -> Optional[List[Any]]:
+    """Prompt del modelo fuerte a partir del último turno, o None si no hay material."""
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    turno: List[Any] = []
+    for m in reversed(mensajes):
+        turno.insert(0, m)
+        if isinstance(m, HumanMessage):
+            break
+    material = "\n\n".join(
+        f"[{getattr(m, 'name', None) or m.type}] {m.content}" for m in turno if isinstance(m.content, str) and m.content.strip()
+    )
+    if not material:
+        return None
+
+    system = SystemMessage(content=(
+        f"Eres EVA, docente de {curso} para secundaria. A partir de la pregunta del estudiante y del material "
+        "del turno, entrega la respuesta final: explicacion_profunda (explicación detallada) y parrafo_ejemplo "
+        "(ejemplo práctico; vacío si no aplica). No inventes datos que contradigan el material."
+    ))
+    return [system, HumanMessage(content=material)]
+
+
+def _llm_escalado(curso: str):
+    from Agents.esquemas import RespuestaAgente
+    return llm_para(f"agente:{curso}").with_structured_output(RespuestaAgente)
+
+
+def escalar_respuesta(mensajes: Sequence[Any], curso: str):
+    """
+    El agente (modelo rápido) terminó sin una RespuestaAgente válida: el modelo fuerte
+    la reconstruye a partir del turno (pregunta, salidas de herramientas y borrador).
+    Devuelve RespuestaAgente o None si el escalado está desactivado o también falla.
+    """
+    prompt = _mensajes_escalado(mensajes, curso) if ESCALADO_ACTIVO else None
+    if prompt is None:
+        return None
+    with enrutar(f"agente:{curso}", escalado=True) as registro:
+        try:
+            return _llm_escalado(curso).invoke(prompt)
+        except Exception as e:
+            registro["error"] = type(e).__name__
+            print(f"⚠️ Escalado de {curso} fallido: {type(e).__name__}: {e}")
+            return None
+
+
+async def aescalar_respuesta(mensajes: Sequence[Any], curso: str):
+    """Versión asíncrona de escalar_respuesta (no bloquea el event loop mientras responde el modelo fuerte)."""
+    prompt = _mensajes_escalado(mensajes, curso) if ESCALADO_ACTIVO else None
+    if prompt is None:
+        return None
+    with enrutar(f"agente:{curso}", escalado=True) as registro:
+        try:
+            return await _llm_escalado(curso).ainvoke(prompt)
+        except Exception as e:
+            registro["error"] = type(e).__name__
+            print(f"⚠️ Escalado de {curso} fallido: {type(e).__name__}: {e}")
+            return None
@@ -0,0 +1,185 @@
+# app/historial.py
+# =====================================================
+# 🔹 EVA - Ventana de Historial para los Agentes (pre_model_hook)
+# =====================================================
+# El hilo guarda la conversación completa, pero al modelo solo se le envía:
+#   - el turno en curso completo (con sus llamadas a herramientas),
+#   - los últimos N turnos anteriores compactados (pregunta + respuesta final,
+#     sin las llamadas a herramientas ni sus salidas, ya consumidas),
+#   - un resumen extractivo de los turnos más antiguos (sin llamadas al LLM).
+# Los tokens del historial completo y de lo enviado se cuentan por llamada.
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from Agents.esquemas import extraer_respuesta
+from App.metricas import CUBETAS_TOKENS, REGISTRO, curso_actual
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+VENTANA_ACTIVA = os.getenv("EVA_HISTORIAL_VENTANA", "1") == "1"
+TURNOS_COMPLETOS = int(os.getenv("EVA_HISTORIAL_TURNOS", "3"))
+RESUMEN_ACTIVO = os.getenv("EVA_HISTORIAL_RESUMEN", "1") == "1"
+MAX_CARACTERES_RESUMEN = int(os.getenv("EVA_HISTORIAL_MAX_RESUMEN", "1200"))
+MAX_CARACTERES_RESPUESTA = int(os.getenv("EVA_HISTORIAL_MAX_RESPUESTA", "1500"))
+MAX_CARACTERES_PUNTO = 160
+
+_lock = threading.Lock()
+_codificador = None
+_estadisticas = {"llamadas": 0, "tokens_historial": 0, "tokens_enviados": 0}
+
+
+# ----------------------------------------------------
+# 2. CONTEO DE TOKENS
+# ----------------------------------------------------
+def _obtener_codificador():
+    global _codificador
+    if _codificador is None:
+        try:
+            import tiktoken
+            _codificador = tiktoken.get_encoding("o200k_base")  # gpt-4o / gpt-4o-mini
+        except Exception:
+            _codificador = False  # sin tiktoken (o sin red para descargarlo): aproximación
+    return _codificador
+
+
+def contar_tokens(mensajes: List[BaseMessage]) -> int:
+    """Tokens aproximados de una lista de mensajes (contenido + argumentos de herramientas)."""
+    codificador = _obtener_codificador()
+    total = 0
+    for m in mensajes:
+        texto = m.content if isinstance(m.content, str) else str(m.content)
+        for llamada in getattr(m, "tool_calls", None) or []:
+            texto += str(llamada.get("args", ""))
+        total += 4 + (len(codificador.encode(texto)) if codificador else len(texto) // 4)
+    return total
+
+
+# ----------------------------------------------------
+# 3. TURNOS Y COMPACTACIÓN
+# ----------------------------------------------------
+def _dividir_en_turnos(mensajes: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Agrupa los mensajes en turnos; cada turno empieza en un HumanMessage."""
+    turnos: List[List[BaseMessage]] = []
+    for m in mensajes:
+        if isinstance(m, HumanMessage) or not turnos:
+            turnos.append([])
+        turnos[-1].append(m)
+    return turnos
+
+
+def _texto_respuesta(turno: List[BaseMessage]) -> str:
+    """Respuesta final de un turno ya cerrado, en texto plano."""
+    respuesta = extraer_respuesta(turno)
+    if respuesta is not None:
+        return "\n\n".join(t for t in (respuesta.explicacion_profunda, respuesta.parrafo_ejemplo) if t.strip())
+    for m in reversed(turno):
+        if isinstance(m, AIMessage) and isinstance(m.content, str) and m.content.strip():
+            return m.content.strip()
+    return ""
+
+
+def _tema(mensaje: BaseMessage) -> str:
+    """El tema de la pregunta (línea ANALIZA_TEMA del [COMANDO_AGENTE]) o el texto tal cual."""
+    texto = mensaje.content if isinstance(mensaje.content, str) else str(mensaje.content)
+    for linea in texto.splitlines():
+        if linea.startswith("ANALIZA_TEMA:"):
+            return linea.split(":", 1)[1].strip()
+    return texto.strip()
+
+
+def _recortar(texto: str, limite: int) -> str:
+    texto = " ".join(texto.split())
+    return texto if len(texto) <= limite else texto[:limite - 1].rstrip() + "…"
+
+
+def _compactar_turno(turno: List[BaseMessage]) -> List[BaseMessage]:
+    """Pregunta + respuesta final; se descartan las llamadas a herramientas y sus salidas."""
+    pregunta = turno[0] if isinstance(turno[0], HumanMessage) else None
+    respuesta = _texto_respuesta(turno)
+    compactado: List[BaseMessage] = [pregunta] if pregunta is not None else []
+    if respuesta:
+        compactado.append(AIMessage(content=_recortar(respuesta, MAX_CARACTERES_RESPUESTA)))
+    return compactado
+
+
+def _resumir_turnos(turnos: List[List[BaseMessage]]) -> Optional[SystemMessage]:
+    """Resumen extractivo: una línea por turno (tema → primera frase de la respuesta)."""
+    puntos = []
+    for turno in turnos:
+        if not isinstance(turno[0], HumanMessage):
+            continue
+        respuesta = _texto_respuesta(turno)
+        primera_frase = respuesta.split(". ")[0] if respuesta else "(sin respuesta)"
+        puntos.append(f"- {_recortar(_tema(turno[0]), 60)} → {_recortar(primera_frase, MAX_CARACTERES_PUNTO)}")
+
+    # Se conservan los puntos más recientes que quepan en el límite
+    seleccion, largo = [], 0
+    for punto in reversed(puntos):
+        if largo + len(punto) > MAX_CARACTERES_RESUMEN:
+            break
+        seleccion.append(punto)
+        largo += len(punto) + 1
+    if not seleccion:
+        return None
+    return SystemMessage(content="Resumen de la conversación anterior con el estudiante:\n" + "\n".join(reversed(seleccion)))
+
+
+def ventana_historial(mensajes: List[BaseMessage]) -> List[BaseMessage]:
+    """Aplica la política de historial y devuelve los mensajes a enviar al modelo."""
+    turnos = _dividir_en_turnos(mensajes)
+    if len(turnos) <= 1:
+        return list(mensajes)
+
+    anteriores, actual = turnos[:-1], turnos[-1]
+    recientes = anteriores[-TURNOS_COMPLETOS:] if TURNOS_COMPLETOS > 0 else []
+    antiguos = anteriores[:len(anteriores) - len(recientes)]
+
+    salida: List[BaseMessage] = []
+    if RESUMEN_ACTIVO and antiguos:
+        resumen = _resumir_turnos(antiguos)
+        if resumen is not None:
+            salida.append(resumen)
+    for turno in recientes:
+        salida.extend(_compactar_turno(turno))
+    salida.extend(actual)
+    return salida
+
+
+# ----------------------------------------------------
+# 4. HOOK PARA create_react_agent
+# ----------------------------------------------------
+def recortar_historial(state: Dict[str, Any], config=None) -> Dict[str, Any]:
+    """
+    pre_model_hook de los agentes: devuelve llm_input_messages (el hilo guardado
+    no se modifica) y registra en las métricas los tokens del historial completo frente
+    a los enviados (eva_historial_tokens_total, etiquetado por curso).
+    """
+    mensajes = state["messages"]
+    enviados = ventana_historial(mensajes) if VENTANA_ACTIVA else list(mensajes)
+
+    tokens_historial = contar_tokens(mensajes)
+    tokens_enviados = contar_tokens(enviados) if VENTANA_ACTIVA else tokens_historial
+    with _lock:
+        _estadisticas["llamadas"] += 1
+        _estadisticas["tokens_historial"] += tokens_historial
+        _estadisticas["tokens_enviados"] += tokens_enviados
+
+    curso = curso_actual()
+    REGISTRO.sumar("eva_historial_tokens_total", tokens_historial, tipo="completo", curso=curso)
+    REGISTRO.sumar("eva_historial_tokens_total", tokens_enviados, tipo="enviado", curso=curso)
+    REGISTRO.observar("eva_historial_tokens_enviados", tokens_enviados, cubetas=CUBETAS_TOKENS, curso=curso)
+    return {"llm_input_messages": enviados}
+
+
+def estadisticas_historial() -> Dict[str, Any]:
+    """Llamadas al modelo, tokens del historial completo, tokens enviados y ahorro."""
+    with _lock:
+        datos = dict(_estadisticas)
+    datos["tokens_ahorrados"] = datos["tokens_historial"] - datos["tokens_enviados"]
+    datos["ahorro"] = datos["tokens_ahorrados"] / datos["tokens_historial"] if datos["tokens_historial"] else 0.0
+    return datos
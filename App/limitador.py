@@ -0,0 +1,219 @@
+# app/limitador.py
+# =====================================================
+# 🔹 EVA - Limitador de Tasa Compartido (OpenAI y Tavily)
+# =====================================================
+# Un limitador por proveedor y clave API con:
+#   - cubos de tokens para peticiones/minuto y tokens/minuto,
+#   - concurrencia adaptativa AIMD: +1/límite por éxito rápido, ×0.5 ante un
+#     429 y ×0.9 si la latencia supera el objetivo,
+#   - reintentos con backoff exponencial y jitter (respetando Retry-After).
+# Así, en ráfagas de aula, el tráfico se mantiene cerca de la cuota del
+# proveedor en lugar de convertirse en tormentas de 429.
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+LIMITADOR_ACTIVO = os.getenv("EVA_LIMITADOR", "1") == "1"
+MAX_REINTENTOS = int(os.getenv("EVA_LIMITADOR_REINTENTOS", "5"))
+BACKOFF_BASE_S = float(os.getenv("EVA_LIMITADOR_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("EVA_LIMITADOR_BACKOFF_MAX", "30"))
+
+CUOTAS = {
+    "openai": {
+        "rpm": float(os.getenv("EVA_OPENAI_RPM", "500")),
+        "tpm": float(os.getenv("EVA_OPENAI_TPM", "200000")),
+        "concurrencia_max": int(os.getenv("EVA_OPENAI_CONCURRENCIA_MAX", "32")),
+        "latencia_objetivo_s": float(os.getenv("EVA_OPENAI_LATENCIA_OBJETIVO", "30")),
+    },
+    "tavily": {
+        "rpm": float(os.getenv("EVA_TAVILY_RPM", "100")),
+        "tpm": None,
+        "concurrencia_max": int(os.getenv("EVA_TAVILY_CONCURRENCIA_MAX", "8")),
+        "latencia_objetivo_s": float(os.getenv("EVA_TAVILY_LATENCIA_OBJETIVO", "10")),
+    },
+}
+
+CODIGOS_REINTENTABLES = {408, 409, 429, 500, 502, 503, 504}
+_ESPERA_SONDEO_S = 0.02
+
+
+# ----------------------------------------------------
+# 2. CUBO DE TOKENS
+# ----------------------------------------------------
+class CuboTokens:
+    """Se rellena a `por_minuto`/60 por segundo hasta `por_minuto`; reservar puede dejarlo en negativo."""
+
+    def __init__(self, por_minuto: float):
+        self.capacidad = por_minuto
+        self.tasa = por_minuto / 60.0
+        self.disponible = por_minuto
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self, cantidad: float) -> float:
+        """Descuenta `cantidad` y devuelve cuántos segundos hay que esperar antes de usarla."""
+        with self._lock:
+            ahora = time.monotonic()
+            self.disponible = min(self.capacidad, self.disponible + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            self.disponible -= min(cantidad, self.capacidad)
+            return 0.0 if self.disponible >= 0 else -self.disponible / self.tasa
+
+
+# ----------------------------------------------------
+# 3. CONCURRENCIA ADAPTATIVA (AIMD)
+# ----------------------------------------------------
+class ConcurrenciaAIMD:
+    def __init__(self, maximo: int, latencia_objetivo_s: float, minimo: int = 1):
+        self.maximo = maximo
+        self.minimo = minimo
+        self.latencia_objetivo_s = latencia_objetivo_s
+        self.limite = float(max(minimo, maximo // 4))
+        self.en_curso = 0
+        self._lock = threading.Lock()
+
+    def intentar_entrar(self) -> bool:
+        with self._lock:
+            if self.en_curso < int(self.limite):
+                self.en_curso += 1
+                return True
+            return False
+
+    def salir(self, limitado: bool, latencia_s: float):
+        with self._lock:
+            self.en_curso -= 1
+            if limitado:
+                self.limite = max(self.minimo, self.limite * 0.5)
+            elif latencia_s > self.latencia_objetivo_s:
+                self.limite = max(self.minimo, self.limite * 0.9)
+            else:
+                self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+
+
+# ----------------------------------------------------
+# 4. LIMITADOR POR PROVEEDOR
+# ----------------------------------------------------
+class Limitador:
+    def __init__(self, nombre: str, rpm: float, tpm: Optional[float], concurrencia_max: int, latencia_objetivo_s: float):
+        self.nombre = nombre
+        self.peticiones = CuboTokens(rpm)
+        self.tokens = CuboTokens(tpm) if tpm else None
+        self.concurrencia = ConcurrenciaAIMD(concurrencia_max, latencia_objetivo_s)
+        self._lock = threading.Lock()
+        self.contadores = {"peticiones": 0, "limitadas": 0, "reintentos": 0, "errores": 0, "espera_s": 0.0}
+
+    def _espera_cuota(self, tokens: float) -> float:
+        espera = self.peticiones.reservar(1)
+        if self.tokens is not None and tokens:
+            espera = max(espera, self.tokens.reservar(tokens))
+        return espera
+
+    def _sumar(self, clave: str, valor: float = 1):
+        with self._lock:
+            self.contadores[clave] += valor
+
+    # --- Permiso síncrono / asíncrono ---
+    @contextmanager
+    def permiso(self, tokens: float = 0):
+        """Espera cuota y un hueco de concurrencia. Al salir, llamar a resultado.marcar(...)."""
+        inicio = time.monotonic()
+        espera = self._espera_cuota(tokens)
+        if espera:
+            time.sleep(espera)
+        while not self.concurrencia.intentar_entrar():
+            time.sleep(_ESPERA_SONDEO_S)
+        self._sumar("espera_s", time.monotonic() - inicio)
+        resultado = _ResultadoPeticion(self)
+        try:
+            yield resultado
+        finally:
+            resultado._cerrar()
+
+    @asynccontextmanager
+    async def apermiso(self, tokens: float = 0):
+        """Versión asíncrona de permiso: espera con asyncio.sleep sin bloquear el event loop."""
+        inicio = time.monotonic()
+        espera = self._espera_cuota(tokens)
+        if espera:
+            await asyncio.sleep(espera)
+        while not self.concurrencia.intentar_entrar():
+            await asyncio.sleep(_ESPERA_SONDEO_S)
+        self._sumar("espera_s", time.monotonic() - inicio)
+        resultado = _ResultadoPeticion(self)
+        try:
+            yield resultado
+        finally:
+            resultado._cerrar()
+
+    def espera_reintento(self, intento: int, retry_after: Optional[str] = None) -> float:
+        """Backoff exponencial con jitter completo; Retry-After del proveedor si viene."""
+        self._sumar("reintentos")
+        if retry_after:
+            try:
+                return min(BACKOFF_MAX_S, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** intento)))
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            datos = dict(self.contadores)
+        datos["limite_concurrencia"] = round(self.concurrencia.limite, 2)
+        datos["en_curso"] = self.concurrencia.en_curso
+        return datos
+
+
+class _ResultadoPeticion:
+    """Lo que se observó de la petición; alimenta el AIMD al cerrar el permiso."""
+
+    def __init__(self, limitador: Limitador):
+        self._limitador = limitador
+        self._inicio = time.monotonic()
+        self.limitado = False
+        self.error = False
+
+    def marcar(self, limitado: bool = False, error: bool = False):
+        self.limitado = limitado
+        self.error = error
+
+    def _cerrar(self):
+        self._limitador._sumar("peticiones")
+        if self.limitado:
+            self._limitador._sumar("limitadas")
+        elif self.error:
+            self._limitador._sumar("errores")
+        self._limitador.concurrencia.salir(self.limitado, time.monotonic() - self._inicio)
+
+
+# ----------------------------------------------------
+# 5. REGISTRO (uno por proveedor y clave API)
+# ----------------------------------------------------
+_limitadores: Dict[str, Limitador] = {}
+_registro_lock = threading.Lock()
+
+
+def obtener_limitador(proveedor: str, clave_api: Optional[str] = None) -> Limitador:
+    """Limitador compartido para (proveedor, clave API); las cuotas salen de CUOTAS."""
+    huella = hashlib.sha256((clave_api or "").encode("utf-8")).hexdigest()[:12]
+    nombre = f"{proveedor}:{huella}"
+    with _registro_lock:
+        limitador = _limitadores.get(nombre)
+        if limitador is None:
+            limitador = Limitador(nombre, **CUOTAS[proveedor])
+            _limitadores[nombre] = limitador
+        return limitador
+
+
+def estadisticas_limitadores() -> Dict[str, Dict[str, Any]]:
+    with _registro_lock:
+        limitadores = list(_limitadores.values())
+    return {l.nombre: l.estadisticas() for l in limitadores}
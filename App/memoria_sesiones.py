@@ -0,0 +1,237 @@
+# app/memoria_sesiones.py
+# =====================================================
+# 🔹 EVA - Memoria de Conversación Acotada por Sesión (checkpointer)
+# =====================================================
+# Un checkpointer compartido por los cinco agentes, con un hilo por
+# (curso, sesión). Dentro de cada hilo solo se conservan los últimos
+# checkpoints (el agente parte siempre del más reciente). Los hilos inactivos
+# se desalojan por LRU (número máximo de hilos) y por TTL (inactividad),
+# salvo los que tienen una ejecución en curso. Si EVA_MEMORIA_SQLITE=1, el
+# hilo desalojado se guarda en SQLite y se restaura cuando la sesión vuelve.
+
+import base64
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Set, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from App.config import LOGS_DIR
+from Tools.cache_herramientas import AlmacenPersistente
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+MAX_HILOS = int(os.getenv("EVA_MEMORIA_MAX_HILOS", "500"))
+TTL_INACTIVIDAD = float(os.getenv("EVA_MEMORIA_TTL_SEGUNDOS", str(2 * 3600)))
+MAX_CHECKPOINTS = int(os.getenv("EVA_MEMORIA_MAX_CHECKPOINTS", "4"))  # por hilo; 0 = sin poda
+PERSISTENCIA_ACTIVA = os.getenv("EVA_MEMORIA_SQLITE", "0") == "1"
+RUTA_MEMORIA = os.path.join(LOGS_DIR, "memoria_sesiones.sqlite")
+TTL_DISCO = float(os.getenv("EVA_MEMORIA_TTL_DISCO", str(7 * 24 * 3600)))
+MAX_HILOS_DISCO = int(os.getenv("EVA_MEMORIA_MAX_HILOS_DISCO", "20000"))
+
+
+# ----------------------------------------------------
+# 2. CHECKPOINTER ACOTADO
+# ----------------------------------------------------
+class MemoriaSesiones(InMemorySaver):
+    """
+    InMemorySaver con poda de checkpoints antiguos por hilo, desalojo LRU/TTL de hilos
+    inactivos y respaldo opcional en SQLite.
+    """
+
+    def __init__(
+        self,
+        max_hilos: int = MAX_HILOS,
+        ttl_segundos: float = TTL_INACTIVIDAD,
+        persistencia: Optional[AlmacenPersistente] = None,
+        max_checkpoints: int = MAX_CHECKPOINTS,
+    ):
+        super().__init__()
+        self.max_hilos = max_hilos
+        self.ttl_segundos = ttl_segundos
+        self.persistencia = persistencia
+        self.max_checkpoints = max_checkpoints
+        self._lock = threading.RLock()
+        self._accesos: "OrderedDict[str, float]" = OrderedDict()
+        self._en_uso: Dict[str, int] = {}  # hilo → ejecuciones en curso
+        self.contadores = {
+            "desalojados_lru": 0, "desalojados_ttl": 0, "persistidos": 0, "restaurados": 0, "checkpoints_podados": 0,
+        }
+
+    # --- Seguimiento de acceso por hilo ---
+    def _tocar(self, config) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if thread_id not in self._accesos and thread_id not in self.storage:
+                self._restaurar(thread_id)
+            self._accesos[thread_id] = time.time()
+            self._accesos.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        with self._lock:
+            self._tocar(config)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            self._tocar(config)
+            resultado = super().put(config, checkpoint, metadata, new_versions)
+            self._podar(resultado["configurable"]["thread_id"], resultado["configurable"]["checkpoint_ns"])
+            self._desalojar()
+            return resultado
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            self._tocar(config)
+            return super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._accesos.pop(thread_id, None)
+            super().delete_thread(thread_id)
+            if self.persistencia is not None:
+                self.persistencia.eliminar(thread_id)
+
+    def copiar_hilo(self, origen: str, destino: str) -> None:
+        """Crea `destino` con los checkpoints de `origen` (borrador para un turno especulativo)."""
+        with self._lock:
+            self._tocar({"configurable": {"thread_id": origen}})
+            for ns, checkpoints in self.storage.get(origen, {}).items():
+                self.storage[destino][ns].update(checkpoints)
+            for (thread_id, ns, checkpoint_id), escrituras in list(self.writes.items()):
+                if thread_id == origen:
+                    self.writes[(destino, ns, checkpoint_id)] = dict(escrituras)
+            for (thread_id, ns, canal, version), blob in list(self.blobs.items()):
+                if thread_id == origen:
+                    self.blobs[(destino, ns, canal, version)] = blob
+            self._tocar({"configurable": {"thread_id": destino}})
+
+    @contextmanager
+    def en_uso(self, thread_id: str):
+        """Marca el hilo como ocupado por una ejecución del agente: no se desaloja hasta que termine."""
+        with self._lock:
+            self._en_uso[thread_id] = self._en_uso.get(thread_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                restantes = self._en_uso.pop(thread_id) - 1
+                if restantes:
+                    self._en_uso[thread_id] = restantes
+
+    # --- Poda de checkpoints ---
+    def _podar(self, thread_id: str, ns: str) -> None:
+        """Deja los últimos max_checkpoints del hilo; se van sus escrituras y los blobs que ya nadie usa."""
+        checkpoints = self.storage[thread_id][ns]
+        if self.max_checkpoints <= 0 or len(checkpoints) <= self.max_checkpoints:
+            return
+        ids = sorted(checkpoints)  # los id (uuid6) crecen con el tiempo, como asume get_tuple
+        viejos, vigentes = ids[:-self.max_checkpoints], ids[-self.max_checkpoints:]
+        en_uso = set().union(*(self._versiones(checkpoints[i]) for i in vigentes))
+        for checkpoint_id in viejos:
+            for canal, version in self._versiones(checkpoints.pop(checkpoint_id)) - en_uso:
+                self.blobs.pop((thread_id, ns, canal, version), None)
+            self.writes.pop((thread_id, ns, checkpoint_id), None)
+        self.contadores["checkpoints_podados"] += len(viejos)
+
+    def _versiones(self, guardado: Tuple) -> Set[Tuple[str, Any]]:
+        """(canal, versión) de los blobs que referencia un checkpoint guardado."""
+        return set(self.serde.loads_typed(guardado[0])["channel_versions"].items())
+
+    # --- Desalojo y respaldo ---
+    def _desalojar(self) -> None:
+        limite = time.time() - self.ttl_segundos
+        exceso = len(self._accesos) - self.max_hilos
+        victimas = []
+        for thread_id, ultimo_acceso in self._accesos.items():
+            if exceso > 0:
+                motivo = "desalojados_lru"
+            elif ultimo_acceso < limite:
+                motivo = "desalojados_ttl"
+            else:
+                break
+            if thread_id in self._en_uso:
+                continue  # ejecución en curso: se desaloja en una pasada posterior
+            victimas.append((thread_id, motivo))
+            exceso -= 1
+        for thread_id, motivo in victimas:
+            self.contadores[motivo] += 1
+            del self._accesos[thread_id]
+            self._persistir(thread_id)
+            super().delete_thread(thread_id)
+
+    def _persistir(self, thread_id: str) -> None:
+        if self.persistencia is None or thread_id not in self.storage:
+            return
+        volcado = {
+            "storage": {ns: dict(checkpoints) for ns, checkpoints in self.storage[thread_id].items()},
+            "writes": {k: v for k, v in self.writes.items() if k[0] == thread_id},
+            "blobs": {k: v for k, v in self.blobs.items() if k[0] == thread_id},
+        }
+        codificado = base64.b64encode(pickle.dumps(volcado)).decode("ascii")
+        self.persistencia.guardar(thread_id, codificado, TTL_DISCO)
+        self.contadores["persistidos"] += 1
+
+    def _restaurar(self, thread_id: str) -> None:
+        if self.persistencia is None:
+            return
+        codificado = self.persistencia.obtener(thread_id)
+        if codificado is None:
+            return
+        volcado = pickle.loads(base64.b64decode(codificado))
+        for ns, checkpoints in volcado["storage"].items():
+            self.storage[thread_id][ns].update(checkpoints)
+        self.writes.update(volcado["writes"])
+        self.blobs.update(volcado["blobs"])
+        self.contadores["restaurados"] += 1
+
+    # --- Métricas ---
+    def _bytes_hilo(self, thread_id: str) -> int:
+        total = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+        total += sum(len(w[2][1]) for k, escrituras in self.writes.items() if k[0] == thread_id for w in escrituras.values())
+        total += sum(len(b[1]) for k, b in self.blobs.items() if k[0] == thread_id)
+        return total
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Hilos vivos, bytes serializados retenidos en memoria y contadores de desalojo."""
+        with self._lock:
+            self._desalojar()
+            datos = dict(self.contadores)
+            datos["hilos_vivos"] = len(self._accesos)
+            datos["hilos_en_uso"] = len(self._en_uso)
+            datos["bytes_retenidos"] = sum(self._bytes_hilo(t) for t in list(self._accesos))
+        if self.persistencia is not None:
+            datos["disco"] = self.persistencia.estadisticas()
+        return datos
+
+
+# ----------------------------------------------------
+# 3. INSTANCIA COMPARTIDA
+# ----------------------------------------------------
+_memoria: Optional[MemoriaSesiones] = None
+_memoria_lock = threading.Lock()
+
+
+def obtener_memoria_sesiones() -> MemoriaSesiones:
+    """Devuelve (creándolo la primera vez) el checkpointer compartido por todos los agentes."""
+    global _memoria
+    with _memoria_lock:
+        if _memoria is None:
+            persistencia = None
+            if PERSISTENCIA_ACTIVA:
+                persistencia = AlmacenPersistente(RUTA_MEMORIA, max_entradas=MAX_HILOS_DISCO, tabla="hilos")
+            _memoria = MemoriaSesiones(persistencia=persistencia)
+        return _memoria
+
+
+def id_hilo(curso: str, sesion_id: str) -> str:
+    """thread_id de LangGraph para la conversación de una sesión con el agente de un curso."""
+    return f"{curso}_{sesion_id}"
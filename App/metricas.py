@@ -0,0 +1,411 @@
+# app/metricas.py
+# =====================================================
+# 🔹 EVA - Métricas por Etapa (latencia, tokens y errores)
+# =====================================================
+# Histogramas en memoria del tiempo de cada etapa de procesar_pregunta
+# (detección de curso, Cadena 4, agente, planificación, herramientas, Tavily,
+# formateo), etiquetados por curso y herramienta, más los tokens y la
+# latencia de cada llamada al LLM. Cada pregunta recibe un id de traza que
+# viaja por todas las etapas en un ContextVar (hilos y tareas asyncio).
+#
+# Exportación (opcional):
+#   EVA_METRICAS_PUERTO=9108   → http://localhost:9108/metrics (texto Prometheus)
+#   EVA_METRICAS_HOST=0.0.0.0  → interfaz del endpoint (por defecto solo 127.0.0.1)
+#   EVA_METRICAS_JSON=ruta     → volcado JSON cada EVA_METRICAS_INTERVALO segundos
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+METRICAS_ACTIVAS = os.getenv("EVA_METRICAS", "1") == "1"
+PUERTO_METRICAS = int(os.getenv("EVA_METRICAS_PUERTO", "0"))
+HOST_METRICAS = os.getenv("EVA_METRICAS_HOST", "127.0.0.1")
+RUTA_VOLCADO_JSON = os.getenv("EVA_METRICAS_JSON", "")
+INTERVALO_VOLCADO_S = float(os.getenv("EVA_METRICAS_INTERVALO", "60"))
+MAX_ETAPAS_RECIENTES = int(os.getenv("EVA_METRICAS_RECIENTES", "1000"))
+
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CUBETAS_TOKENS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# Contexto de la pregunta en curso (se copia a hilos de LangGraph y tareas asyncio)
+_traza: ContextVar[Optional[str]] = ContextVar("eva_traza", default=None)
+_curso: ContextVar[str] = ContextVar("eva_curso", default="")
+_etapa: ContextVar[str] = ContextVar("eva_etapa", default="")
+_herramienta: ContextVar[str] = ContextVar("eva_herramienta", default="")
+
+# Consumidores de tramos y trazas (p. ej. App/trazas.py): objetos con
+# en_tramo(tramo: dict) y en_fin_traza(id_traza: str, segundos: float)
+_observadores: List[Any] = []
+
+
+# ----------------------------------------------------
+# 2. HISTOGRAMAS Y CONTADORES
+# ----------------------------------------------------
+class Histograma:
+    """Histograma acumulativo con cubetas fijas (mismo modelo que Prometheus)."""
+
+    def __init__(self, cubetas: Tuple[float, ...]):
+        self.cubetas = cubetas
+        self.conteos = [0] * (len(cubetas) + 1)  # la última es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        for i, limite in enumerate(self.cubetas):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+        else:
+            self.conteos[-1] += 1
+        self.suma += valor
+        self.total += 1
+
+    def percentil(self, p: float) -> float:
+        """Aproximación: límite superior de la cubeta que contiene el percentil p."""
+        if not self.total:
+            return 0.0
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos[:-1]):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return self.cubetas[i]
+        return float("inf")
+
+    def resumen(self) -> Dict[str, float]:
+        return {
+            "n": self.total,
+            "suma": round(self.suma, 4),
+            "media": round(self.suma / self.total, 4) if self.total else 0.0,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+        }
+
+
+class RegistroMetricas:
+    """Histogramas y contadores por (nombre, etiquetas), protegidos por un lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas: Dict[Tuple[str, Tuple], Histograma] = {}
+        self._contadores: Dict[Tuple[str, Tuple], float] = {}
+        self.recientes: deque = deque(maxlen=MAX_ETAPAS_RECIENTES)
+
+    @staticmethod
+    def _clave(nombre: str, etiquetas: Dict[str, str]) -> Tuple[str, Tuple]:
+        return nombre, tuple(sorted((k, v) for k, v in etiquetas.items() if v))
+
+    def observar(self, nombre: str, valor: float, cubetas: Tuple[float, ...] = CUBETAS_SEGUNDOS, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(cubetas)
+            histograma.observar(valor)
+
+    def sumar(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def instantanea(self) -> Dict[str, Any]:
+        with self._lock:
+            histogramas = {clave: (h.resumen(), list(h.conteos), h.cubetas) for clave, h in self._histogramas.items()}
+            contadores = dict(self._contadores)
+            recientes = list(self.recientes)
+        return {"histogramas": histogramas, "contadores": contadores, "recientes": recientes}
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+            self.recientes.clear()
+
+
+REGISTRO = RegistroMetricas()
+
+
+# ----------------------------------------------------
+# 3. TRAZAS Y ETAPAS
+# ----------------------------------------------------
+def id_traza() -> Optional[str]:
+    return _traza.get()
+
+
+def curso_actual() -> str:
+    return _curso.get()
+
+
+def registrar_observador(observador: Any) -> None:
+    if observador not in _observadores:
+        _observadores.append(observador)
+
+
+def _notificar_tramo(tramo: Dict[str, Any]) -> None:
+    for observador in _observadores:
+        observador.en_tramo(tramo)
+
+
+@contextmanager
+def traza(curso: str = ""):
+    """Abre una traza para una pregunta (reutiliza la actual si ya hay una)."""
+    if _traza.get() is not None:
+        yield _traza.get()
+        return
+    identificador = uuid.uuid4().hex[:16]
+    fichas = (_traza.set(identificador), _curso.set(curso))
+    inicio = time.perf_counter()
+    try:
+        yield identificador
+    finally:
+        try:
+            _curso.reset(fichas[1])
+            _traza.reset(fichas[0])
+        except ValueError:
+            pass  # generador cerrado desde otro contexto (p. ej. al recolectarlo)
+        duracion = time.perf_counter() - inicio
+        for observador in _observadores:
+            observador.en_fin_traza(identificador, duracion)
+
+
+@contextmanager
+def medir(etapa: str, curso: Optional[str] = None, herramienta: Optional[str] = None):
+    """Mide una etapa: tiempo en eva_etapa_segundos y, si lanza una excepción, eva_errores_total."""
+    if not METRICAS_ACTIVAS:
+        yield
+        return
+    fichas = [(_etapa, _etapa.set(etapa))]
+    if curso is not None:
+        fichas.append((_curso, _curso.set(curso)))
+    if herramienta is not None:
+        fichas.append((_herramienta, _herramienta.set(herramienta)))
+
+    etiquetas = {"etapa": etapa, "curso": _curso.get(), "herramienta": _herramienta.get()}
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        REGISTRO.observar("eva_etapa_segundos", duracion, **etiquetas)
+        if error is not None:
+            REGISTRO.sumar("eva_errores_total", **etiquetas)
+        tramo = {
+            "traza": _traza.get(), "inicio": time.time() - duracion, "segundos": round(duracion, 4),
+            **etiquetas, "error": error,
+        }
+        REGISTRO.recientes.append(tramo)
+        _notificar_tramo(tramo)
+        for variable, ficha in reversed(fichas):
+            variable.reset(ficha)
+
+
+# ----------------------------------------------------
+# 4. LLAMADAS AL LLM (callback de LangChain)
+# ----------------------------------------------------
+class ManejadorMetricas(BaseCallbackHandler):
+    """
+    Se registra en cada ChatOpenAI (App/clientes_llm.py). Las llamadas hechas desde
+    el nodo "agent" del grafo ReAct cuentan como la etapa planificacion_agente;
+    el resto hereda la etapa que las envuelve (deteccion_curso, herramienta, ...).
+    """
+
+    def __init__(self):
+        self._inicios: Dict[Any, Tuple[float, Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _etiquetas(self, metadata, kwargs) -> Dict[str, str]:
+        nodo = (metadata or {}).get("langgraph_node")
+        etapa = "planificacion_agente" if nodo == "agent" else (_etapa.get() or "sin_etapa")
+        invocacion = kwargs.get("invocation_params") or {}
+        modelo = invocacion.get("model") or invocacion.get("model_name") or ""
+        return {
+            "etapa": etapa, "curso": _curso.get(),
+            "herramienta": _herramienta.get() if etapa != "planificacion_agente" else "",
+            "modelo": modelo,
+        }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        with self._lock:
+            self._inicios[run_id] = (time.perf_counter(), self._etiquetas(metadata, kwargs), _traza.get())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            inicio, etiquetas, traza_llamada = self._inicios.pop(run_id, (None, None, None))
+        if inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        REGISTRO.observar("eva_llm_segundos", duracion, **etiquetas)
+        prompt, completado = _tokens_de(response)
+        if prompt or completado:
+            REGISTRO.sumar("eva_llm_tokens_total", prompt, tipo="prompt", **etiquetas)
+            REGISTRO.sumar("eva_llm_tokens_total", completado, tipo="completion", **etiquetas)
+            REGISTRO.observar("eva_llm_tokens", prompt + completado, cubetas=CUBETAS_TOKENS, **etiquetas)
+        if _observadores:
+            _notificar_tramo({
+                "traza": traza_llamada, "inicio": time.time() - duracion, "segundos": round(duracion, 4),
+                "llm": True, **etiquetas, "tokens_prompt": prompt, "tokens_completion": completado, "error": None,
+            })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            inicio, etiquetas, traza_llamada = self._inicios.pop(run_id, (None, None, None))
+        if etiquetas is None:
+            return
+        REGISTRO.sumar("eva_llm_errores_total", **etiquetas)
+        if _observadores:
+            duracion = time.perf_counter() - inicio
+            _notificar_tramo({
+                "traza": traza_llamada, "inicio": time.time() - duracion, "segundos": round(duracion, 4),
+                "llm": True, **etiquetas, "error": type(error).__name__,
+            })
+
+
+def _tokens_de(response) -> Tuple[int, int]:
+    """(prompt, completion) desde usage_metadata del mensaje o, si falta, desde llm_output."""
+    for generaciones in response.generations or []:
+        for generacion in generaciones:
+            uso = getattr(getattr(generacion, "message", None), "usage_metadata", None)
+            if uso:
+                return int(uso.get("input_tokens", 0)), int(uso.get("output_tokens", 0))
+    uso = (response.llm_output or {}).get("token_usage") or {}
+    return int(uso.get("prompt_tokens", 0) or 0), int(uso.get("completion_tokens", 0) or 0)
+
+
+MANEJADOR_METRICAS = ManejadorMetricas()
+
+
+# ----------------------------------------------------
+# 5. EXPORTACIÓN (Prometheus y JSON)
+# ----------------------------------------------------
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formato_etiquetas(etiquetas: Tuple, extra: Tuple = ()) -> str:
+    partes = [f'{k}="{_escapar(v)}"' for k, v in tuple(etiquetas) + tuple(extra)]
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def texto_prometheus() -> str:
+    """Exposición en formato de texto de Prometheus (0.0.4)."""
+    datos = REGISTRO.instantanea()
+    lineas: List[str] = []
+    tipos_declarados = set()
+
+    for (nombre, etiquetas), (resumen, conteos, cubetas) in sorted(datos["histogramas"].items()):
+        if nombre not in tipos_declarados:
+            lineas.append(f"# TYPE {nombre} histogram")
+            tipos_declarados.add(nombre)
+        acumulado = 0
+        for limite, conteo in zip(list(cubetas) + ["+Inf"], conteos):
+            acumulado += conteo
+            lineas.append(f"{nombre}_bucket{_formato_etiquetas(etiquetas, (('le', limite),))} {acumulado}")
+        lineas.append(f"{nombre}_sum{_formato_etiquetas(etiquetas)} {resumen['suma']}")
+        lineas.append(f"{nombre}_count{_formato_etiquetas(etiquetas)} {resumen['n']}")
+
+    for (nombre, etiquetas), valor in sorted(datos["contadores"].items()):
+        if nombre not in tipos_declarados:
+            lineas.append(f"# TYPE {nombre} counter")
+            tipos_declarados.add(nombre)
+        lineas.append(f"{nombre}{_formato_etiquetas(etiquetas)} {valor}")
+    return "\n".join(lineas) + "\n"
+
+
+def resumen_metricas() -> Dict[str, Any]:
+    """Mismas métricas como JSON: p50/p95/p99 por serie y las últimas etapas con su traza."""
+    datos = REGISTRO.instantanea()
+    return {
+        "generado": time.time(),
+        "histogramas": [
+            {"nombre": nombre, **dict(etiquetas), **resumen}
+            for (nombre, etiquetas), (resumen, _, _) in sorted(datos["histogramas"].items())
+        ],
+        "contadores": [
+            {"nombre": nombre, **dict(etiquetas), "valor": valor}
+            for (nombre, etiquetas), valor in sorted(datos["contadores"].items())
+        ],
+        "recientes": datos["recientes"],
+    }
+
+
+def volcar_json(ruta: str = RUTA_VOLCADO_JSON):
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(resumen_metricas(), f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+class _ManejadorHTTP(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            cuerpo, tipo = json.dumps(resumen_metricas(), ensure_ascii=False).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            cuerpo, tipo = texto_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass  # sin una línea en consola por cada scrape
+
+
+_exportadores_iniciados = False
+_exportadores_lock = threading.Lock()
+
+
+def iniciar_exportadores(
+    puerto: int = PUERTO_METRICAS, ruta_json: str = RUTA_VOLCADO_JSON, host: str = HOST_METRICAS,
+) -> Optional[ThreadingHTTPServer]:
+    """Arranca (una sola vez) el endpoint HTTP y/o el volcado JSON periódico si están configurados."""
+    global _exportadores_iniciados
+    with _exportadores_lock:
+        if _exportadores_iniciados or not METRICAS_ACTIVAS:
+            return None
+        _exportadores_iniciados = True
+
+    servidor = None
+    if puerto:
+        try:
+            servidor = ThreadingHTTPServer((host, puerto), _ManejadorHTTP)
+            threading.Thread(target=servidor.serve_forever, daemon=True, name="eva-metricas").start()
+            print(f"📈 Métricas en http://{host}:{puerto}/metrics")
+        except OSError as e:
+            print(f"⚠️ No se pudo abrir el puerto de métricas {puerto}: {e}")
+
+    if ruta_json:
+        def _volcar_periodicamente():
+            while True:
+                time.sleep(INTERVALO_VOLCADO_S)
+                try:
+                    volcar_json(ruta_json)
+                except OSError as e:
+                    print(f"⚠️ No se pudo volcar las métricas en {ruta_json}: {e}")
+
+        threading.Thread(target=_volcar_periodicamente, daemon=True, name="eva-metricas-json").start()
+        print(f"📈 Métricas volcadas cada {INTERVALO_VOLCADO_S:.0f}s en {ruta_json}")
+    return servidor
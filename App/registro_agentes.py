@@ -0,0 +1,106 @@
+# app/registro_agentes.py
+# =====================================================
+# 🔹 EVA - Registro Perezoso de Agentes Especialistas
+# =====================================================
+# Importar un módulo de agente construye su ChatOpenAI, sus herramientas y
+# el grafo ReAct compilado. El registro solo importa el módulo del curso la
+# primera vez que se necesita y guarda el ejecutor para las siguientes. Si la
+# construcción falla, el error se conserva (para mostrarlo) y se reintenta más tarde.
+
+import importlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# curso → (módulo, función que devuelve (ejecutor, esquema))
+AGENTES_DISPONIBLES: Dict[str, Tuple[str, str]] = {
+    "Comunicación": ("Agents.Agent_comunicacion", "get_comunicacion_agent"),
+    "Matemática": ("Agents.Agent_matematica", "get_matematica_agent"),
+    "Ciencia y Tecnología": ("Agents.Agent_CTA", "get_cta_agent"),
+    "Educación para el Trabajo": ("Agents.Agent_EPT", "get_ept_agent"),
+    "Inglés": ("Agents.Agent_ingles", "get_ingles_agent"),
+}
+
+# Tras un fallo de construcción (red, claves, import) se vuelve a intentar pasado este tiempo
+REINTENTO_SEGUNDOS = float(os.getenv("EVA_AGENTES_REINTENTO_SEGUNDOS", "30"))
+
+
+class RegistroAgentes:
+    """Se usa como el antiguo dict AGENTS_EXECUTORS (get, [], in), pero construye bajo demanda."""
+
+    def __init__(self, preparar: Optional[Callable[[], None]] = None):
+        self.preparar = preparar  # p. ej. cargar claves antes del primer ChatOpenAI
+        self._lock = threading.RLock()
+        self._ejecutores: Dict[str, Any] = {}
+        self._modulos: Dict[str, Any] = {}
+        self._fallidos: Dict[str, Tuple[str, float]] = {}  # curso → (error, instante del fallo)
+        self.tiempos_construccion: Dict[str, float] = {}
+
+    def _construir(self, curso: str) -> Optional[Any]:
+        with self._lock:
+            if curso in self._ejecutores:
+                return self._ejecutores[curso]
+            if curso in self._fallidos and time.time() - self._fallidos[curso][1] < REINTENTO_SEGUNDOS:
+                return None
+
+            nombre_modulo, nombre_funcion = AGENTES_DISPONIBLES[curso]
+            inicio = time.perf_counter()
+            try:
+                if self.preparar is not None:
+                    self.preparar()
+                modulo = importlib.import_module(nombre_modulo)
+                ejecutor, _ = getattr(modulo, nombre_funcion)()
+            except Exception as e:
+                print(f"❌ ERROR al inicializar el agente de {curso}: {e}")
+                self._fallidos[curso] = (f"{type(e).__name__}: {e}", time.time())
+                return None
+
+            self._fallidos.pop(curso, None)
+            self.tiempos_construccion[curso] = time.perf_counter() - inicio
+            self._modulos[curso] = modulo
+            self._ejecutores[curso] = ejecutor
+            print(f"⏱️ Agente de {curso} listo en {self.tiempos_construccion[curso]:.2f}s")
+            return ejecutor
+
+    def get(self, curso: str, default: Any = None) -> Any:
+        if curso not in AGENTES_DISPONIBLES:
+            return default
+        ejecutor = self._ejecutores.get(curso) or self._construir(curso)
+        return ejecutor if ejecutor is not None else default
+
+    def error(self, curso: str) -> Optional[str]:
+        """Último error de construcción del agente del curso (None si no falló)."""
+        with self._lock:
+            fallo = self._fallidos.get(curso)
+        return fallo[0] if fallo else None
+
+    def __getitem__(self, curso: str) -> Any:
+        ejecutor = self.get(curso)
+        if ejecutor is None:
+            raise KeyError(curso)
+        return ejecutor
+
+    def __contains__(self, curso: object) -> bool:
+        return curso in AGENTES_DISPONIBLES
+
+    def keys(self) -> List[str]:
+        return list(AGENTES_DISPONIBLES)
+
+    def rutas_directas(self, curso: str) -> List[Tuple[str, Any, str]]:
+        """RUTAS_DIRECTAS del módulo del curso (construye el agente si hace falta)."""
+        if self.get(curso) is None:
+            return []
+        return getattr(self._modulos[curso], "RUTAS_DIRECTAS", [])
+
+    def construidos(self) -> List[str]:
+        with self._lock:
+            return list(self._ejecutores)
+
+    def precargar(self, cursos: Optional[List[str]] = None) -> threading.Thread:
+        """Construye en segundo plano los agentes indicados (todos si no se indica)."""
+        hilo = threading.Thread(
+            target=lambda: [self.get(c) for c in (cursos or self.keys())], daemon=True
+        )
+        hilo.start()
+        return hilo
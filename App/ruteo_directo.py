@@ -0,0 +1,96 @@
+# app/ruteo_directo.py
+# =====================================================
+# 🔹 EVA - Ruteo Directo a Herramientas (sin ciclo ReAct)
+# =====================================================
+# Cada agente declara RUTAS_DIRECTAS: (patrón de intención, herramienta, campo).
+# Si la pregunta activa exactamente una herramienta, se llama directamente y la
+# RespuestaAgente se arma aquí: una llamada al LLM en lugar de tres (elegir
+# herramienta + herramienta + entregar_respuesta).
+# Si no activa ninguna, o activa varias, decide el agente ReAct.
+
+import re
+import unicodedata
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from Agents.esquemas import RespuestaAgente, mensajes_de_respuesta
+
+
+class RutaDirecta(NamedTuple):
+    herramienta: Any   # BaseTool de un solo argumento
+    campo: str         # "explicacion_profunda" o "parrafo_ejemplo"
+    tema: str          # argumento para la herramienta
+
+
+def _normalizar_por_caracter(texto: str) -> str:
+    """Minúsculas y sin tildes, carácter a carácter, para que las posiciones coincidan con el original."""
+    normalizado = []
+    for caracter in texto:
+        base = unicodedata.normalize("NFKD", caracter.lower())
+        base = "".join(c for c in base if not unicodedata.combining(c))
+        normalizado.append(base[:1] or " ")
+    return "".join(normalizado)
+
+
+def _extraer_tema(pregunta: str, inicio: int, fin: int) -> str:
+    """
+    Si la frase de intención abre la pregunta ("Qué es ...", "Corrige: ..."), devuelve lo que sigue;
+    si aparece en medio ("propón un experimento sobre ..."), la pregunta completa es el tema.
+    """
+    if pregunta[:inicio].strip(" ¿¡"):
+        return pregunta.strip()
+    tema = pregunta[fin:].strip()
+    tema = re.sub(r"^[\s¿?¡!:,.\-]*((de|del|sobre|la|el|los|las|un|una|a|al|en|mi|este|esta)\s+)*", "", tema, flags=re.IGNORECASE)
+    tema = tema.strip(" ¿?¡!.:,")
+    return tema if len(tema) >= 2 else pregunta.strip()
+
+
+def detectar_ruta_directa(rutas: List[Tuple[str, Any, str]], pregunta: str) -> Optional[RutaDirecta]:
+    """
+    Devuelve la ruta si exactamente una herramienta coincide con la intención de la pregunta.
+    Los patrones se evalúan sobre el texto sin tildes y en minúscula.
+    """
+    normalizada = _normalizar_por_caracter(pregunta)
+    coincidencias = {}
+    for patron, herramienta, campo in rutas:
+        encontrado = re.search(patron, normalizada)
+        if encontrado and herramienta.name not in coincidencias:
+            coincidencias[herramienta.name] = (herramienta, campo, encontrado)
+
+    if len(coincidencias) != 1:
+        return None
+
+    herramienta, campo, encontrado = next(iter(coincidencias.values()))
+    tema = _extraer_tema(pregunta, encontrado.start(), encontrado.end())
+    return RutaDirecta(herramienta, campo, tema)
+
+
+def construir_mensaje_respuesta(ruta: RutaDirecta, salida_herramienta: str) -> List[BaseMessage]:
+    """Arma la entrega final (llamada a entregar_respuesta + confirmación) igual que el agente ReAct."""
+    campos = {"explicacion_profunda": "", "parrafo_ejemplo": ""}
+    campos[ruta.campo] = salida_herramienta.strip()
+    return mensajes_de_respuesta(RespuestaAgente(**campos))
+
+
+def ejecutar_ruta_directa(executor, ruta: RutaDirecta, entrada: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Llama a la herramienta y registra el turno en el hilo del agente (como si el nodo
+    'tools' acabara de ejecutar entregar_respuesta). Devuelve el mismo formato que executor.invoke.
+    """
+    salida = ruta.herramienta.invoke({_argumento(ruta.herramienta): ruta.tema})
+    mensajes = list(entrada["messages"]) + construir_mensaje_respuesta(ruta, salida)
+    executor.update_state(config, {"messages": mensajes}, as_node="tools")
+    return {"messages": mensajes}
+
+
+async def aejecutar_ruta_directa(executor, ruta: RutaDirecta, entrada: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """Versión asíncrona de ejecutar_ruta_directa."""
+    salida = await ruta.herramienta.ainvoke({_argumento(ruta.herramienta): ruta.tema})
+    mensajes = list(entrada["messages"]) + construir_mensaje_respuesta(ruta, salida)
+    await executor.aupdate_state(config, {"messages": mensajes}, as_node="tools")
+    return {"messages": mensajes}
+
+
+def _argumento(herramienta) -> str:
+    return next(iter(herramienta.args))
@@ -0,0 +1,54 @@
+# app/streaming.py
+# =====================================================
+# 🔹 EVA - Utilidades de Streaming (JSON parcial de los agentes)
+# =====================================================
+# Los agentes entregan {"explicacion_profunda": ..., "parrafo_ejemplo": ...} como
+# argumentos de entregar_respuesta. Mientras los tokens llegan, el JSON está incompleto: aquí se extrae el valor
+# parcial de cada campo para que la UI pueda pintarlo progresivamente.
+
+import re
+from typing import Dict
+
+CAMPOS_RESPUESTA = ("explicacion_profunda", "parrafo_ejemplo")
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _leer_cadena_parcial(texto: str, inicio: int) -> str:
+    """Lee una cadena JSON desde `inicio` (tras la comilla de apertura) aunque no esté cerrada."""
+    resultado = []
+    i = inicio
+    while i < len(texto):
+        caracter = texto[i]
+        if caracter == '"':
+            break
+        if caracter == "\\":
+            if i + 1 >= len(texto):
+                break  # escape cortado: esperar al siguiente token
+            siguiente = texto[i + 1]
+            if siguiente == "u":
+                codigo = texto[i + 2:i + 6]
+                if len(codigo) < 4:
+                    break
+                try:
+                    resultado.append(chr(int(codigo, 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            resultado.append(_ESCAPES.get(siguiente, siguiente))
+            i += 2
+            continue
+        resultado.append(caracter)
+        i += 1
+    return "".join(resultado)
+
+
+def extraer_campos_parciales(texto: str) -> Dict[str, str]:
+    """Devuelve el valor (posiblemente incompleto) de cada campo de respuesta presente en `texto`."""
+    campos = {}
+    for campo in CAMPOS_RESPUESTA:
+        coincidencia = re.search(r'"%s"\s*:\s*"' % campo, texto)
+        if coincidencia:
+            campos[campo] = _leer_cadena_parcial(texto, coincidencia.end())
+    return campos
@@ -35,13 +35,13 @@ import App.validador as validador
 # Función de Prueba (SIMPLIFICADA)
 # ---------------------------------------------------------------------
 
-def test_luzia_pipeline_output_only(pregunta: str, curso_set: str, grado_set: str):
+def test_eva_pipeline_output_only(pregunta: str, curso_set: str, grado_set: str):
     """
-    Ejecuta el pipeline de Luzia y SOLO imprime el diccionario de salida.
+    Ejecuta el pipeline de EVA y SOLO imprime el diccionario de salida.
     """
     try:
         # Llamamos a la función de envoltura para la ejecución
-        resultado: Dict = validador.run_luzia_pipeline( 
+        resultado: Dict = validador.run_eva_pipeline(
             grado_sistema=grado_set, 
             curso_sistema=curso_set, 
             pregunta=pregunta
@@ -61,7 +61,7 @@ def test_luzia_pipeline_output_only(pregunta: str, curso_set: str, grado_set: st
 if __name__ == "__main__":
     # Caso de Prueba que falla (Maestría en Comunicación en 1° Secundaria)
     print("\n--- INICIO DE PRUEBA DE SALIDA (raw output) ---")
-    test_luzia_pipeline_output_only(
+    test_eva_pipeline_output_only(
         pregunta="que es la fotosintesis",
         curso_set="Ciencia y Tecnología",
         grado_set="1° Secundaria"
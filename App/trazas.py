@@ -0,0 +1,207 @@
+# app/trazas.py
+# =====================================================
+# 🔹 EVA - Trazas Locales con Muestreo por Cola (tail sampling)
+# =====================================================
+# Sustituye a LangSmith siempre activo. Los tramos de cada pregunta (etapas
+# medidas en App/metricas.py y llamadas al LLM) se acumulan en memoria bajo
+# su id de traza; al terminar la pregunta se decide si se conserva:
+#   - siempre si algún tramo falló o si la pregunta tardó ≥ EVA_TRAZAS_LENTA_S,
+#   - el resto con probabilidad EVA_TRAZAS_MUESTREO.
+# Las trazas conservadas se encolan sin bloquear y un hilo de fondo las
+# escribe por lotes en un JSONL local (o las envía por POST a un colector).
+#
+# LangSmith sigue disponible con EVA_LANGSMITH=1 (ver App/config.py).
+
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from App.config import LOGS_DIR
+from App.metricas import METRICAS_ACTIVAS, registrar_observador
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+TRAZAS_ACTIVAS = os.getenv("EVA_TRAZAS", "1") == "1"
+TASA_MUESTREO = float(os.getenv("EVA_TRAZAS_MUESTREO", "0.05"))
+UMBRAL_LENTA_S = float(os.getenv("EVA_TRAZAS_LENTA_S", "20"))
+RUTA_TRAZAS = os.getenv("EVA_TRAZAS_RUTA", os.path.join(LOGS_DIR, "trazas.jsonl"))
+URL_COLECTOR = os.getenv("EVA_TRAZAS_COLECTOR", "")  # p. ej. http://localhost:4318/eva/trazas
+TAMANO_LOTE = int(os.getenv("EVA_TRAZAS_LOTE", "50"))
+INTERVALO_EXPORTACION_S = float(os.getenv("EVA_TRAZAS_INTERVALO", "5"))
+MAX_COLA = int(os.getenv("EVA_TRAZAS_MAX_COLA", "1000"))
+MAX_TRAMOS_POR_TRAZA = 200
+MAX_TRAZAS_ABIERTAS = 5000
+
+
+# ----------------------------------------------------
+# 2. EXPORTADOR POR LOTES (hilo de fondo)
+# ----------------------------------------------------
+class ExportadorLotes:
+    """Cola acotada + hilo que vacía lotes a un JSONL o a un colector HTTP."""
+
+    def __init__(self, ruta: str = RUTA_TRAZAS, url_colector: str = URL_COLECTOR):
+        self.ruta = ruta
+        self.url_colector = url_colector
+        self._cola: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=MAX_COLA)
+        self._lock = threading.Lock()
+        self.contadores = {"encoladas": 0, "exportadas": 0, "descartadas_cola_llena": 0, "errores_exportacion": 0}
+        self._hilo = threading.Thread(target=self._bucle, daemon=True, name="eva-trazas")
+        self._hilo.start()
+
+    def enviar(self, registro: Dict[str, Any]) -> None:
+        """Nunca bloquea: si la cola está llena, la traza se descarta y se cuenta."""
+        try:
+            self._cola.put_nowait(registro)
+            self._sumar("encoladas")
+        except queue.Full:
+            self._sumar("descartadas_cola_llena")
+
+    def _sumar(self, clave: str, valor: int = 1):
+        with self._lock:
+            self.contadores[clave] += valor
+
+    def _bucle(self):
+        while True:
+            lote: List[Dict[str, Any]] = []
+            limite = time.monotonic() + INTERVALO_EXPORTACION_S
+            terminar = False
+            while len(lote) < TAMANO_LOTE:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    registro = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if registro is None:
+                    terminar = True
+                    break
+                lote.append(registro)
+            if lote:
+                self._exportar(lote)
+            if terminar:
+                return
+
+    def _exportar(self, lote: List[Dict[str, Any]]):
+        lineas = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in lote)
+        try:
+            if self.url_colector:
+                import httpx
+                httpx.post(
+                    self.url_colector, content=lineas.encode("utf-8"),
+                    headers={"Content-Type": "application/x-ndjson"}, timeout=10.0,
+                ).raise_for_status()
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    f.write(lineas)
+            self._sumar("exportadas", len(lote))
+        except Exception as e:
+            self._sumar("errores_exportacion", len(lote))
+            print(f"⚠️ No se pudieron exportar {len(lote)} trazas: {type(e).__name__}: {e}")
+
+    def cerrar(self, espera_s: float = 5.0):
+        """Vacía lo pendiente (se llama al salir del proceso)."""
+        try:
+            self._cola.put(None, timeout=espera_s)
+        except queue.Full:
+            return
+        self._hilo.join(timeout=espera_s)
+
+
+# ----------------------------------------------------
+# 3. MUESTREO POR COLA
+# ----------------------------------------------------
+class MuestreadorTrazas:
+    """Observador de App/metricas.py: agrupa tramos por traza y decide al cerrar la traza."""
+
+    def __init__(self, exportador: ExportadorLotes, tasa: float = TASA_MUESTREO, umbral_lenta_s: float = UMBRAL_LENTA_S):
+        self.exportador = exportador
+        self.tasa = tasa
+        self.umbral_lenta_s = umbral_lenta_s
+        self._abiertas: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._azar = random.Random()
+        self.contadores = {
+            "trazas": 0, "por_error": 0, "por_lentitud": 0, "por_muestreo": 0, "no_muestreadas": 0,
+            "tramos": 0, "sobrecosto_s": 0.0,
+        }
+
+    def en_tramo(self, tramo: Dict[str, Any]) -> None:
+        inicio = time.perf_counter()
+        identificador = tramo.get("traza")
+        if identificador is not None:
+            with self._lock:
+                tramos = self._abiertas.get(identificador)
+                if tramos is None:
+                    if len(self._abiertas) >= MAX_TRAZAS_ABIERTAS:
+                        self._abiertas.pop(next(iter(self._abiertas)))  # la más antigua
+                    tramos = self._abiertas[identificador] = []
+                if len(tramos) < MAX_TRAMOS_POR_TRAZA:
+                    tramos.append(tramo)
+                self.contadores["tramos"] += 1
+                self.contadores["sobrecosto_s"] += time.perf_counter() - inicio
+
+    def en_fin_traza(self, identificador: str, segundos: float) -> None:
+        inicio = time.perf_counter()
+        with self._lock:
+            tramos = self._abiertas.pop(identificador, [])
+        motivo = self._decidir(tramos, segundos)
+        if motivo is not None:
+            self.exportador.enviar({
+                "traza": identificador, "motivo": motivo, "segundos": round(segundos, 4),
+                "inicio": time.time() - segundos, "tramos": tramos,
+            })
+        with self._lock:
+            self.contadores["trazas"] += 1
+            self.contadores[f"por_{motivo}" if motivo else "no_muestreadas"] += 1
+            self.contadores["sobrecosto_s"] += time.perf_counter() - inicio
+
+    def _decidir(self, tramos: List[Dict[str, Any]], segundos: float) -> Optional[str]:
+        if any(t.get("error") for t in tramos):
+            return "error"
+        if segundos >= self.umbral_lenta_s:
+            return "lentitud"
+        if self._azar.random() < self.tasa:
+            return "muestreo"
+        return None
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            datos = dict(self.contadores)
+            datos["trazas_abiertas"] = len(self._abiertas)
+        datos["sobrecosto_medio_ms"] = round(1000 * datos["sobrecosto_s"] / datos["trazas"], 4) if datos["trazas"] else 0.0
+        datos.update(self.exportador.contadores)
+        return datos
+
+
+# ----------------------------------------------------
+# 4. INICIALIZACIÓN
+# ----------------------------------------------------
+_muestreador: Optional[MuestreadorTrazas] = None
+_inicio_lock = threading.Lock()
+
+
+def iniciar_trazas() -> Optional[MuestreadorTrazas]:
+    """Registra el muestreador en App/metricas.py (una sola vez). Requiere EVA_METRICAS=1."""
+    global _muestreador
+    with _inicio_lock:
+        if _muestreador is None and TRAZAS_ACTIVAS and METRICAS_ACTIVAS:
+            exportador = ExportadorLotes()
+            _muestreador = MuestreadorTrazas(exportador)
+            registrar_observador(_muestreador)
+            atexit.register(exportador.cerrar)
+            destino = URL_COLECTOR or RUTA_TRAZAS
+            print(f"🧵 Trazas locales: muestreo {TASA_MUESTREO:.0%}, errores y > {UMBRAL_LENTA_S:.0f}s siempre → {destino}")
+        return _muestreador
+
+
+def estadisticas_trazas() -> Dict[str, Any]:
+    """Trazas conservadas por motivo, cola del exportador y sobrecosto medio por pregunta."""
+    return _muestreador.estadisticas() if _muestreador is not None else {}
@@ -2,11 +2,12 @@
 import streamlit as st
 import sys
 import os
+import uuid
 ##pip install streamlit
 # Agregamos la carpeta raíz (EVA) al sys.path para que Python encuentre main.py
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from main import procesar_pregunta
+from main import procesar_pregunta_stream, formatear_campos_respuesta
 from courses_data import cursos_por_grado, descripcion_cursos
 
 # =========================
@@ -15,6 +16,10 @@ from courses_data import cursos_por_grado, descripcion_cursos
 def main():
     st.set_page_config(page_title="EVA - Asistente Educativo", page_icon="🤖", layout="centered")
 
+    # Cada pestaña del navegador es una sesión: su propio hilo de memoria por curso
+    if "sesion_id" not in st.session_state:
+        st.session_state["sesion_id"] = uuid.uuid4().hex
+
     # Encabezado
     st.title("💡 EVA - Asistente Educativa Inteligente")
     st.markdown("Aprende, consulta y explora conocimientos según tu grado y curso escolar.")
@@ -39,18 +44,54 @@ def main():
 
     if st.button("Enviar pregunta"):
         if pregunta.strip():
-            with st.spinner("EVA está analizando tu pregunta..."):
-                try:
-                    respuesta = procesar_pregunta(pregunta, grado, curso)
-                    st.markdown(respuesta)
-                except Exception as e:
-                    st.error(f"Ocurrió un error al procesar la pregunta: {e}")
+            mostrar_respuesta_en_streaming(pregunta, grado, curso, st.session_state["sesion_id"])
         else:
             st.warning("Por favor, escribe una pregunta antes de enviar.")
 
     st.divider()
     st.caption("Desarrollado por Junova — Proyecto Final IA Generativa (EVA)")
 
+# =========================
+#   RESPUESTA PROGRESIVA
+# =========================
+def mostrar_respuesta_en_streaming(pregunta: str, grado: str, curso: str, sesion_id: str):
+    """Pinta las etapas del flujo y la respuesta del agente a medida que llegan los tokens."""
+    estado = st.status("EVA está analizando tu pregunta...", expanded=False)
+    contenedor = st.empty()
+
+    try:
+        for evento in procesar_pregunta_stream(pregunta, grado, curso, sesion_id):
+            tipo = evento["evento"]
+
+            if tipo == "validado":
+                if evento["valido"]:
+                    estado.update(label=f"✅ Pregunta validada para {evento['curso']}. Consultando al especialista...")
+                else:
+                    estado.update(label="⚠️ La pregunta no pasó la validación.")
+
+            elif tipo == "herramienta_inicio":
+                estado.write(f"🔧 Usando herramienta: `{evento['herramienta']}`")
+
+            elif tipo == "herramienta_fin":
+                estado.write(f"✔️ Herramienta `{evento['herramienta']}` terminada. Redactando respuesta...")
+
+            elif tipo == "parcial":
+                if "explicacion_profunda" in evento or "parrafo_ejemplo" in evento:
+                    contenedor.markdown(formatear_campos_respuesta(
+                        curso, evento.get("explicacion_profunda", ""), evento.get("parrafo_ejemplo", "")
+                    ))
+                elif not evento["texto"].lstrip().startswith(("{", "`")):
+                    contenedor.markdown(evento["texto"])
+
+            elif tipo == "final":
+                contenedor.markdown(evento["respuesta"])
+                estado.update(label="Respuesta lista", state="complete")
+
+    except Exception as e:
+        estado.update(label="Error", state="error")
+        st.error(f"Ocurrió un error al procesar la pregunta: {e}")
+
+
 # =========================
 #   EJECUCIÓN PRINCIPAL
 # =========================
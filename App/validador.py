@@ -3,7 +3,6 @@
 # 🔹 LUZIA - Cadena Modular de Validación y Generación de Prompt
 # =====================================================
 
-from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableLambda, RunnableSequence, RunnableParallel
@@ -11,14 +10,14 @@ from typing import Dict, Any
 import json 
 import os 
 
+from App.clasificador_curso import CURSOS, ClasificadorCurso, UMBRAL_CONFIANZA
+from App.enrutador_modelos import ESCALADO_ACTIVO, enrutar, llm_para
+from App.metricas import medir
+
 # ----------------------------------------------------
 # 1. INICIALIZACIÓN DE COMPONENTES (GLOBAL)
 # ----------------------------------------------------
-llm_validator = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.2,
-    verbose=True
-)
+llm_validator = llm_para("validador", verbose=True)
 
 parser = StrOutputParser()
 
@@ -41,6 +40,41 @@ Pregunta: {pregunta}
 """)
 curso_chain = curso_prompt | llm_validator | parser
 
+# Ruta rápida: clasificador local; el LLM solo se usa si la confianza es baja
+clasificador_local = ClasificadorCurso()
+
+def detectar_curso(pregunta: str) -> str:
+    """
+    Detecta el curso con el clasificador local y recurre a curso_chain si la confianza
+    no supera UMBRAL_CONFIANZA. Las etiquetas del LLM realimentan al clasificador.
+    """
+    with medir("deteccion_curso"):
+        curso_local, confianza = clasificador_local.predecir(pregunta)
+        if curso_local and confianza >= UMBRAL_CONFIANZA:
+            return curso_local
+
+        curso_llm = curso_chain.invoke({"pregunta": pregunta}).strip()
+        if curso_llm not in CURSOS and ESCALADO_ACTIVO:
+            # El modelo rápido no devolvió un curso de la lista: se repite con el fuerte
+            with enrutar("validador", escalado=True):
+                curso_llm = (curso_prompt | llm_para("validador") | parser).invoke({"pregunta": pregunta}).strip()
+    clasificador_local.registrar(pregunta, curso_llm)
+    return curso_llm
+
+async def detectar_curso_async(pregunta: str) -> str:
+    """Versión asíncrona de detectar_curso (curso_chain.ainvoke como respaldo)."""
+    with medir("deteccion_curso"):
+        curso_local, confianza = clasificador_local.predecir(pregunta)
+        if curso_local and confianza >= UMBRAL_CONFIANZA:
+            return curso_local
+
+        curso_llm = (await curso_chain.ainvoke({"pregunta": pregunta})).strip()
+        if curso_llm not in CURSOS and ESCALADO_ACTIVO:
+            with enrutar("validador", escalado=True):
+                curso_llm = (await (curso_prompt | llm_para("validador") | parser).ainvoke({"pregunta": pregunta})).strip()
+    clasificador_local.registrar(pregunta, curso_llm)
+    return curso_llm
+
 ########### cadena 3 (Contraste Python Pura)
 def generar_contraste_binario_estructurado(datos: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -107,6 +141,33 @@ DATOS DE ENTRADA:
 """)
 generar_prompt_agente = prompt_especializado | llm_validator | parser
 
+########## cadena 4 local (Render determinista de la misma plantilla, sin LLM)
+# "local" evita la segunda llamada al LLM; "llm" conserva el comportamiento original.
+CADENA4_MODO = os.getenv("EVA_CADENA4_MODO", "local")
+
+def renderizar_prompt_agente(datos: Dict[str, Any]) -> str:
+    """
+    Rellena en Python las dos ramas de prompt_especializado: el bloque [COMANDO_AGENTE]
+    si la pregunta es válida, o el mensaje JSON de curso incorrecto si no lo es.
+    """
+    if datos.get("valido"):
+        return (
+            "[COMANDO_AGENTE]\n"
+            f"ANALIZA_TEMA: {datos.get('entrada_usuario', '')}\n"
+            f"CONTEXTO_EDUCATIVO: {datos.get('curso_sistema', '')}\n"
+            "ACCIÓN: Generar respuesta pedagógica, clara y precisa."
+        )
+
+    curso_detectado = datos.get("curso_detectado", "")
+    mensaje = (
+        f"La pregunta no corresponde al curso de **{curso_detectado}**. "
+        f"Fue clasificada como **{curso_detectado}**. "
+        f"Por favor, reformula tu pregunta dentro del contexto de **{curso_detectado}**."
+    )
+    return json.dumps({"respuesta": mensaje}, ensure_ascii=False)
+
+generar_prompt_local = RunnableLambda(renderizar_prompt_agente)
+
 
 # =======================================================================
 # 3. COMPILACIÓN DEL PIPELINE GLOBAL
@@ -114,14 +175,20 @@ generar_prompt_agente = prompt_especializado | llm_validator | parser
 
 # Solo necesitamos la Cadena 2 (detección del curso)
 deteccion_parallel = RunnableParallel(
-    # C2: Detecta el curso
-    curso_detectado = RunnableLambda(lambda x: curso_chain.invoke({"pregunta": x["entrada_usuario"]}).strip()),
+    # C2: Detecta el curso (clasificador local → curso_chain como respaldo)
+    curso_detectado = RunnableLambda(
+        lambda x: detectar_curso(x["entrada_usuario"]),
+        afunc=lambda x: detectar_curso_async(x["entrada_usuario"]),
+    ),
 )
 
+async def _acombinar_deteccion(x: Dict[str, Any]) -> Dict[str, Any]:
+    return {**x, **(await deteccion_parallel.ainvoke(x))}
+
 # El pipeline de decisión es ahora C2 -> C3
 pipeline_decision = RunnableSequence(
     # Paso 1: Ejecutar la detección del curso y añadirla al contexto
-    RunnableLambda(lambda x: {**x, **deteccion_parallel.invoke(x)}), 
+    RunnableLambda(lambda x: {**x, **deteccion_parallel.invoke(x)}, afunc=_acombinar_deteccion), 
     
     # Paso 2: Ejecutar la Cadena 3 (Contraste Python Pura) para obtener 'valido' y 'mensaje_base'
     contraste_chain 
@@ -133,7 +200,8 @@ pipeline_decision = RunnableSequence(
 # =======================================================================
 def run_eva_pipeline(grado_sistema: str, curso_sistema: str, pregunta: str) -> Dict:
     """
-    Ejecuta el pipeline LCEL simplificado (C2 -> C3) y luego la Cadena 4.
+    Ejecuta el pipeline LCEL simplificado (C2 -> C3) y luego la Cadena 4
+    (render local o LLM según CADENA4_MODO).
     """
     input_pipeline = {
         "entrada_usuario": pregunta,
@@ -145,9 +213,38 @@ def run_eva_pipeline(grado_sistema: str, curso_sistema: str, pregunta: str) -> D
     resultado_decision = pipeline_decision.invoke(input_pipeline) 
     
     # 2. Ejecutar la Generación Final (Cadena 4)
-    texto_final = generar_prompt_agente.invoke(resultado_decision).strip()
+    cadena4 = generar_prompt_agente if CADENA4_MODO == "llm" else generar_prompt_local
+    with medir("cadena4"):
+        texto_final = cadena4.invoke(resultado_decision).strip()
     
     # 3. Formatear la Salida para el sistema (fuera de LCEL)
+    return _formatear_salida(resultado_decision, texto_final, curso_sistema)
+
+
+async def run_eva_pipeline_async(grado_sistema: str, curso_sistema: str, pregunta: str) -> Dict:
+    """
+    Versión asíncrona de run_eva_pipeline: las llamadas al LLM usan ainvoke y
+    no bloquean el event loop.
+    """
+    input_pipeline = {
+        "entrada_usuario": pregunta,
+        "grado_sistema": grado_sistema,
+        "curso_sistema": curso_sistema,
+    }
+
+    resultado_decision = await pipeline_decision.ainvoke(input_pipeline)
+
+    with medir("cadena4"):
+        if CADENA4_MODO == "llm":
+            texto_final = (await generar_prompt_agente.ainvoke(resultado_decision)).strip()
+        else:
+            texto_final = renderizar_prompt_agente(resultado_decision).strip()
+
+    return _formatear_salida(resultado_decision, texto_final, curso_sistema)
+
+
+def _formatear_salida(resultado_decision: Dict[str, Any], texto_final: str, curso_sistema: str) -> Dict:
+    """Empaqueta el diagnóstico y el prompt final en el formato que consume main.py."""
     es_valido = resultado_decision.get("valido", False)
 
     if es_valido:
@@ -0,0 +1,112 @@
+# Benchmarks/bench_arranque.py
+# =====================================================
+# 🔹 EVA - Benchmark de Arranque (importación y primera respuesta por agente)
+# =====================================================
+# Cada medición corre en un intérprete nuevo (arranque en frío):
+#   - import main
+#   - construcción del agente de cada curso (registro perezoso)
+#   - primera respuesta completa de ese curso (validador + agente), sin caché
+#
+# Uso:
+#   python Benchmarks/bench_arranque.py                      # todos los cursos
+#   python Benchmarks/bench_arranque.py --solo-construccion  # sin llamadas a la API
+#   python Benchmarks/bench_arranque.py --repeticiones 3
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+GRADO = "1° Secundaria"
+PREGUNTAS_POR_CURSO = {
+    "Matemática": "¿Qué es una fracción equivalente?",
+    "Comunicación": "¿Qué es un texto argumentativo?",
+    "Ciencia y Tecnología": "¿Qué es la fotosíntesis?",
+    "Educación para el Trabajo": "¿Qué es un prototipo?",
+    "Inglés": "¿Cómo se usa el presente simple en inglés?",
+}
+
+
+# ----------------------------------------------------
+# 1. MEDICIÓN EN UN PROCESO NUEVO
+# ----------------------------------------------------
+def _medir_en_proceso(curso: str, solo_construccion: bool) -> dict:
+    """Se ejecuta dentro del subproceso: mide import, construcción y primera respuesta."""
+    inicio = time.perf_counter()
+    import main
+    resultado = {"curso": curso, "import_main_s": time.perf_counter() - inicio}
+
+    inicio = time.perf_counter()
+    main._cargar_configuracion()
+    ejecutor = main.AGENTS_EXECUTORS.get(curso)
+    resultado["construccion_s"] = time.perf_counter() - inicio
+    resultado["construido"] = ejecutor is not None
+
+    if not solo_construccion and ejecutor is not None:
+        inicio = time.perf_counter()
+        respuesta = main.procesar_pregunta(PREGUNTAS_POR_CURSO[curso], GRADO, curso, "bench_arranque")
+        resultado["primera_respuesta_s"] = time.perf_counter() - inicio
+        resultado["respuesta_ok"] = respuesta.startswith("✅")
+    return resultado
+
+
+def _lanzar(curso: str, solo_construccion: bool) -> dict:
+    comando = [sys.executable, os.path.abspath(__file__), "--proceso", curso]
+    if solo_construccion:
+        comando.append("--solo-construccion")
+    entorno = dict(
+        os.environ, EVA_CACHE_RESPUESTAS="0", EVA_PRECARGAR_AGENTES="0",
+        EVA_CLASIFICADOR_REGISTROS="", EVA_TRAZAS_RUTA=os.path.join(tempfile.gettempdir(), "eva_bench_trazas.jsonl"),
+    )
+    salida = subprocess.run(comando, cwd=RAIZ, env=entorno, capture_output=True, text=True)
+    for linea in reversed(salida.stdout.splitlines()):
+        if linea.startswith("{"):
+            return json.loads(linea)
+    raise RuntimeError(f"El subproceso de {curso} falló:\n{salida.stderr[-2000:]}")
+
+
+# ----------------------------------------------------
+# 2. REPORTE
+# ----------------------------------------------------
+def _mediana(valores):
+    valores = [v for v in valores if v is not None]
+    return statistics.median(valores) if valores else None
+
+
+def _formato(segundos) -> str:
+    return f"{segundos:8.3f}" if segundos is not None else "       -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempos de arranque en frío de EVA por agente.")
+    parser.add_argument("--proceso", help=argparse.SUPPRESS)
+    parser.add_argument("--solo-construccion", action="store_true", help="No hace llamadas a la API.")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--cursos", nargs="*", default=list(PREGUNTAS_POR_CURSO))
+    args = parser.parse_args()
+
+    if args.proceso:
+        print(json.dumps(_medir_en_proceso(args.proceso, args.solo_construccion), ensure_ascii=False))
+        return
+
+    print(f"⏱️ Arranque en frío ({args.repeticiones} repetición(es) por curso, mediana en segundos)\n")
+    print(f"{'Curso':<28}{'import main':>12}{'agente':>10}{'1ª resp.':>10}")
+    for curso in args.cursos:
+        medidas = [_lanzar(curso, args.solo_construccion) for _ in range(args.repeticiones)]
+        print(
+            f"{curso:<28}"
+            f"{_formato(_mediana([m['import_main_s'] for m in medidas])):>12}"
+            f"{_formato(_mediana([m['construccion_s'] for m in medidas])):>10}"
+            f"{_formato(_mediana([m.get('primera_respuesta_s') for m in medidas])):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
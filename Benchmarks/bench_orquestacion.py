@@ -0,0 +1,176 @@
+# Benchmarks/bench_orquestacion.py
+# =====================================================
+# 🔹 EVA - Benchmark de Orquestación sin Conexión (p50/p95/p99 por etapa)
+# =====================================================
+# Sustituye ChatOpenAI y Tavily por los falsos de Benchmarks/falsos.py (sin
+# claves ni red) y mide tres etapas:
+#   - validador           → run_eva_pipeline
+#   - agente:<curso>      → executor.invoke (ciclo ReAct completo, hilo nuevo)
+#   - procesar_pregunta   → flujo completo de main, sin caché de respuestas
+# Para cada etapa se reporta el tiempo total y el "propio" (total menos la
+# latencia simulada del proveedor), que es el costo de grafo, parseo y formateo,
+# junto con cuántas iteraciones terminaron bien (✅ o validación aprobada): una
+# fila que mide un rechazo o un error no es comparable con las demás.
+#
+# Uso:
+#   python Benchmarks/bench_orquestacion.py
+#   python Benchmarks/bench_orquestacion.py --iteraciones 50 --latencia-llm lognormal:0.8:0.4
+#   python Benchmarks/bench_orquestacion.py --sin-latencia   # solo costo propio
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+# Antes de importar main: sin cachés (cada iteración recorre el flujo), sin claves y sin
+# escribir en Logs/: las etiquetas de los modelos falsos no entran al registro del que se
+# reentrena el clasificador, y las trazas van a un directorio temporal
+os.environ.update({
+    "EVA_CACHE_RESPUESTAS": "0",
+    "EVA_CACHE_BUSQUEDAS": "0",
+    "EVA_CACHE_HERRAMIENTAS": "0",
+    "EVA_BANCO_RESPUESTAS": "0",
+    "EVA_ENRUTADOR_LOG": "",
+    "EVA_CLAVES_OBLIGATORIAS": "0",
+    "EVA_PRECARGAR_AGENTES": "0",
+    "EVA_CLASIFICADOR_REGISTROS": "",
+    "EVA_TRAZAS_RUTA": os.path.join(tempfile.mkdtemp(prefix="eva_bench_"), "trazas.jsonl"),
+    "LANGCHAIN_TRACING_V2": "false",
+})
+
+from Benchmarks.falsos import instalar_falsos, latencia_simulada, reiniciar_latencia_simulada
+from Benchmarks.bench_arranque import GRADO, PREGUNTAS_POR_CURSO
+
+
+# ----------------------------------------------------
+# 1. MEDICIÓN
+# ----------------------------------------------------
+def _medir(funcion) -> dict:
+    """Ejecuta `funcion` y devuelve su tiempo total, la parte simulada del proveedor y si terminó bien."""
+    reiniciar_latencia_simulada()
+    inicio = time.perf_counter()
+    salida = funcion()
+    total = time.perf_counter() - inicio
+    simulada = latencia_simulada()
+    proveedor = simulada["llm_s"] + simulada["busqueda_s"]
+    return {"total_s": total, "propio_s": max(0.0, total - proveedor), "ok": _termino_bien(salida)}
+
+
+def _termino_bien(salida) -> bool:
+    """Respuesta de main que empieza con ✅, o resultado del validador con valido=True."""
+    if isinstance(salida, dict):
+        return bool(json.loads(salida.get("validacion_json") or "{}").get("valido"))
+    return isinstance(salida, str) and salida.startswith("✅")
+
+
+def _percentil(valores, p: float) -> float:
+    """Percentil por rango más cercano."""
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+def _etapas(main, cursos):
+    """(nombre, función sin argumentos) de cada etapa a medir."""
+    validador = main._validador()
+    etapas = [(
+        "validador",
+        lambda: validador.run_eva_pipeline(GRADO, "Matemática", PREGUNTAS_POR_CURSO["Matemática"]),
+    )]
+
+    for curso in cursos:
+        ejecutor = main.AGENTS_EXECUTORS.get(curso)
+        if ejecutor is None:
+            continue
+        pregunta = PREGUNTAS_POR_CURSO[curso]
+
+        def _agente(ejecutor=ejecutor, pregunta=pregunta):
+            config = {"configurable": {"thread_id": f"bench_{uuid.uuid4().hex}"}}
+            respuesta = ejecutor.invoke({"messages": [main.HumanMessage(content=pregunta)]}, config)
+            return main._formatear_respuesta_agente(respuesta, curso)
+
+        etapas.append((f"agente:{curso}", _agente))
+
+    for curso in cursos:
+        pregunta = PREGUNTAS_POR_CURSO[curso]
+        etapas.append((
+            f"procesar_pregunta:{curso}",
+            lambda curso=curso, pregunta=pregunta: main.procesar_pregunta(
+                pregunta, GRADO, curso, f"bench_{uuid.uuid4().hex}"
+            ),
+        ))
+    return etapas
+
+
+# ----------------------------------------------------
+# 2. EJECUCIÓN Y REPORTE
+# ----------------------------------------------------
+def ejecutar_benchmark(iteraciones: int, cursos, calentamiento: int = 1) -> dict:
+    import main
+
+    resultados = {}
+    for nombre, funcion in _etapas(main, cursos):
+        for _ in range(calentamiento):
+            funcion()
+        medidas = [_medir(funcion) for _ in range(iteraciones)]
+        resultados[nombre] = {
+            "n": iteraciones,
+            "ok": sum(m["ok"] for m in medidas),
+            **{f"total_p{p}_ms": _percentil([m["total_s"] for m in medidas], p) * 1000 for p in (50, 95, 99)},
+            **{f"propio_p{p}_ms": _percentil([m["propio_s"] for m in medidas], p) * 1000 for p in (50, 95, 99)},
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por etapa de EVA con LLM y búsqueda falsos.")
+    parser.add_argument("--iteraciones", type=int, default=20)
+    parser.add_argument("--cursos", nargs="*", default=list(PREGUNTAS_POR_CURSO))
+    parser.add_argument("--latencia-llm", default="lognormal:0.8:0.4", help="p. ej. constante:0.5, normal:0.8:0.2")
+    parser.add_argument("--latencia-busqueda", default="lognormal:0.6:0.5")
+    parser.add_argument("--sin-latencia", action="store_true", help="Proveedores instantáneos (solo costo propio).")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="Guarda también los resultados en este archivo.")
+    args = parser.parse_args()
+
+    if args.sin_latencia:
+        args.latencia_llm = args.latencia_busqueda = "constante:0"
+    instalar_falsos(args.latencia_llm, args.latencia_busqueda, args.semilla)
+
+    resultados = ejecutar_benchmark(args.iteraciones, args.cursos)
+
+    print(f"\n⏱️ Orquestación sin conexión ({args.iteraciones} iteraciones, LLM={args.latencia_llm}, "
+          f"búsqueda={args.latencia_busqueda}) — milisegundos\n")
+    print(f"{'Etapa':<44}{'ok':>7}{'total p50':>10}{'p95':>9}{'p99':>9}{'propio p50':>12}{'p95':>9}{'p99':>9}")
+    for nombre, r in resultados.items():
+        print(
+            f"{nombre:<44}{r['ok']:>4}/{r['n']:<2}"
+            f"{r['total_p50_ms']:>10.1f}{r['total_p95_ms']:>9.1f}{r['total_p99_ms']:>9.1f}"
+            f"{r['propio_p50_ms']:>12.1f}{r['propio_p95_ms']:>9.1f}{r['propio_p99_ms']:>9.1f}"
+        )
+
+    fallidas = [nombre for nombre, r in resultados.items() if r["ok"] < r["n"]]
+    if fallidas:
+        print(f"\n⚠️ Etapas con iteraciones rechazadas o con error (sus tiempos no miden una respuesta): "
+              f"{', '.join(fallidas)}")
+
+    from App.trazas import estadisticas_trazas
+    trazas = estadisticas_trazas()
+    if trazas.get("trazas"):
+        print(f"\n🧵 Trazas: {trazas['sobrecosto_medio_ms']:.3f} ms de sobrecosto medio por pregunta "
+              f"({trazas['trazas']} trazas, {trazas['encoladas']} conservadas; EVA_TRAZAS=0 para comparar)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# Benchmarks/falsos.py
+# =====================================================
+# 🔹 EVA - Modelos y Búsqueda Falsos para Benchmarks sin Conexión
+# =====================================================
+# ModeloFalso sustituye a ChatOpenAI y BuscadorFalso a TavilySearchResults.
+# Ambos son deterministas (misma semilla → mismas respuestas y latencias) y
+# duermen una latencia muestreada de una distribución configurable. La latencia
+# simulada se acumula aparte para poder restarla del tiempo total y medir solo
+# el costo propio de EVA (grafo, parseo, formateo).
+
+import asyncio
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from Agents.esquemas import NOMBRE_HERRAMIENTA_RESPUESTA
+
+
+# ----------------------------------------------------
+# 1. DISTRIBUCIONES DE LATENCIA
+# ----------------------------------------------------
+class DistribucionLatencia:
+    """
+    "constante:0.5", "normal:0.8:0.2", "lognormal:0.8:0.5" (mediana, sigma)
+    o "uniforme:0.2:1.0". Los valores están en segundos.
+    """
+
+    def __init__(self, especificacion: str = "constante:0", semilla: int = 0):
+        partes = especificacion.split(":")
+        self.tipo = partes[0]
+        self.parametros = [float(p) for p in partes[1:]]
+        self.especificacion = especificacion
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def muestrear(self) -> float:
+        with self._lock:
+            if self.tipo == "constante":
+                valor = self.parametros[0]
+            elif self.tipo == "normal":
+                valor = self._azar.gauss(self.parametros[0], self.parametros[1])
+            elif self.tipo == "lognormal":
+                mediana, sigma = self.parametros
+                valor = mediana * self._azar.lognormvariate(0, sigma) if mediana > 0 else 0.0
+            elif self.tipo == "uniforme":
+                valor = self._azar.uniform(self.parametros[0], self.parametros[1])
+            else:
+                raise ValueError(f"Distribución de latencia desconocida: {self.especificacion}")
+        return max(0.0, valor)
+
+
+# Latencia simulada acumulada (los benchmarks corren las iteraciones en serie)
+_latencia_lock = threading.Lock()
+_latencia_simulada = {"llm_s": 0.0, "busqueda_s": 0.0, "llamadas_llm": 0, "busquedas": 0}
+
+
+def _dormir(distribucion: DistribucionLatencia, clave: str, contador: str):
+    espera = distribucion.muestrear()
+    time.sleep(espera)
+    with _latencia_lock:
+        _latencia_simulada[clave] += espera
+        _latencia_simulada[contador] += 1
+
+
+async def _adormir(distribucion: DistribucionLatencia, clave: str, contador: str):
+    """Como _dormir, pero sin ocupar un hilo (camino asíncrono)."""
+    espera = distribucion.muestrear()
+    await asyncio.sleep(espera)
+    with _latencia_lock:
+        _latencia_simulada[clave] += espera
+        _latencia_simulada[contador] += 1
+
+
+def reiniciar_latencia_simulada() -> None:
+    with _latencia_lock:
+        for clave in _latencia_simulada:
+            _latencia_simulada[clave] = 0 if isinstance(_latencia_simulada[clave], int) else 0.0
+
+
+def latencia_simulada() -> Dict[str, float]:
+    with _latencia_lock:
+        return dict(_latencia_simulada)
+
+
+# ----------------------------------------------------
+# 2. MODELO DE CHAT FALSO
+# ----------------------------------------------------
+class ModeloFalso(BaseChatModel):
+    """
+    Con herramientas (agentes ReAct): llama a la primera herramienta del curso y,
+    al recibir su salida, entrega la respuesta con entregar_respuesta.
+    Sin herramientas: responde al detector de curso con el clasificador local
+    y a las herramientas con un texto determinista de `largo_respuesta` palabras.
+    """
+
+    model_name: str = "modelo-falso"
+    temperature: float = 0.0
+    largo_respuesta: int = 120
+    herramientas: List[str] = []
+    argumentos: Dict[str, str] = {}
+    distribucion: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "modelo-falso"
+
+    def bind_tools(self, tools, **kwargs):
+        nombres = [t.name for t in tools]
+        argumentos = {t.name: next(iter(t.args)) for t in tools if t.args}
+        return self.model_copy(update={"herramientas": nombres, "argumentos": argumentos})
+
+    def with_structured_output(self, schema, **kwargs):
+        """Escalado por esquema inválido: devuelve el esquema con textos deterministas."""
+        from langchain_core.runnables import RunnableLambda
+
+        def _estructurar(mensajes):
+            if self.distribucion is not None:
+                _dormir(self.distribucion, "llm_s", "llamadas_llm")
+            return schema(**{campo: self._texto(str(mensajes))[:200] for campo in schema.model_fields})
+
+        return RunnableLambda(_estructurar)
+
+    def _texto(self, semilla: str) -> str:
+        azar = random.Random(semilla)
+        palabras = ["concepto", "ejemplo", "proceso", "resultado", "estudiante", "análisis", "datos", "idea"]
+        return " ".join(azar.choice(palabras) for _ in range(self.largo_respuesta)) + "."
+
+    def _responder(self, mensajes) -> AIMessage:
+        ultimo = mensajes[-1]
+        contenido = str(ultimo.content)
+
+        if self.herramientas:
+            if isinstance(ultimo, ToolMessage):
+                argumentos = {"explicacion_profunda": contenido, "parrafo_ejemplo": self._texto(contenido)[:200]}
+                return AIMessage(content="", tool_calls=[{
+                    "name": NOMBRE_HERRAMIENTA_RESPUESTA, "args": argumentos, "id": f"call_{uuid.uuid4().hex[:12]}",
+                }])
+            herramienta = next(h for h in self.herramientas if h != NOMBRE_HERRAMIENTA_RESPUESTA)
+            return AIMessage(content="", tool_calls=[{
+                "name": herramienta, "args": {self.argumentos[herramienta]: contenido[:200]},
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }])
+
+        texto_completo = " ".join(str(m.content) for m in mensajes)
+        if "Solo considera estos cursos" in texto_completo:
+            pregunta = texto_completo.split("Pregunta:")[-1].strip()
+            curso, _ = _clasificador().predecir(pregunta)
+            return AIMessage(content=curso or "Matemática")
+        return AIMessage(content=self._texto(contenido))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.distribucion is not None:
+            _dormir(self.distribucion, "llm_s", "llamadas_llm")
+        return ChatResult(generations=[ChatGeneration(message=self._responder(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.distribucion is not None:
+            await _adormir(self.distribucion, "llm_s", "llamadas_llm")
+        return ChatResult(generations=[ChatGeneration(message=self._responder(messages))])
+
+
+_clasificador_cache = None
+
+
+def _clasificador():
+    global _clasificador_cache
+    if _clasificador_cache is None:
+        from App.clasificador_curso import ClasificadorCurso
+        _clasificador_cache = ClasificadorCurso()
+    return _clasificador_cache
+
+
+# ----------------------------------------------------
+# 3. BÚSQUEDA FALSA
+# ----------------------------------------------------
+class BuscadorFalso:
+    """Misma interfaz que TavilySearchResults.invoke / ainvoke({"query": ...})."""
+
+    def __init__(self, max_results: int = 4, distribucion: Optional[DistribucionLatencia] = None):
+        self.max_results = max_results
+        self.distribucion = distribucion
+
+    def invoke(self, entrada: Dict[str, str]) -> List[Dict[str, str]]:
+        if self.distribucion is not None:
+            _dormir(self.distribucion, "busqueda_s", "busquedas")
+        return self._resultados(entrada["query"])
+
+    async def ainvoke(self, entrada: Dict[str, str]) -> List[Dict[str, str]]:
+        if self.distribucion is not None:
+            await _adormir(self.distribucion, "busqueda_s", "busquedas")
+        return self._resultados(entrada["query"])
+
+    def _resultados(self, consulta: str) -> List[Dict[str, str]]:
+        return [
+            {"url": f"https://ejemplo.edu/{i}", "content": f"Resultado {i} sobre {consulta}. " * 5}
+            for i in range(self.max_results)
+        ]
+
+
+# ----------------------------------------------------
+# 4. INSTALACIÓN
+# ----------------------------------------------------
+def instalar_falsos(latencia_llm: str = "constante:0", latencia_busqueda: str = "constante:0", semilla: int = 0):
+    """
+    Reemplaza ChatOpenAI y el cliente Tavily por los falsos. Debe llamarse antes de
+    construir el validador y los agentes (es decir, antes de la primera pregunta).
+    """
+    import langchain_openai
+    import Tools.busqueda_web as busqueda_web
+
+    distribucion_llm = DistribucionLatencia(latencia_llm, semilla)
+    distribucion_busqueda = DistribucionLatencia(latencia_busqueda, semilla + 1)
+
+    def _fabrica_chat(*args, model: str = "modelo-falso", temperature: float = 0.0, **kwargs):
+        return ModeloFalso(model_name=model, temperature=temperature, distribucion=distribucion_llm)
+
+    langchain_openai.ChatOpenAI = _fabrica_chat
+    busqueda_web.obtener_tavily = lambda max_results=4: BuscadorFalso(max_results, distribucion_busqueda)
@@ -0,0 +1,177 @@
+# Tools/busqueda_web.py
+# =====================================================
+# 🔹 EVA - Búsqueda Web Compartida (Tavily) con Caché Persistente
+# =====================================================
+# Un solo cliente TavilySearchResults por max_results para todo el proceso y
+# una caché consulta → resultados en SQLite con TTL, para que los temas
+# curriculares repetidos no vuelvan a salir a la red dentro del TTL.
+# abuscar_web es la versión asíncrona (ainvoke de Tavily) para el camino async.
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+
+from App.coalescencia import VUELOS_BUSQUEDAS
+from App.config import LOGS_DIR
+from App.limitador import LIMITADOR_ACTIVO, MAX_REINTENTOS, obtener_limitador
+from App.metricas import medir
+from Tools.cache_herramientas import AlmacenPersistente
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+CACHE_BUSQUEDAS_ACTIVA = os.getenv("EVA_CACHE_BUSQUEDAS", "1") == "1"
+RUTA_CACHE_BUSQUEDAS = os.path.join(LOGS_DIR, "cache_busquedas.sqlite")
+TTL_BUSQUEDAS = float(os.getenv("EVA_CACHE_BUSQUEDAS_TTL", str(3 * 24 * 3600)))
+MAX_ENTRADAS_BUSQUEDAS = int(os.getenv("EVA_CACHE_BUSQUEDAS_MAX", "5000"))
+
+_lock = threading.Lock()
+_clientes_tavily: Dict[int, TavilySearchResults] = {}
+_almacen: Optional[AlmacenPersistente] = None
+_estadisticas = {"consultas_red": 0, "latencia_red_s": 0.0, "latencia_ahorrada_s": 0.0}
+
+# TavilySearchResults devuelve los errores como texto (repr de la excepción)
+_PATRON_LIMITE = re.compile(r"\b(429|432|433)\b|rate limit|too many requests", re.IGNORECASE)
+_PATRON_TRANSITORIO = re.compile(r"\b50[0234]\b|timeout|timed out|connection", re.IGNORECASE)
+
+
+# ----------------------------------------------------
+# 2. CLIENTE Y ALMACÉN COMPARTIDOS
+# ----------------------------------------------------
+def obtener_tavily(max_results: int = 4) -> TavilySearchResults:
+    """Devuelve el cliente Tavily compartido para ese número de resultados."""
+    with _lock:
+        cliente = _clientes_tavily.get(max_results)
+        if cliente is None:
+            cliente = TavilySearchResults(max_results=max_results)
+            _clientes_tavily[max_results] = cliente
+        return cliente
+
+
+def _obtener_almacen() -> AlmacenPersistente:
+    global _almacen
+    with _lock:
+        if _almacen is None:
+            _almacen = AlmacenPersistente(
+                RUTA_CACHE_BUSQUEDAS, max_entradas=MAX_ENTRADAS_BUSQUEDAS, tabla="busquedas"
+            )
+        return _almacen
+
+
+def _clave_busqueda(consulta: str, max_results: int) -> str:
+    normalizada = " ".join(consulta.lower().split())
+    return hashlib.sha256(f"{max_results}|{normalizada}".encode("utf-8")).hexdigest()
+
+
+# ----------------------------------------------------
+# 3. BÚSQUEDA
+# ----------------------------------------------------
+def buscar_web(consulta: str, max_results: int = 4) -> Any:
+    """
+    Igual que TavilySearchResults.invoke({"query": consulta}), pero con cliente compartido
+    y caché. Solo se cachean las respuestas en lista (las de error llegan como texto).
+    Las búsquedas idénticas simultáneas comparten una sola consulta a Tavily.
+    """
+    clave = _clave_busqueda(consulta, max_results)
+    guardado = _desde_cache(clave)
+    if guardado is not None:
+        return guardado
+    return VUELOS_BUSQUEDAS.ejecutar(clave, lambda: _buscar_en_red(consulta, max_results, clave))
+
+
+async def abuscar_web(consulta: str, max_results: int = 4) -> Any:
+    """Versión asíncrona de buscar_web: no ocupa un hilo mientras espera a Tavily."""
+    clave = _clave_busqueda(consulta, max_results)
+    guardado = _desde_cache(clave)
+    if guardado is not None:
+        return guardado
+    return await VUELOS_BUSQUEDAS.aejecutar(clave, lambda: _abuscar_en_red(consulta, max_results, clave))
+
+
+def _desde_cache(clave: str) -> Any:
+    if not CACHE_BUSQUEDAS_ACTIVA:
+        return None
+    guardado = _obtener_almacen().obtener(clave)
+    if guardado is None:
+        return None
+    with _lock:
+        _estadisticas["latencia_ahorrada_s"] += guardado.get("latencia_s", 0.0)
+    return guardado["resultados"]
+
+
+def _buscar_en_red(consulta: str, max_results: int, clave: str) -> Any:
+    inicio = time.perf_counter()
+    with medir("busqueda_web"):
+        resultados = _consultar_tavily(consulta, max_results)
+    return _registrar_consulta(clave, resultados, time.perf_counter() - inicio)
+
+
+async def _abuscar_en_red(consulta: str, max_results: int, clave: str) -> Any:
+    inicio = time.perf_counter()
+    with medir("busqueda_web"):
+        resultados = await _aconsultar_tavily(consulta, max_results)
+    return _registrar_consulta(clave, resultados, time.perf_counter() - inicio)
+
+
+def _registrar_consulta(clave: str, resultados: Any, latencia: float) -> Any:
+    with _lock:
+        _estadisticas["consultas_red"] += 1
+        _estadisticas["latencia_red_s"] += latencia
+
+    if CACHE_BUSQUEDAS_ACTIVA and isinstance(resultados, list):
+        _obtener_almacen().guardar(
+            clave, {"resultados": resultados, "latencia_s": latencia}, TTL_BUSQUEDAS
+        )
+    return resultados
+
+
+def _consultar_tavily(consulta: str, max_results: int) -> Any:
+    """Consulta a Tavily a través del limitador compartido, reintentando límites y fallos transitorios."""
+    if not LIMITADOR_ACTIVO:
+        return obtener_tavily(max_results).invoke({"query": consulta})
+
+    limitador = obtener_limitador("tavily", os.getenv("TAVILY_API_KEY"))
+    for intento in range(MAX_REINTENTOS + 1):
+        with limitador.permiso() as resultado:
+            resultados = obtener_tavily(max_results).invoke({"query": consulta})
+            texto_error = "" if isinstance(resultados, list) else str(resultados)
+            limitado = bool(_PATRON_LIMITE.search(texto_error))
+            transitorio = bool(_PATRON_TRANSITORIO.search(texto_error))
+            resultado.marcar(limitado=limitado, error=bool(texto_error) and not limitado)
+        if not (limitado or transitorio) or intento == MAX_REINTENTOS:
+            return resultados
+        time.sleep(limitador.espera_reintento(intento))
+
+
+async def _aconsultar_tavily(consulta: str, max_results: int) -> Any:
+    """Versión asíncrona de _consultar_tavily (mismo limitador y reintentos)."""
+    if not LIMITADOR_ACTIVO:
+        return await obtener_tavily(max_results).ainvoke({"query": consulta})
+
+    limitador = obtener_limitador("tavily", os.getenv("TAVILY_API_KEY"))
+    for intento in range(MAX_REINTENTOS + 1):
+        async with limitador.apermiso() as resultado:
+            resultados = await obtener_tavily(max_results).ainvoke({"query": consulta})
+            texto_error = "" if isinstance(resultados, list) else str(resultados)
+            limitado = bool(_PATRON_LIMITE.search(texto_error))
+            transitorio = bool(_PATRON_TRANSITORIO.search(texto_error))
+            resultado.marcar(limitado=limitado, error=bool(texto_error) and not limitado)
+        if not (limitado or transitorio) or intento == MAX_REINTENTOS:
+            return resultados
+        await asyncio.sleep(limitador.espera_reintento(intento))
+
+
+def estadisticas_busqueda() -> Dict[str, Any]:
+    """Aciertos/fallos de la caché, consultas a la red y latencia ahorrada."""
+    datos = _obtener_almacen().estadisticas() if CACHE_BUSQUEDAS_ACTIVA else {}
+    with _lock:
+        datos.update(_estadisticas)
+    consultas = datos["consultas_red"]
+    datos["latencia_media_red_s"] = datos["latencia_red_s"] / consultas if consultas else 0.0
+    return datos
@@ -0,0 +1,276 @@
+# Tools/cache_herramientas.py
+# =====================================================
+# 🔹 EVA - Caché Persistente de Resultados de Herramientas (SQLite)
+# =====================================================
+# Las herramientas de los agentes son funciones puras de su argumento: el
+# mismo concepto con el mismo modelo y temperatura produce una respuesta
+# equivalente. Este módulo guarda esos resultados en disco, con TTL por
+# herramienta y desalojo LRU acotado por número de entradas. El modelo y la
+# temperatura de cada llamada los decide App/enrutador_modelos.py.
+# Un resultado redactado sin su contexto (búsqueda fallida o vacía) no se
+# guarda: el cuerpo de la herramienta lo marca con no_cachear().
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from App.config import LOGS_DIR
+from App.coalescencia import VUELOS_HERRAMIENTAS
+from App.enrutador_modelos import enrutar
+from App.metricas import medir
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+CACHE_HERRAMIENTAS_ACTIVA = os.getenv("EVA_CACHE_HERRAMIENTAS", "1") == "1"
+RUTA_CACHE_HERRAMIENTAS = os.path.join(LOGS_DIR, "cache_herramientas.sqlite")
+MAX_ENTRADAS_HERRAMIENTAS = int(os.getenv("EVA_CACHE_HERRAMIENTAS_MAX", "20000"))
+
+TTL_POR_DEFECTO = 7 * 24 * 3600
+# Las herramientas con contexto web caducan antes que las de solo LLM
+TTL_POR_HERRAMIENTA = {
+    "produccion_texto": 24 * 3600,
+    "experimento_sugerido": 24 * 3600,
+    "concepto_tecnologico": 24 * 3600,
+    "buscar_vocabulario": 24 * 3600,
+    "explicacion_concepto": 24 * 3600,
+}
+
+
+# ----------------------------------------------------
+# 2. ALMACÉN SQLITE CON TTL Y LRU
+# ----------------------------------------------------
+class AlmacenPersistente:
+    """Tabla clave → valor (JSON) en SQLite con expiración y límite de tamaño."""
+
+    def __init__(self, ruta: str, max_entradas: Optional[int] = None, tabla: str = "cache"):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.tabla = tabla
+        self._lock = threading.Lock()
+        self.contadores = {"aciertos": 0, "fallos": 0, "expirados": 0, "desalojados": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} ("
+            "clave TEXT PRIMARY KEY, valor TEXT NOT NULL, creado REAL NOT NULL, "
+            "ultimo_acceso REAL NOT NULL, expira REAL)"
+        )
+        self._conexion.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{tabla}_acceso ON {tabla}(ultimo_acceso)"
+        )
+        self._conexion.commit()
+        self._total = self._conexion.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Devuelve el valor guardado o None si no existe o expiró."""
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                f"SELECT valor, expira FROM {self.tabla} WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                self.contadores["fallos"] += 1
+                return None
+            valor, expira = fila
+            if expira is not None and expira < ahora:
+                self._conexion.execute(f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,))
+                self._conexion.commit()
+                self._total -= 1
+                self.contadores["expirados"] += 1
+                self.contadores["fallos"] += 1
+                return None
+            self._conexion.execute(
+                f"UPDATE {self.tabla} SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave)
+            )
+            self._conexion.commit()
+            self.contadores["aciertos"] += 1
+        return json.loads(valor)
+
+    def guardar(self, clave: str, valor: Any, ttl_segundos: Optional[float] = None):
+        """Guarda (o reemplaza) un valor serializable a JSON y aplica el límite LRU."""
+        ahora = time.time()
+        expira = ahora + ttl_segundos if ttl_segundos else None
+        with self._lock:
+            existia = self._conexion.execute(
+                f"SELECT 1 FROM {self.tabla} WHERE clave = ?", (clave,)
+            ).fetchone() is not None
+            self._conexion.execute(
+                f"INSERT OR REPLACE INTO {self.tabla} (clave, valor, creado, ultimo_acceso, expira) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (clave, json.dumps(valor, ensure_ascii=False), ahora, ahora, expira),
+            )
+            if not existia:
+                self._total += 1
+
+            if self.max_entradas is not None and self._total > self.max_entradas:
+                exceso = self._total - self.max_entradas
+                self._conexion.execute(
+                    f"DELETE FROM {self.tabla} WHERE clave IN ("
+                    f"SELECT clave FROM {self.tabla} ORDER BY ultimo_acceso ASC LIMIT ?)",
+                    (exceso,),
+                )
+                self._total -= exceso
+                self.contadores["desalojados"] += exceso
+            self._conexion.commit()
+
+    def eliminar(self, clave: str):
+        """Borra una entrada si existe."""
+        with self._lock:
+            borradas = self._conexion.execute(
+                f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,)
+            ).rowcount
+            self._conexion.commit()
+            self._total -= borradas
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores de uso y número de entradas actuales."""
+        with self._lock:
+            datos = dict(self.contadores)
+            datos["entradas"] = self._total
+        total = datos["aciertos"] + datos["fallos"]
+        datos["tasa_acierto"] = datos["aciertos"] / total if total else 0.0
+        return datos
+
+
+_almacen_herramientas: Optional[AlmacenPersistente] = None
+_almacen_lock = threading.Lock()
+
+
+def obtener_almacen_herramientas() -> AlmacenPersistente:
+    """Devuelve (creándolo la primera vez) el almacén compartido por todas las herramientas."""
+    global _almacen_herramientas
+    with _almacen_lock:
+        if _almacen_herramientas is None:
+            _almacen_herramientas = AlmacenPersistente(
+                RUTA_CACHE_HERRAMIENTAS, max_entradas=MAX_ENTRADAS_HERRAMIENTAS
+            )
+        return _almacen_herramientas
+
+
+# ----------------------------------------------------
+# 3. DECORADOR
+# ----------------------------------------------------
+# Estado de la llamada en curso; no_cachear() lo marca desde el cuerpo de la herramienta
+_llamada_actual: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "eva_llamada_herramienta", default=None
+)
+
+
+def no_cachear(motivo: str = "") -> None:
+    """Desde el cuerpo de una herramienta: su resultado de esta llamada no se guarda en la caché."""
+    estado = _llamada_actual.get()
+    if estado is not None:
+        estado["no_cachear"] = motivo or True
+
+
+def clave_herramienta(nombre: str, argumentos: Dict[str, Any], modelo: str, temperatura: float, version: str = "") -> str:
+    """Hash estable de (herramienta, argumentos, modelo, temperatura[, versión de sus datos])."""
+    datos = {"herramienta": nombre, "args": argumentos, "modelo": modelo, "temperatura": temperatura}
+    if version:
+        datos["version"] = version
+    crudo = json.dumps(datos, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+def cache_herramienta(
+    ttl_segundos: Optional[float] = None,
+    nombre: Optional[str] = None,
+    version: Optional[Callable[[], str]] = None,
+):
+    """
+    Decorador para el cuerpo de una herramienta (síncrono o asíncrono).
+    Conserva firma y docstring para que @tool genere el mismo esquema.
+    Cada ejecución (acierto de caché o no) se mide como la etapa "herramienta" y
+    se enruta según sus argumentos: dentro del cuerpo, llm_para(nombre) devuelve
+    el modelo elegido, que también forma parte de la clave de caché.
+    `nombre` (por defecto el de la función) identifica la herramienta en la clave.
+    `version` (opcional) devuelve la versión de los datos que consulta la herramienta
+    (p. ej. la generación del índice local): al cambiar, las entradas viejas dejan de servirse.
+    """
+    def decorador(funcion: Callable[..., Any]) -> Callable[..., Any]:
+        nombre_herramienta = nombre or funcion.__name__
+        ttl = ttl_segundos if ttl_segundos is not None else TTL_POR_HERRAMIENTA.get(nombre_herramienta, TTL_POR_DEFECTO)
+        parametros = funcion.__code__.co_varnames[:funcion.__code__.co_argcount]
+
+        def _argumentos(args, kwargs) -> Dict[str, Any]:
+            return {**dict(zip(parametros, args)), **kwargs}
+
+        def _consultar(argumentos, registro):
+            """(clave, almacén o None, resultado guardado o None)."""
+            clave = clave_herramienta(
+                nombre_herramienta, argumentos, registro["modelo"], registro["temperatura"],
+                version() if version is not None else "",
+            )
+            if not CACHE_HERRAMIENTAS_ACTIVA:
+                return clave, None, None
+            almacen = obtener_almacen_herramientas()
+            resultado = almacen.obtener(clave)
+            if resultado is not None:
+                registro["desde_cache"] = True
+            return clave, almacen, resultado
+
+        def _guardar(almacen, clave, calculado, estado, registro):
+            if estado.get("no_cachear"):
+                registro["no_cacheado"] = estado["no_cachear"]
+            elif almacen is not None:
+                almacen.guardar(clave, calculado, ttl)
+
+        if asyncio.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def aenvoltura(*args, **kwargs):
+                argumentos = _argumentos(args, kwargs)
+                texto = " ".join(str(v) for v in argumentos.values())
+                with medir("herramienta", herramienta=nombre_herramienta), enrutar(nombre_herramienta, texto) as registro:
+                    clave, almacen, resultado = _consultar(argumentos, registro)
+                    if resultado is not None:
+                        return resultado
+
+                    async def _acalcular():
+                        estado: Dict[str, Any] = {}
+                        token = _llamada_actual.set(estado)
+                        try:
+                            calculado = await funcion(*args, **kwargs)
+                        finally:
+                            _llamada_actual.reset(token)
+                        _guardar(almacen, clave, calculado, estado, registro)
+                        return calculado
+
+                    return await VUELOS_HERRAMIENTAS.aejecutar(clave, _acalcular)
+
+            return aenvoltura
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = _argumentos(args, kwargs)
+            texto = " ".join(str(v) for v in argumentos.values())
+            with medir("herramienta", herramienta=nombre_herramienta), enrutar(nombre_herramienta, texto) as registro:
+                clave, almacen, resultado = _consultar(argumentos, registro)
+                if resultado is not None:
+                    return resultado
+
+                # Llamadas simultáneas con la misma clave comparten una sola ejecución
+                def _calcular():
+                    estado: Dict[str, Any] = {}
+                    token = _llamada_actual.set(estado)
+                    try:
+                        calculado = funcion(*args, **kwargs)
+                    finally:
+                        _llamada_actual.reset(token)
+                    _guardar(almacen, clave, calculado, estado, registro)
+                    return calculado
+
+                return VUELOS_HERRAMIENTAS.ejecutar(clave, _calcular)
+
+        return envoltura
+
+    return decorador
@@ -0,0 +1,52 @@
+# Tools/embeddings.py
+# =====================================================
+# 🔹 EVA - Embeddings Locales (hashing de n-gramas, sin llamadas a API)
+# =====================================================
+# Vectoriza texto con palabras y trigramas de caracteres proyectados por hash
+# estable (crc32) a un espacio fijo. Es determinista entre procesos, así que
+# los vectores pueden guardarse en disco y compararse con producto punto.
+
+import zlib
+from typing import List
+
+import numpy as np
+
+from App.clasificador_curso import tokenizar
+
+DIMENSION = 384
+
+# Artículos y preposiciones que no cambian el sentido de una pregunta escolar
+PALABRAS_VACIAS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "lo", "al", "del", "de", "en",
+    "y", "o", "a", "por", "para", "con", "mi", "me", "se",
+}
+
+
+def _indice_y_signo(rasgo: str):
+    h = zlib.crc32(rasgo.encode("utf-8"))
+    return h % DIMENSION, 1.0 if (h >> 31) & 1 else -1.0
+
+
+def vectorizar_texto(texto: str) -> np.ndarray:
+    """Devuelve un vector float32 normalizado (L2) de dimensión DIMENSION."""
+    vector = np.zeros(DIMENSION, dtype=np.float32)
+    tokens = [t for t in tokenizar(texto) if t not in PALABRAS_VACIAS]
+    for token in tokens:
+        indice, signo = _indice_y_signo("w:" + token)
+        vector[indice] += 2.0 * signo
+        relleno = f" {token} "
+        for i in range(len(relleno) - 2):
+            indice, signo = _indice_y_signo("c:" + relleno[i:i + 3])
+            vector[indice] += signo
+
+    norma = np.linalg.norm(vector)
+    if norma > 0:
+        vector /= norma
+    return vector
+
+
+def vectorizar_lote(textos: List[str]) -> np.ndarray:
+    """Vectoriza varios textos y devuelve una matriz (n, DIMENSION)."""
+    if not textos:
+        return np.zeros((0, DIMENSION), dtype=np.float32)
+    return np.vstack([vectorizar_texto(t) for t in textos])
@@ -0,0 +1,211 @@
+# Tools/empaquetado_contexto.py
+# =====================================================
+# 🔹 EVA - Empaquetado del Contexto de Búsqueda antes del Prompt
+# =====================================================
+# Los resultados de buscar_contexto (Data/ o Tavily) se trocean en pasajes,
+# se eliminan los casi duplicados (Jaccard sobre trigramas de palabras o un
+# pasaje contenido casi entero en otro), se ordenan contra la consulta con
+# BM25, se descartan los que no comparten ningún término con ella (si alguno
+# sí lo hace) y se empaquetan hasta el presupuesto de tokens de cada
+# herramienta. Así el tamaño del prompt (y la latencia del LLM) queda acotado
+# sin importar cuánto texto devuelva la búsqueda.
+#
+# Los tokens se estiman como en App/clientes_llm.py (~4 caracteres por token).
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+from App.clasificador_curso import tokenizar
+from App.metricas import CUBETAS_TOKENS, REGISTRO, medir
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+EMPAQUETADO_ACTIVO = os.getenv("EVA_EMPAQUETAR_CONTEXTO", "1") == "1"
+PRESUPUESTO_POR_DEFECTO = int(os.getenv("EVA_CONTEXTO_TOKENS", "600"))
+
+# Tokens de contexto por herramienta (las que explican necesitan menos que las que redactan ejemplos)
+PRESUPUESTO_POR_HERRAMIENTA = {
+    "explicacion_concepto": 500,
+    "produccion_texto": 700,
+    "experimento_sugerido": 700,
+    "concepto_tecnologico": 500,
+    "buscar_vocabulario": 400,
+    "buscar_material": 900,
+}
+
+UMBRAL_DUPLICADO = 0.8        # Jaccard de trigramas a partir del cual dos pasajes son el mismo
+UMBRAL_CONTENCION = 0.9       # fracción de las palabras del pasaje corto presentes en el otro
+PALABRAS_POR_PASAJE = 90      # los párrafos más largos se parten por oraciones
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_lock = threading.Lock()
+_estadisticas = {"llamadas": 0, "tokens_originales": 0, "tokens_empaquetados": 0, "duplicados": 0, "descartados": 0}
+
+
+def estimar_tokens(texto: str) -> int:
+    return (len(texto) + 3) // 4
+
+
+# ----------------------------------------------------
+# 2. PASAJES Y DUPLICADOS
+# ----------------------------------------------------
+def pasajes_de(texto: str, palabras_max: int = PALABRAS_POR_PASAJE) -> List[str]:
+    """Párrafos del texto; los que superan `palabras_max` se agrupan por oraciones."""
+    pasajes = []
+    for parrafo in re.split(r"\n\s*\n|\n(?=[-•*]\s)", texto):
+        parrafo = " ".join(parrafo.split())
+        if not parrafo:
+            continue
+        if len(parrafo.split()) <= palabras_max:
+            pasajes.append(parrafo)
+            continue
+        actual: List[str] = []
+        for oracion in re.split(r"(?<=[.!?])\s+", parrafo):
+            if actual and len(" ".join(actual + [oracion]).split()) > palabras_max:
+                pasajes.append(" ".join(actual))
+                actual = []
+            actual.append(oracion)
+        if actual:
+            pasajes.append(" ".join(actual))
+    return pasajes
+
+
+def _trigramas(tokens: Sequence[str]) -> Set[Tuple[str, ...]]:
+    if len(tokens) < 3:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + 3]) for i in range(len(tokens) - 2)}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _contencion(a: Set, b: Set) -> float:
+    return len(a & b) / min(len(a), len(b)) if a and b else 0.0
+
+
+def es_duplicado(trigramas: Set, palabras: Set, otro: Tuple[Set, Set]) -> bool:
+    """Casi idéntico a `otro` (trigramas) o contenido casi por completo en él (palabras)."""
+    if _jaccard(trigramas, otro[0]) >= UMBRAL_DUPLICADO:
+        return True
+    return min(len(palabras), len(otro[1])) >= 5 and _contencion(palabras, otro[1]) >= UMBRAL_CONTENCION
+
+
+# ----------------------------------------------------
+# 3. RANKING BM25
+# ----------------------------------------------------
+def puntajes_bm25(consulta: str, documentos: Sequence[Sequence[str]]) -> List[float]:
+    """BM25 de cada documento (ya tokenizado) contra la consulta; el IDF sale de los propios documentos."""
+    if not documentos:
+        return []
+    n = len(documentos)
+    largo_medio = sum(len(d) for d in documentos) / n or 1.0
+    frecuencia_documental = Counter(t for d in documentos for t in set(d))
+    terminos = set(tokenizar(consulta))
+    idf = {t: math.log(1 + (n - frecuencia_documental[t] + 0.5) / (frecuencia_documental[t] + 0.5)) for t in terminos}
+
+    puntajes = []
+    for documento in documentos:
+        conteos = Counter(documento)
+        normalizacion = BM25_K1 * (1 - BM25_B + BM25_B * len(documento) / largo_medio)
+        puntajes.append(sum(
+            idf[t] * conteos[t] * (BM25_K1 + 1) / (conteos[t] + normalizacion)
+            for t in terminos if conteos[t]
+        ))
+    return puntajes
+
+
+# ----------------------------------------------------
+# 4. EMPAQUETADO
+# ----------------------------------------------------
+def recortar(pasaje: str, tokens_max: int) -> str:
+    """Primeras palabras de `pasaje` que caben en `tokens_max` tokens, terminadas en "…"."""
+    limite = tokens_max * 4 - 1  # estimar_tokens ≈ caracteres / 4; 1 carácter para "…"
+    if limite <= 0:
+        return ""
+    corte = pasaje[:limite].rsplit(" ", 1)[0] if " " in pasaje[:limite] else pasaje[:limite]
+    return corte.rstrip(" ,;:") + "…"
+
+
+def empaquetar(consulta: str, textos: Sequence[str], presupuesto: int) -> Tuple[str, Dict[str, int]]:
+    """
+    Pasajes únicos de `textos`, de mayor a menor BM25, hasta `presupuesto` tokens.
+    Devuelve (contexto, reporte con tokens originales, empaquetados y ahorrados).
+    """
+    original = "\n".join(textos)
+    candidatos = [(p, tokenizar(p)) for texto in textos for p in pasajes_de(texto)]
+
+    unicos: List[Tuple[str, List[str]]] = []
+    vistos: List[Tuple[Set, Set]] = []
+    for pasaje, tokens in candidatos:
+        huella = (_trigramas(tokens), set(tokens))
+        if any(es_duplicado(*huella, otro) for otro in vistos):
+            continue
+        unicos.append((pasaje, tokens))
+        vistos.append(huella)
+
+    puntajes = puntajes_bm25(consulta, [tokens for _, tokens in unicos])
+    orden = sorted(range(len(unicos)), key=lambda i: -puntajes[i])
+    if any(puntajes):
+        orden = [i for i in orden if puntajes[i] > 0]
+
+    elegidos, usados = [], 0
+    for i in orden:
+        pasaje = unicos[i][0]
+        costo = estimar_tokens(pasaje) + 1
+        if usados + costo > presupuesto and not elegidos:
+            # El mejor pasaje no cabe entero (una oración muy larga): se recorta en vez de perderlo
+            pasaje = recortar(pasaje, presupuesto - 1)
+            costo = estimar_tokens(pasaje) + 1
+        if pasaje and usados + costo <= presupuesto:
+            elegidos.append(pasaje)
+            usados += costo
+
+    contexto = "\n".join(elegidos)
+    tokens_originales, tokens_empaquetados = estimar_tokens(original), estimar_tokens(contexto)
+    return contexto, {
+        "tokens_originales": tokens_originales,
+        "tokens_empaquetados": tokens_empaquetados,
+        "tokens_ahorrados": max(0, tokens_originales - tokens_empaquetados),
+        "pasajes": len(candidatos),
+        "duplicados": len(candidatos) - len(unicos),
+        "descartados": len(unicos) - len(elegidos),
+    }
+
+
+def empaquetar_contexto(consulta: str, resultados: Sequence[Any], herramienta: str) -> str:
+    """
+    Contexto listo para el prompt a partir de una lista de resultados ({"content": ...}),
+    dentro del presupuesto de la herramienta. Registra los tokens ahorrados en las métricas.
+    """
+    textos = [r.get("content", "") for r in resultados if isinstance(r, dict) and r.get("content")]
+    if not EMPAQUETADO_ACTIVO:
+        return "\n".join(textos)
+
+    presupuesto = PRESUPUESTO_POR_HERRAMIENTA.get(herramienta, PRESUPUESTO_POR_DEFECTO)
+    with medir("empaquetado_contexto", herramienta=herramienta):
+        contexto, reporte = empaquetar(consulta, textos, presupuesto)
+
+    REGISTRO.observar("eva_contexto_tokens_ahorrados", reporte["tokens_ahorrados"], cubetas=CUBETAS_TOKENS, herramienta=herramienta)
+    REGISTRO.sumar("eva_contexto_tokens_total", reporte["tokens_originales"], tipo="original", herramienta=herramienta)
+    REGISTRO.sumar("eva_contexto_tokens_total", reporte["tokens_empaquetados"], tipo="empaquetado", herramienta=herramienta)
+    with _lock:
+        _estadisticas["llamadas"] += 1
+        for clave in ("tokens_originales", "tokens_empaquetados", "duplicados", "descartados"):
+            _estadisticas[clave] += reporte[clave]
+    return contexto
+
+
+def estadisticas_contexto() -> Dict[str, Any]:
+    """Tokens originales y empaquetados acumulados, y ahorro medio por llamada."""
+    with _lock:
+        datos = dict(_estadisticas)
+    datos["tokens_ahorrados"] = datos["tokens_originales"] - datos["tokens_empaquetados"]
+    datos["ahorro_medio_por_llamada"] = datos["tokens_ahorrados"] / datos["llamadas"] if datos["llamadas"] else 0.0
+    return datos
@@ -0,0 +1,73 @@
+# Tools/herramienta_llm.py
+# =====================================================
+# 🔹 EVA - Herramientas de "un prompt, una llamada al LLM" (síncronas y asíncronas)
+# =====================================================
+# Las herramientas de los agentes siguen el mismo esquema: buscar contexto
+# (algunas), armar los mensajes y llamar a llm_para(nombre). La función
+# decorada con @herramienta_llm solo arma los mensajes; el decorador crea la
+# herramienta con las dos implementaciones:
+#   - invoke  → buscar_contexto + llm.invoke (camino síncrono)
+#   - ainvoke → abuscar_contexto + llm.ainvoke (camino async): ninguna
+#     llamada de herramienta ocupa un hilo del executor por defecto (salvo la
+#     primera carga del índice local, que se hace en un hilo aparte).
+# Ambas pasan por cache_herramienta (caché, enrutado, métricas y coalescencia).
+
+from typing import Any, Callable, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.tools import StructuredTool, create_schema_from_function
+
+from App.enrutador_modelos import llm_para
+from Tools.cache_herramientas import cache_herramienta
+from Tools.indice_local import acontexto_para_herramienta, aobtener_indice, contexto_para_herramienta, generacion_indice
+
+
+def herramienta_llm(
+    consulta: Optional[Callable[..., str]] = None,
+    curso: str = "",
+    max_results: int = 4,
+    ttl_segundos: Optional[float] = None,
+):
+    """
+    Convierte `armar_mensajes(**argumentos) -> [mensajes]` en una herramienta.
+    Con `consulta` (argumentos → texto de búsqueda), antes se obtiene el contexto del
+    curso y se pasa a armar_mensajes como `contexto=`; ese parámetro no forma parte
+    del esquema que ve el agente, y la generación del índice local entra en la clave
+    de caché (una reindexación de Data/ invalida sus respuestas). Nombre y descripción
+    salen de la función.
+    """
+    def decorador(armar_mensajes: Callable[..., List[BaseMessage]]) -> StructuredTool:
+        nombre = armar_mensajes.__name__
+        esquema = create_schema_from_function(nombre, armar_mensajes, filter_args=["contexto"])
+        version = generacion_indice if consulta else None
+
+        def _mensajes(argumentos: Any, contexto: Optional[str]) -> List[BaseMessage]:
+            return armar_mensajes(**argumentos, contexto=contexto) if consulta else armar_mensajes(**argumentos)
+
+        @cache_herramienta(ttl_segundos, nombre=nombre, version=version)
+        def ejecutar(**argumentos) -> str:
+            contexto = None
+            if consulta:
+                contexto = contexto_para_herramienta(consulta(**argumentos), curso, nombre, max_results)
+            respuesta = llm_para(nombre).invoke(_mensajes(argumentos, contexto))
+            return respuesta.content.strip()
+
+        @cache_herramienta(ttl_segundos, nombre=nombre, version=version)
+        async def aejecutar(**argumentos) -> str:
+            contexto = None
+            if consulta:
+                contexto = await acontexto_para_herramienta(consulta(**argumentos), curso, nombre, max_results)
+            respuesta = await llm_para(nombre).ainvoke(_mensajes(argumentos, contexto))
+            return respuesta.content.strip()
+
+        async def acargar_y_ejecutar(**argumentos) -> str:
+            if consulta:
+                await aobtener_indice()  # antes de que la clave de caché pida generacion_indice()
+            return await aejecutar(**argumentos)
+
+        ejecutar.__doc__ = armar_mensajes.__doc__
+        return StructuredTool.from_function(
+            func=ejecutar, coroutine=acargar_y_ejecutar, name=nombre, args_schema=esquema,
+        )
+
+    return decorador
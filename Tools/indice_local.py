@@ -0,0 +1,620 @@
+# Tools/indice_local.py
+# =====================================================
+# 🔹 EVA - Índice Local de Recuperación sobre Data/ (material del curso)
+# =====================================================
+# Trocea los documentos de Data/ (txt, md, jsonl y pdf si hay pypdf), los
+# vectoriza con los embeddings locales de Tools/embeddings.py y guarda, en
+# una carpeta por generación (logs/indice_local/gen_<ns>, publicada en ACTUAL):
+#   - vectores.npy     → matriz float32 (n, DIMENSION), abierta con mmap
+#   - fragmentos.jsonl → texto, fuente, curso, grado y hash de cada fila
+#   - manifiesto.json  → hash de contenido, mtime y fragmentos de cada documento
+# Las actualizaciones son incrementales: solo se reprocesan los documentos
+# añadidos o modificados y solo se vectorizan los fragmentos nuevos.
+# Curso y grado salen de la ruta (Data/Matemática/1° Secundaria/tema.txt,
+# Data/matematica/1_secundaria/...); si la ruta no indica el curso se
+# infiere con el clasificador local. Una búsqueda es un producto matriz ×
+# vector sobre las filas del curso: milisegundos, sin red. buscar_contexto
+# solo recurre a Tavily cuando la recuperación local es pobre.
+#
+# Construir o actualizar el índice:
+#   python -m Tools.indice_local             # incremental
+#   python -m Tools.indice_local --completo  # desde cero
+#   python -m Tools.indice_local --vigilar   # y aplicar cambios en caliente
+# En la app, EVA_INDICE_VIGILAR=1 arranca el vigilante al cargar el índice.
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from App.clasificador_curso import CURSOS, ClasificadorCurso, normalizar_texto, tokenizar
+from App.config import LOGS_DIR
+from App.metricas import medir
+from Tools.busqueda_web import abuscar_web, buscar_web
+from Tools.cache_herramientas import no_cachear
+from Tools.empaquetado_contexto import empaquetar_contexto
+from Tools.embeddings import DIMENSION, PALABRAS_VACIAS, vectorizar_lote, vectorizar_texto
+
+# ----------------------------------------------------
+# 1. PARÁMETROS
+# ----------------------------------------------------
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Data"))
+RUTA_INDICE = os.getenv("EVA_INDICE_RUTA", os.path.join(LOGS_DIR, "indice_local"))
+INDICE_ACTIVO = os.getenv("EVA_INDICE_LOCAL", "1") == "1"
+UMBRAL_RECUPERACION = float(os.getenv("EVA_INDICE_UMBRAL", "0.1"))
+COBERTURA_MINIMA = float(os.getenv("EVA_INDICE_COBERTURA", "0.5"))
+TAMANO_FRAGMENTO = int(os.getenv("EVA_INDICE_FRAGMENTO", "800"))  # caracteres
+SOLAPE_FRAGMENTO = 150
+MIN_CARACTERES_FRAGMENTO = 40
+EXTENSIONES = {".txt", ".md", ".jsonl", ".pdf"}
+
+# Generaciones: cada actualización escribe una carpeta gen_<ns> y la publica en ACTUAL
+ARCHIVO_ACTUAL = "ACTUAL"
+GENERACIONES_CONSERVADAS = 2
+VIGILANCIA_ACTIVA = os.getenv("EVA_INDICE_VIGILAR", "0") == "1"
+INTERVALO_VIGILANCIA_S = float(os.getenv("EVA_INDICE_VIGILAR_S", "30"))
+_construccion_lock = threading.RLock()
+
+# Palabras de las preguntas y de las plantillas de consulta de las herramientas
+# ("Experimento educativo sobre …") que no dicen nada del tema buscado
+PALABRAS_GENERICAS = PALABRAS_VACIAS | {
+    "que", "es", "son", "como", "cual", "cuales", "cuando", "donde", "por", "explica", "explicame",
+    "define", "definicion", "sobre", "sus", "su", "ejemplo", "ejemplos", "educativo", "educativa",
+    "experimento", "concepto", "tecnologico", "matematicas", "estudiantes", "secundaria",
+    "meaning", "and", "examples", "of", "in", "english",
+}
+
+_PATRON_GRADO = re.compile(r"\b([1-5])\s*(?:°|º|o|ro|do|to)?\s*[_ -]?\s*secundaria\b")
+
+
+# ----------------------------------------------------
+# 2. LECTURA Y TROCEADO
+# ----------------------------------------------------
+def _leer_documento(ruta: str) -> str:
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            print(f"⚠️ Se omite {ruta}: instala pypdf para indexar PDFs")
+            return ""
+        return "\n\n".join(pagina.extract_text() or "" for pagina in PdfReader(ruta).pages)
+
+    with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+        if extension == ".jsonl":
+            textos = []
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                textos.append(str(registro.get("texto") or registro.get("content") or ""))
+            return "\n\n".join(textos)
+        return f.read()
+
+
+def trocear(texto: str, tamano: int = TAMANO_FRAGMENTO, solape: int = SOLAPE_FRAGMENTO) -> List[str]:
+    """Agrupa párrafos hasta `tamano` caracteres; los párrafos largos se cortan con solape."""
+    parrafos = [p.strip() for p in re.split(r"\n\s*\n", texto)]
+    parrafos = [p for p in parrafos if p and not p.startswith("##")]  # "##" = notas del repositorio
+    fragmentos, actual = [], ""
+    for parrafo in parrafos:
+        while len(parrafo) > tamano:
+            if actual:
+                fragmentos.append(actual)
+                actual = ""
+            fragmentos.append(parrafo[:tamano])
+            parrafo = parrafo[tamano - solape:]
+        if len(actual) + len(parrafo) + 2 > tamano and actual:
+            fragmentos.append(actual)
+            actual = actual[-solape:] if solape else ""
+        actual = f"{actual}\n\n{parrafo}" if actual else parrafo
+    if actual:
+        fragmentos.append(actual)
+    return [f for f in fragmentos if len(f) >= MIN_CARACTERES_FRAGMENTO]
+
+
+def etiquetas_de_ruta(ruta_relativa: str) -> Tuple[str, str]:
+    """(curso, grado) indicados por las carpetas o el nombre del archivo; "" si no aparecen."""
+    normalizada = normalizar_texto(ruta_relativa.replace(os.sep, " / ").replace("_", " "))
+    curso = next((c for c in CURSOS if normalizar_texto(c) in normalizada), "")
+    coincidencia = _PATRON_GRADO.search(normalizada)
+    grado = f"{coincidencia.group(1)}° Secundaria" if coincidencia else ""
+    return curso, grado
+
+
+def recorrer_documentos(directorio: str = DATA_DIR) -> Iterator[str]:
+    for raiz, carpetas, archivos in os.walk(directorio):
+        carpetas[:] = sorted(c for c in carpetas if not c.startswith("."))
+        for archivo in sorted(archivos):
+            if os.path.splitext(archivo)[1].lower() in EXTENSIONES:
+                yield os.path.join(raiz, archivo)
+
+
+def fragmentos_de_documento(ruta: str, directorio: str, clasificador: ClasificadorCurso) -> List[Dict[str, Any]]:
+    relativa = os.path.relpath(ruta, directorio)
+    curso, grado = etiquetas_de_ruta(relativa)
+    fragmentos = []
+    for posicion, texto in enumerate(trocear(_leer_documento(ruta))):
+        curso_fragmento = curso
+        if not curso_fragmento:
+            curso_fragmento, confianza = clasificador.predecir(texto)
+            curso_fragmento = curso_fragmento if confianza >= 0.5 else ""
+        fragmentos.append({
+            "fuente": relativa, "posicion": posicion, "curso": curso_fragmento, "grado": grado, "texto": texto,
+        })
+    return fragmentos
+
+
+# ----------------------------------------------------
+# 3. CONSTRUCCIÓN INCREMENTAL
+# ----------------------------------------------------
+def _hash_archivo(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _hash_texto(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def ruta_generacion_actual(destino: str = RUTA_INDICE) -> Optional[str]:
+    """Carpeta de la generación vigente (la que indica el archivo ACTUAL), o None."""
+    try:
+        with open(os.path.join(destino, ARCHIVO_ACTUAL), "r", encoding="utf-8") as f:
+            ruta = os.path.join(destino, f.read().strip())
+    except FileNotFoundError:
+        return None
+    return ruta if os.path.isdir(ruta) else None
+
+
+def _leer_manifiesto(ruta_generacion: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    if ruta_generacion is None:
+        return {}
+    try:
+        with open(os.path.join(ruta_generacion, "manifiesto.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def detectar_cambios(directorio: str, manifiesto: Dict[str, Dict[str, Any]]):
+    """
+    Solo con stat: (presentes, candidatos, eliminados). Un candidato es un archivo nuevo
+    o con mtime/tamaño distintos; su hash decide después si de verdad cambió.
+    """
+    presentes = {}
+    for ruta in recorrer_documentos(directorio):
+        estado = os.stat(ruta)
+        presentes[os.path.relpath(ruta, directorio)] = (ruta, estado.st_mtime, estado.st_size)
+    candidatos = [
+        relativa for relativa, (_, mtime, tamano) in presentes.items()
+        if relativa not in manifiesto
+        or manifiesto[relativa]["mtime"] != mtime or manifiesto[relativa]["tamano"] != tamano
+    ]
+    eliminados = [relativa for relativa in manifiesto if relativa not in presentes]
+    return presentes, candidatos, eliminados
+
+
+def _tamano_generacion(ruta: str) -> int:
+    return sum(os.path.getsize(os.path.join(ruta, a)) for a in os.listdir(ruta))
+
+
+def _escribir_manifiesto(ruta_generacion: str, manifiesto: Dict[str, Dict[str, Any]]):
+    """Escribe a un temporal y lo renombra: quien lea el manifiesto nunca lo ve a medias."""
+    temporal = os.path.join(ruta_generacion, f"manifiesto.json.{os.getpid()}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+    os.replace(temporal, os.path.join(ruta_generacion, "manifiesto.json"))
+
+
+def _escribir_generacion(destino: str, fragmentos: List[Dict[str, Any]], vectores: np.ndarray,
+                         manifiesto: Dict[str, Dict[str, Any]]) -> str:
+    """Escribe una generación nueva y la publica cambiando ACTUAL de forma atómica."""
+    nombre = f"gen_{time.time_ns()}"
+    ruta = os.path.join(destino, nombre)
+    os.makedirs(ruta)
+    np.save(os.path.join(ruta, "vectores.npy"), vectores.astype(np.float32))
+    with open(os.path.join(ruta, "fragmentos.jsonl"), "w", encoding="utf-8") as f:
+        for fragmento in fragmentos:
+            f.write(json.dumps(fragmento, ensure_ascii=False) + "\n")
+    _escribir_manifiesto(ruta, manifiesto)
+
+    temporal = os.path.join(destino, f"{ARCHIVO_ACTUAL}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(nombre)
+    os.replace(temporal, os.path.join(destino, ARCHIVO_ACTUAL))
+
+    # Las generaciones viejas se borran; un proceso que aún las tenga en mmap sigue leyéndolas
+    generaciones = sorted(g for g in os.listdir(destino) if g.startswith("gen_"))
+    for vieja in generaciones[:-GENERACIONES_CONSERVADAS]:
+        shutil.rmtree(os.path.join(destino, vieja), ignore_errors=True)
+    return ruta
+
+
+def construir_indice(directorio: str = DATA_DIR, destino: str = RUTA_INDICE, completo: bool = False) -> Dict[str, Any]:
+    """
+    Actualiza el índice de `directorio`: solo se leen, trocean y vectorizan los documentos
+    añadidos o modificados (por hash de contenido), y dentro de ellos solo los fragmentos
+    cuyo hash no estaba ya indexado. Con completo=True se reindexa todo. Devuelve un reporte.
+    """
+    with _construccion_lock:
+        inicio = time.perf_counter()
+        anterior = None if completo else ruta_generacion_actual(destino)
+        manifiesto = _leer_manifiesto(anterior)
+        previo = IndiceLocal(anterior) if anterior else None
+        presentes, candidatos, eliminados = detectar_cambios(directorio, manifiesto)
+
+        nuevo_manifiesto = {r: dict(e) for r, e in manifiesto.items() if r in presentes}
+        modificados = []
+        for relativa in candidatos:
+            ruta, mtime, tamano = presentes[relativa]
+            huella = _hash_archivo(ruta)
+            if relativa in manifiesto and manifiesto[relativa]["hash"] == huella:
+                nuevo_manifiesto[relativa].update(mtime=mtime, tamano=tamano)  # solo cambió la fecha
+            else:
+                modificados.append(relativa)
+                nuevo_manifiesto[relativa] = {"hash": huella, "mtime": mtime, "tamano": tamano}
+
+        reporte = {
+            "documentos": len(presentes),
+            "anadidos": sum(1 for r in modificados if r not in manifiesto),
+            "modificados": sum(1 for r in modificados if r in manifiesto),
+            "eliminados": len(eliminados),
+            "fragmentos_nuevos": 0,
+            "fragmentos_reutilizados": 0,
+        }
+        if previo is not None and not modificados and not eliminados:
+            if candidatos:  # solo fechas: se actualiza el manifiesto de la generación vigente
+                _escribir_manifiesto(anterior, nuevo_manifiesto)
+            reporte.update(filas=len(previo), ruta=anterior, tamano_bytes=_tamano_generacion(anterior),
+                           segundos=round(time.perf_counter() - inicio, 3), documentos_por_segundo=0.0)
+            return reporte
+
+        # Filas previas reutilizables: por documento sin cambios y por hash de fragmento
+        filas_por_fuente: Dict[str, List[int]] = {}
+        fila_por_hash: Dict[str, int] = {}
+        if previo is not None:
+            for fila, fragmento in enumerate(previo.fragmentos):
+                filas_por_fuente.setdefault(fragmento["fuente"], []).append(fila)
+                fila_por_hash.setdefault(fragmento.get("hash", ""), fila)
+
+        clasificador: Optional[ClasificadorCurso] = None  # uno por construcción, solo si hay que trocear
+        procesados = set(modificados)
+        fragmentos: List[Dict[str, Any]] = []
+        origen: List[Optional[int]] = []  # fila previa de la que se copia el vector, o None
+        for relativa in sorted(presentes):
+            if relativa not in procesados and previo is not None and relativa in manifiesto:
+                # Sin cambios: se copian sus filas (ninguna si el documento no dio fragmentos)
+                for fila in filas_por_fuente.get(relativa, []):
+                    fragmentos.append(previo.fragmentos[fila])
+                    origen.append(fila)
+                continue
+            if clasificador is None:
+                clasificador = ClasificadorCurso()
+            nuevos = fragmentos_de_documento(presentes[relativa][0], directorio, clasificador)
+            for fragmento in nuevos:
+                fragmento["hash"] = _hash_texto(fragmento["texto"])
+                fragmentos.append(fragmento)
+                origen.append(fila_por_hash.get(fragmento["hash"]))
+            nuevo_manifiesto[relativa]["fragmentos"] = [f["hash"] for f in nuevos]
+
+        vectores = np.zeros((len(fragmentos), DIMENSION), dtype=np.float32)
+        por_vectorizar = [i for i, fila in enumerate(origen) if fila is None]
+        copiar = [i for i, fila in enumerate(origen) if fila is not None]
+        if copiar:
+            vectores[copiar] = np.asarray(previo.vectores[[origen[i] for i in copiar]])
+        if por_vectorizar:
+            vectores[por_vectorizar] = vectorizar_lote([fragmentos[i]["texto"] for i in por_vectorizar])
+
+        os.makedirs(destino, exist_ok=True)
+        ruta = _escribir_generacion(destino, fragmentos, vectores, nuevo_manifiesto)
+        segundos = time.perf_counter() - inicio
+        reporte.update(
+            fragmentos_nuevos=len(por_vectorizar),
+            fragmentos_reutilizados=len(copiar),
+            filas=len(fragmentos),
+            ruta=ruta,
+            tamano_bytes=_tamano_generacion(ruta),
+            segundos=round(segundos, 3),
+            documentos_por_segundo=round(len(modificados) / segundos, 1) if segundos > 0 else 0.0,
+        )
+        print(
+            f"📚 Índice local: +{reporte['anadidos']} ~{reporte['modificados']} -{reporte['eliminados']} documentos "
+            f"({reporte['documentos_por_segundo']} doc/s), {reporte['filas']} fragmentos "
+            f"({reporte['fragmentos_nuevos']} vectorizados), {reporte['tamano_bytes'] / 1e6:.2f} MB en {segundos:.2f}s"
+        )
+        return reporte
+
+
+# ----------------------------------------------------
+# 4. CARGA Y BÚSQUEDA EN MEMORIA
+# ----------------------------------------------------
+class IndiceLocal:
+    """Vectores en mmap (solo lectura) + metadatos en memoria, con filas agrupadas por curso."""
+
+    def __init__(self, ruta: Optional[str] = None):
+        ruta = ruta or ruta_generacion_actual(RUTA_INDICE)
+        self.ruta = ruta
+        with open(os.path.join(ruta, "fragmentos.jsonl"), "r", encoding="utf-8") as f:
+            self.fragmentos = [json.loads(linea) for linea in f]
+        # mmap no admite un archivo sin datos: un índice vacío se representa en memoria
+        self.vectores = np.load(os.path.join(ruta, "vectores.npy"), mmap_mode="r") if self.fragmentos \
+            else np.zeros((0, DIMENSION), dtype=np.float32)
+        if len(self.fragmentos) != self.vectores.shape[0]:
+            raise ValueError(f"Índice inconsistente en {ruta}: {len(self.fragmentos)} fragmentos y {self.vectores.shape[0]} vectores")
+
+        cursos = np.array([f["curso"] for f in self.fragmentos], dtype=object)
+        self._grados = np.array([f["grado"] for f in self.fragmentos], dtype=object)
+        self._filas_por_curso = {curso: np.flatnonzero(cursos == curso) for curso in CURSOS}
+        self._filas_sin_curso = np.flatnonzero(cursos == "")
+
+    def __len__(self) -> int:
+        return len(self.fragmentos)
+
+    def _filas(self, curso: Optional[str], grado: Optional[str]) -> np.ndarray:
+        if curso:
+            filas = np.concatenate([self._filas_por_curso.get(curso, np.zeros(0, dtype=np.int64)), self._filas_sin_curso])
+        else:
+            filas = np.arange(len(self.fragmentos))
+        if grado and len(filas):
+            grados = self._grados[filas]
+            filas = filas[(grados == grado) | (grados == "")]
+        return filas
+
+    def buscar(self, consulta: str, curso: Optional[str] = None, grado: Optional[str] = None, k: int = 4) -> List[Dict[str, Any]]:
+        """Los k fragmentos más parecidos (similitud coseno) del curso y grado indicados."""
+        filas = self._filas(curso, grado)
+        if not len(filas):
+            return []
+        puntajes = np.asarray(self.vectores[filas]) @ vectorizar_texto(consulta)
+        k = min(k, len(filas))
+        mejores = np.argpartition(-puntajes, k - 1)[:k]
+        mejores = mejores[np.argsort(-puntajes[mejores])]
+        return [
+            {**self.fragmentos[filas[i]], "puntaje": round(float(puntajes[i]), 4)}
+            for i in mejores
+        ]
+
+
+_indice: Optional[IndiceLocal] = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice() -> Optional[IndiceLocal]:
+    """Carga el índice (construyéndolo la primera vez si falta). None si no hay material."""
+    global _indice
+    if _indice is not None:
+        return _indice
+    with _indice_lock:
+        if _indice is None:
+            if ruta_generacion_actual(RUTA_INDICE) is None:
+                construir_indice()
+            _indice = IndiceLocal(ruta_generacion_actual(RUTA_INDICE))
+            if VIGILANCIA_ACTIVA:
+                iniciar_vigilante()
+    return _indice
+
+
+async def aobtener_indice() -> Optional[IndiceLocal]:
+    """obtener_indice para el camino async: la primera carga (o construcción) se hace en un hilo."""
+    if _indice is not None or not INDICE_ACTIVO:
+        return _indice
+    return await asyncio.to_thread(obtener_indice)
+
+
+def generacion_indice() -> str:
+    """
+    Nombre de la generación del índice en uso (gen_<ns>), o "" si no hay índice. Forma
+    parte de la clave de caché de las herramientas que buscan contexto.
+    """
+    if not INDICE_ACTIVO:
+        return ""
+    try:
+        indice = obtener_indice()  # la búsqueda lo cargaría de todos modos
+    except Exception:
+        return ""  # la búsqueda fallará igual y esa respuesta no se cachea
+    return os.path.basename(indice.ruta) if indice is not None and indice.ruta else ""
+
+
+def actualizar_indice(completo: bool = False) -> Dict[str, Any]:
+    """
+    Aplica los cambios de Data/ y cambia el índice en uso por la nueva generación.
+    Las búsquedas en curso terminan con la anterior; no hay pausa global.
+    """
+    global _indice
+    reporte = construir_indice(completo=completo)
+    ruta = reporte["ruta"]
+    if _indice is None or _indice.ruta != ruta:
+        nuevo = IndiceLocal(ruta)
+        with _indice_lock:
+            _indice = nuevo
+    return reporte
+
+
+# ----------------------------------------------------
+# 5. VIGILANCIA DE Data/ (sondeo en segundo plano)
+# ----------------------------------------------------
+_vigilante: Optional[threading.Thread] = None
+
+
+def hay_cambios(directorio: str = DATA_DIR, destino: str = RUTA_INDICE) -> bool:
+    """Comparación barata (solo stat) contra el manifiesto de la generación vigente."""
+    _, candidatos, eliminados = detectar_cambios(directorio, _leer_manifiesto(ruta_generacion_actual(destino)))
+    return bool(candidatos or eliminados)
+
+
+def iniciar_vigilante(intervalo_s: float = INTERVALO_VIGILANCIA_S) -> threading.Thread:
+    """Hilo que cada `intervalo_s` revisa Data/ y, si algo cambió, actualiza el índice en caliente."""
+    global _vigilante
+    with _construccion_lock:
+        if _vigilante is not None:
+            return _vigilante
+
+        def _vigilar():
+            while True:
+                time.sleep(intervalo_s)
+                try:
+                    if hay_cambios():
+                        actualizar_indice()
+                except Exception as e:
+                    print(f"⚠️ Vigilante de Data/: {type(e).__name__}: {e}")
+
+        _vigilante = threading.Thread(target=_vigilar, daemon=True, name="eva-indice-vigilante")
+        _vigilante.start()
+        print(f"👀 Vigilando {DATA_DIR} cada {intervalo_s:g}s")
+        return _vigilante
+
+
+# ----------------------------------------------------
+# 6. BÚSQUEDA CON RESPALDO WEB
+# ----------------------------------------------------
+def buscar_local(consulta: str, curso: Optional[str] = None, grado: Optional[str] = None, k: int = 4) -> List[Dict[str, Any]]:
+    if not INDICE_ACTIVO:
+        return []
+    with medir("busqueda_local"):
+        indice = obtener_indice()
+        return indice.buscar(consulta, curso, grado, k) if indice is not None and len(indice) else []
+
+
+def buscar_contexto(consulta: str, curso: Optional[str] = None, grado: Optional[str] = None, max_results: int = 4) -> Any:
+    """
+    Primero el material de Data/; si ningún fragmento es relevante (ver _es_relevante) se
+    consulta Tavily. Devuelve la misma forma que buscar_web (lista de {"url", "content"}).
+    """
+    locales = _resultados_locales(consulta, curso, grado, max_results)
+    return locales if locales else buscar_web(consulta, max_results=max_results)
+
+
+async def abuscar_contexto(consulta: str, curso: Optional[str] = None, grado: Optional[str] = None, max_results: int = 4) -> Any:
+    """Versión asíncrona de buscar_contexto (la búsqueda local es en memoria; Tavily con ainvoke)."""
+    await aobtener_indice()
+    locales = _resultados_locales(consulta, curso, grado, max_results)
+    return locales if locales else await abuscar_web(consulta, max_results=max_results)
+
+
+def _raices(texto: str) -> set:
+    """Términos de contenido del texto, recortados a 6 letras (singular y plural coinciden)."""
+    return {t[:6] for t in tokenizar(texto) if t not in PALABRAS_GENERICAS}
+
+
+def cobertura_lexica(consulta: str, texto: str) -> float:
+    """Fracción de los términos de contenido de la consulta que aparecen en el texto."""
+    terminos = _raices(consulta)
+    return len(terminos & _raices(texto)) / len(terminos) if terminos else 0.0
+
+
+def _es_relevante(consulta: str, resultado: Dict[str, Any]) -> bool:
+    """
+    Los embeddings por hashing puntúan igual un fragmento que solo comparte sílabas con la
+    consulta que uno que trata el tema, así que el coseno solo descarta lo evidente
+    (UMBRAL_RECUPERACION) y decide la cobertura léxica: al menos COBERTURA_MINIMA de los
+    términos de contenido de la consulta tienen que estar en el fragmento.
+    """
+    return resultado["puntaje"] >= UMBRAL_RECUPERACION and cobertura_lexica(consulta, resultado["texto"]) >= COBERTURA_MINIMA
+
+
+def _resultados_locales(consulta: str, curso: Optional[str], grado: Optional[str], max_results: int) -> List[Dict[str, Any]]:
+    locales = [r for r in buscar_local(consulta, curso, grado, max_results) if _es_relevante(consulta, r)]
+    return [{"url": f"data://{r['fuente']}#{r['posicion']}", "content": r["texto"], "puntaje": r["puntaje"]} for r in locales]
+
+
+def contexto_para_herramienta(consulta: str, curso: str, herramienta: str, max_results: int = 4) -> str:
+    """
+    Contexto empaquetado para el prompt de una herramienta. Si la búsqueda falla o no trae
+    nada devuelve un aviso en su lugar y marca la llamada con no_cachear(): esa respuesta
+    degradada no debe servirse desde la caché durante todo el TTL.
+    """
+    try:
+        resultados = buscar_contexto(consulta, curso=curso, max_results=max_results)
+    except Exception as e:
+        return _contexto_fallido(e)
+    return _contexto_empaquetado(consulta, resultados, herramienta)
+
+
+async def acontexto_para_herramienta(consulta: str, curso: str, herramienta: str, max_results: int = 4) -> str:
+    """Versión asíncrona de contexto_para_herramienta."""
+    try:
+        resultados = await abuscar_contexto(consulta, curso=curso, max_results=max_results)
+    except Exception as e:
+        return _contexto_fallido(e)
+    return _contexto_empaquetado(consulta, resultados, herramienta)
+
+
+def _contexto_fallido(error: Exception) -> str:
+    no_cachear(f"búsqueda fallida: {type(error).__name__}")
+    return f"(No se pudo obtener contexto: {error})"
+
+
+def _contexto_empaquetado(consulta: str, resultados: Any, herramienta: str) -> str:
+    contexto = empaquetar_contexto(consulta, resultados, herramienta) if isinstance(resultados, list) else ""
+    if not contexto:
+        no_cachear("sin contexto")
+        return f"(Sin contexto: {resultados})" if isinstance(resultados, str) and resultados else "(Sin contexto encontrado)"
+    return contexto
+
+
+def crear_herramienta_material(curso: str):
+    """Herramienta `buscar_material` ligada al curso del agente (filtra el índice por curso)."""
+    from langchain_core.tools import StructuredTool
+
+    def buscar_material(consulta: str, grado: str = "") -> str:
+        """
+        Busca en el material del curso (libros y fichas de la carpeta Data/) los fragmentos
+        más relevantes para la consulta. Opcionalmente filtra por grado (p. ej. "1° Secundaria").
+        """
+        try:
+            resultados = buscar_contexto(consulta, curso, grado or None)
+        except Exception as e:
+            return f"(No se pudo obtener material: {e})"
+        return _material_empaquetado(consulta, resultados)
+
+    async def abuscar_material(consulta: str, grado: str = "") -> str:
+        try:
+            resultados = await abuscar_contexto(consulta, curso, grado or None)
+        except Exception as e:
+            return f"(No se pudo obtener material: {e})"
+        return _material_empaquetado(consulta, resultados)
+
+    return StructuredTool.from_function(func=buscar_material, coroutine=abuscar_material)
+
+
+def _material_empaquetado(consulta: str, resultados: Any) -> str:
+    if not isinstance(resultados, list) or not resultados:
+        return f"(Sin material encontrado: {resultados})" if resultados else "(Sin material encontrado)"
+    return empaquetar_contexto(consulta, resultados, "buscar_material") or "(Sin material encontrado)"
+
+
+# ----------------------------------------------------
+# 7. EJECUCIÓN
+# ----------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Construye o actualiza el índice local de Data/.")
+    parser.add_argument("--completo", action="store_true", help="Reindexa todo, sin reutilizar nada.")
+    parser.add_argument("--vigilar", action="store_true", help="Sigue vigilando Data/ y aplica los cambios.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_VIGILANCIA_S)
+    args = parser.parse_args()
+
+    print(json.dumps(actualizar_indice(completo=args.completo), ensure_ascii=False))
+    if args.vigilar:
+        iniciar_vigilante(args.intervalo)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,66 +4,602 @@
 import os
 import json 
 import sys
+import threading
 import json
+import uuid
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import ValidationError
-from langchain_core.messages import HumanMessage
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
 
 # Añade los paths de módulos (App y Agents)
 sys.path.append(os.path.join(os.path.dirname(__file__), "App"))
 sys.path.append(os.path.join(os.path.dirname(__file__), "Agents"))
 
-# 1. CARGA DE CONFIGURACIÓN Y CLAVES
+# 1. CARGA DE CONFIGURACIÓN Y CLAVES (al arrancar: si falta una clave obligatoria,
+#    el proceso termina aquí y no dentro de la primera pregunta)
 from App.config import load_config_and_keys
-load_config_and_keys()
+# EVA_CLAVES_OBLIGATORIAS=0 permite arrancar sin archivos de claves (benchmarks sin conexión)
+CLAVES_OBLIGATORIAS = os.getenv("EVA_CLAVES_OBLIGATORIAS", "1") == "1"
 
-# 2. IMPORTACIÓN DE VALIDADOR Y AGENTES
-from App.validador import run_eva_pipeline
+# 2. IMPORTACIÓN DE CACHÉ, UTILIDADES Y REGISTRO DE AGENTES
+# (el validador y los agentes, con su ChatOpenAI y grafos, se cargan bajo demanda)
+from App.cache_respuestas import CacheSemantica, CACHE_ACTIVA, depende_del_contexto, normalizar_pregunta
+from App.coalescencia import VUELOS_PREGUNTAS
+from App.banco_respuestas import buscar_en_banco
+from App.clientes_llm import aprecalentar_conexiones, precalentar_conexiones
+from App.streaming import extraer_campos_parciales
+from App.memoria_sesiones import id_hilo, obtener_memoria_sesiones
+from Agents.esquemas import NOMBRE_HERRAMIENTA_RESPUESTA, extraer_respuesta
+from App.enrutador_modelos import aescalar_respuesta, escalar_respuesta
 
-from Agents.Agent_comunicacion import get_comunicacion_agent
-from Agents.Agent_matematica import get_matematica_agent
-from Agents.Agent_CTA import get_cta_agent
-from Agents.Agent_EPT import get_ept_agent
-from Agents.Agent_ingles import get_ingles_agent  
+from App.ruteo_directo import detectar_ruta_directa, ejecutar_ruta_directa, aejecutar_ruta_directa
+from App.registro_agentes import RegistroAgentes
+from App.metricas import id_traza, iniciar_exportadores, medir, traza
+from App.trazas import iniciar_trazas
 
 # -----------------------------------------------------------------------
-# INICIALIZACIÓN GLOBAL: Carga y compilación de agentes
+# INICIALIZACIÓN GLOBAL: configuración, validador y agentes bajo demanda
 # -----------------------------------------------------------------------
-AGENTS_EXECUTORS = {}
-
-try:
-    print("--- Inicializando Orquestador de Agentes ---")
-    COMUNICACION_EXECUTOR, _ = get_comunicacion_agent()
-    MATEMATICA_EXECUTOR, _ = get_matematica_agent()
-    CTA_EXECUTOR, _ = get_cta_agent()
-    EPT_EXECUTOR, _ = get_ept_agent()
-    INGLES_EXECUTOR, _ = get_ingles_agent()  
-
-    AGENTS_EXECUTORS.update({
-        "Comunicación": COMUNICACION_EXECUTOR,
-        "Matemática": MATEMATICA_EXECUTOR,
-        "Ciencia y Tecnología": CTA_EXECUTOR,
-        "Educación para el Trabajo": EPT_EXECUTOR,
-        "Inglés": INGLES_EXECUTOR  # Añadido al diccionario
-    })
-    print("--- Todos los agentes inicializados ✅ ---")
-except Exception as e:
-    print(f"❌ ERROR al inicializar Agentes: {e}")
+_arranque_lock = threading.Lock()
+_configuracion_cargada = False
+
+
+def _cargar_configuracion():
+    """Carga las claves (OpenAI, LangSmith, Tavily) una sola vez, antes del primer ChatOpenAI."""
+    global _configuracion_cargada
+    with _arranque_lock:
+        if not _configuracion_cargada:
+            load_config_and_keys(obligatorio=CLAVES_OBLIGATORIAS)
+            _configuracion_cargada = True
+
+
+# Solo lee los archivos de claves (milisegundos); lo costoso (LLMs y grafos) sigue diferido
+_cargar_configuracion()
+
+
+def _validador():
+    """Módulo del validador; se importa (y crea su LLM) en la primera pregunta."""
+    _cargar_configuracion()
+    import App.validador as validador
+    return validador
+
+
+# Cada agente se importa y compila la primera vez que se consulta su curso
+AGENTS_EXECUTORS = RegistroAgentes(preparar=_cargar_configuracion)
+
+# EVA_PRECARGAR_AGENTES=1 los construye todos en segundo plano al arrancar y precalienta
+# las conexiones TLS del pool síncrono (sin OPENAI_API_KEY no se abre ninguna)
+PRECARGA_ACTIVA = os.getenv("EVA_PRECARGAR_AGENTES", "0") == "1"
+if PRECARGA_ACTIVA:
+    AGENTS_EXECUTORS.precargar()
+    threading.Thread(target=precalentar_conexiones, daemon=True).start()
+
+# Métricas por etapa: endpoint Prometheus (EVA_METRICAS_PUERTO) y/o volcado JSON (EVA_METRICAS_JSON)
+iniciar_exportadores()
+# Trazas locales con muestreo por cola (errores y preguntas lentas siempre)
+iniciar_trazas()
+
+# Ruteo directo a herramientas para intenciones claras (evita el ciclo ReAct)
+RUTEO_DIRECTO_ACTIVO = os.getenv("EVA_RUTEO_DIRECTO", "1") == "1"
+
+# Sesión usada cuando el llamador no identifica al estudiante (scripts, pruebas)
+SESION_POR_DEFECTO = "session_1"
+
+# Caché semántica de respuestas finales (grado, curso, pregunta normalizada)
+CACHE_RESPUESTAS = CacheSemantica()
+
+# Ejecución especulativa: el agente del curso elegido arranca en paralelo al validador.
+# Solo con la Cadena 4 local: con EVA_CADENA4_MODO=llm el prompt del agente no se conoce
+# hasta que termina el validador, así que no hay nada que adelantar.
+ESPECULACION_ACTIVA = (
+    os.getenv("EVA_ESPECULACION", "0") == "1" and os.getenv("EVA_CADENA4_MODO", "local") != "llm"
+)
+POOL_ESPECULACION = ThreadPoolExecutor(
+    max_workers=int(os.getenv("EVA_ESPECULACION_HILOS", "16")), thread_name_prefix="eva-especulacion"
+)
+ESTADISTICAS_ESPECULACION = {"lanzadas": 0, "aprovechadas": 0, "descartadas": 0}
+_especulacion_lock = threading.Lock()
 
 # =======================================================================
 # 3. FUNCIÓN PRINCIPAL DE PROCESAMIENTO
 # =======================================================================
+def procesar_pregunta(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str = SESION_POR_DEFECTO) -> str:
+    """
+    Consulta primero la caché semántica y luego el banco de respuestas pregeneradas; si no
+    hay acierto, ejecuta el flujo completo y guarda las respuestas exitosas del agente.
+    Las preguntas idénticas que llegan a la vez comparten una sola ejecución del flujo
+    (ver _clave_vuelo y App/coalescencia.py).
+    """
+    with traza(curso_sistema):
+        if CACHE_ACTIVA:
+            respuesta_cacheada = CACHE_RESPUESTAS.buscar(grado_sistema, curso_sistema, pregunta)
+            if respuesta_cacheada is not None:
+                print(f"⚡ Respuesta servida desde caché: Grado={grado_sistema}, Curso={curso_sistema}")
+                return respuesta_cacheada
+
+        respuesta_banco = buscar_en_banco(grado_sistema, curso_sistema, pregunta)
+        if respuesta_banco is not None:
+            print(f"🏦 Respuesta servida desde el banco: Grado={grado_sistema}, Curso={curso_sistema}")
+            return respuesta_banco
+
+        return VUELOS_PREGUNTAS.ejecutar(
+            _clave_vuelo(pregunta, grado_sistema, curso_sistema, sesion_id),
+            lambda: _resolver_pregunta(pregunta, grado_sistema, curso_sistema, sesion_id),
+        )
+
+
+def _clave_vuelo(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> tuple:
+    """
+    Clave de coalescencia: grado, curso y pregunta normalizada. Si la pregunta depende de
+    la conversación ("¿y el siguiente?") su respuesta es propia de cada sesión, así que
+    solo se agrupa con llamadas de la misma sesión.
+    """
+    clave = (grado_sistema, curso_sistema, normalizar_pregunta(pregunta))
+    return clave + (sesion_id,) if depende_del_contexto(pregunta) else clave
+
+
+def _resolver_pregunta(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> str:
+    """Flujo completo (lo ejecuta solo la llamada líder) y guardado en la caché semántica."""
+    if ESPECULACION_ACTIVA:
+        respuesta = _procesar_pregunta_especulativa(pregunta, grado_sistema, curso_sistema, sesion_id)
+    else:
+        respuesta = _procesar_pregunta_sin_cache(pregunta, grado_sistema, curso_sistema, sesion_id)
+
+    if CACHE_ACTIVA and respuesta.startswith("✅"):
+        CACHE_RESPUESTAS.guardar(grado_sistema, curso_sistema, pregunta, respuesta)
+    return respuesta
+
+
      # Activación del Flujo y Control de Fallos Críticos (API/LLM)
-def procesar_pregunta(pregunta: str, grado_sistema: str, curso_sistema: str) -> str:
+def _procesar_pregunta_sin_cache(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> str:
     """
     Ruta la pregunta a través del validador y luego invoca al agente especialista correspondiente.
     """
-    print(f"Procesando Pregunta: Grado={grado_sistema}, Curso={curso_sistema}")
+    print(f"Procesando Pregunta: Grado={grado_sistema}, Curso={curso_sistema} [traza {id_traza()}]")
+
+    try:
+        resultado_validacion = _validador().run_eva_pipeline(grado_sistema, curso_sistema, pregunta)
+    except Exception as e:
+        return f"❌ **Error Crítico del Sistema (API/LLM):** {type(e).__name__}: {e}"
+
+    respuesta_corte, prompt_para_agente, curso_destino = _interpretar_validacion(resultado_validacion, curso_sistema)
+    if respuesta_corte:
+        return respuesta_corte
+
+    # Verificar si el curso tiene agente
+    executor = AGENTS_EXECUTORS.get(curso_destino) #validador decidio el curso y filtra al agente
+    if not executor:
+        return _sin_agente(curso_destino)
+
+    # Invocar agente (o su herramienta directamente si la intención es clara)
+    try:
+        respuesta_llm = _ejecutar_agente(
+            executor, curso_destino, pregunta,
+            {"messages": [HumanMessage(content=prompt_para_agente)]},
+            {"configurable": {"thread_id": id_hilo(curso_destino, sesion_id)}},
+        )
+        return _formatear_respuesta_agente(respuesta_llm, curso_destino)
+
+    except Exception as e:
+        return f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+
+
+# =======================================================================
+# 4. VERSIÓN ASÍNCRONA (un solo event loop para muchos estudiantes)
+# =======================================================================
+async def aprecalentar() -> int:
+    """Con EVA_PRECARGAR_AGENTES=1, precalienta el pool async desde el loop que lo usará."""
+    return await aprecalentar_conexiones() if PRECARGA_ACTIVA else 0
+
+
+async def procesar_pregunta_async(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str = SESION_POR_DEFECTO) -> str:
+    """
+    Equivalente asíncrono de procesar_pregunta: validador y agente se ejecutan con
+    ainvoke, así que muchas preguntas concurrentes comparten un único event loop.
+    """
+    with traza(curso_sistema):
+        if CACHE_ACTIVA:
+            respuesta_cacheada = CACHE_RESPUESTAS.buscar(grado_sistema, curso_sistema, pregunta)
+            if respuesta_cacheada is not None:
+                print(f"⚡ Respuesta servida desde caché: Grado={grado_sistema}, Curso={curso_sistema}")
+                return respuesta_cacheada
+
+        respuesta_banco = buscar_en_banco(grado_sistema, curso_sistema, pregunta)
+        if respuesta_banco is not None:
+            print(f"🏦 Respuesta servida desde el banco: Grado={grado_sistema}, Curso={curso_sistema}")
+            return respuesta_banco
+
+        return await VUELOS_PREGUNTAS.aejecutar(
+            _clave_vuelo(pregunta, grado_sistema, curso_sistema, sesion_id),
+            lambda: _aresolver_pregunta(pregunta, grado_sistema, curso_sistema, sesion_id),
+        )
+
+
+async def _aresolver_pregunta(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> str:
+    """Versión asíncrona de _resolver_pregunta."""
+    if ESPECULACION_ACTIVA:
+        respuesta = await _procesar_pregunta_especulativa_async(pregunta, grado_sistema, curso_sistema, sesion_id)
+    else:
+        respuesta = await _procesar_pregunta_sin_cache_async(pregunta, grado_sistema, curso_sistema, sesion_id)
+
+    if CACHE_ACTIVA and respuesta.startswith("✅"):
+        CACHE_RESPUESTAS.guardar(grado_sistema, curso_sistema, pregunta, respuesta)
+    return respuesta
+
+
+async def _procesar_pregunta_sin_cache_async(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> str:
+    """Validador (run_eva_pipeline_async) + agente (ainvoke) sin bloquear el event loop."""
+    print(f"Procesando Pregunta (async): Grado={grado_sistema}, Curso={curso_sistema} [traza {id_traza()}]")
 
     try:
-        resultado_validacion = run_eva_pipeline(grado_sistema, curso_sistema, pregunta)
+        resultado_validacion = await _validador().run_eva_pipeline_async(grado_sistema, curso_sistema, pregunta)
     except Exception as e:
         return f"❌ **Error Crítico del Sistema (API/LLM):** {type(e).__name__}: {e}"
 
+    respuesta_corte, prompt_para_agente, curso_destino = _interpretar_validacion(resultado_validacion, curso_sistema)
+    if respuesta_corte:
+        return respuesta_corte
+
+    executor = AGENTS_EXECUTORS.get(curso_destino)
+    if not executor:
+        return _sin_agente(curso_destino)
+
+    try:
+        respuesta_llm = await _aejecutar_agente(
+            executor, curso_destino, pregunta,
+            {"messages": [HumanMessage(content=prompt_para_agente)]},
+            {"configurable": {"thread_id": id_hilo(curso_destino, sesion_id)}},
+        )
+        return await _aformatear_respuesta_agente(respuesta_llm, curso_destino)
+
+    except Exception as e:
+        return f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+
+
+# =======================================================================
+# 5. EJECUCIÓN ESPECULATIVA (validador y agente en paralelo)
+# =======================================================================
+# En la mayoría de preguntas el curso elegido en la UI coincide con el detectado,
+# y con la Cadena 4 local el prompt del agente se conoce de antemano. El agente
+# arranca a la vez que el validador, pero sobre un hilo borrador (copia del hilo
+# de la sesión): si la validación aprueba, el turno se añade al hilo real; si no,
+# el borrador se borra y el hilo real nunca ve el turno. Un agente descartado se
+# corta antes de su siguiente llamada al LLM o a una herramienta.
+class EspeculacionDescartada(Exception):
+    """Interrumpe el agente especulativo de una pregunta que el validador rechazó."""
+
+
+class _CorteEspeculativo(BaseCallbackHandler):
+    """Callback que aborta el agente en cuanto se marca el turno como descartado."""
+    raise_error = True
+
+    def __init__(self):
+        self.descartado = threading.Event()
+
+    def _comprobar(self, *args, **kwargs):
+        if self.descartado.is_set():
+            raise EspeculacionDescartada("turno especulativo descartado")
+
+    on_chat_model_start = on_llm_start = on_tool_start = _comprobar
+
+
+def _contar_especulacion(resultado: str):
+    with _especulacion_lock:
+        ESTADISTICAS_ESPECULACION[resultado] += 1
+
+
+def _preparar_especulacion(executor, pregunta: str, curso_sistema: str, sesion_id: str):
+    """Prompt local de la Cadena 4, hilo borrador copiado del hilo real y callback de corte."""
+    prompt_para_agente = _validador().renderizar_prompt_agente(
+        {"valido": True, "entrada_usuario": pregunta, "curso_sistema": curso_sistema}
+    )
+    entrada = {"messages": [HumanMessage(content=prompt_para_agente, id=str(uuid.uuid4()))]}
+    hilo_real = id_hilo(curso_sistema, sesion_id)
+    hilo_borrador = f"{hilo_real}#especulativo-{uuid.uuid4().hex[:12]}"
+    executor.checkpointer.copiar_hilo(hilo_real, hilo_borrador)
+    corte = _CorteEspeculativo()
+    config = {"configurable": {"thread_id": hilo_borrador}, "callbacks": [corte]}
+    return entrada, config, corte
+
+
+def _config_hilo(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _mensajes_del_turno(executor, config: dict, hilo_real: str):
+    """Mensajes que el turno especulativo añadió al borrador (los que el hilo real aún no tiene)."""
+    previos = {m.id for m in executor.get_state(_config_hilo(hilo_real)).values.get("messages", [])}
+    mensajes = executor.get_state(_config_hilo(config["configurable"]["thread_id"])).values.get("messages", [])
+    return [m for m in mensajes if m.id not in previos]
+
+
+def _confirmar_turno_especulativo(executor, config: dict, curso_sistema: str, sesion_id: str):
+    """
+    Añade al hilo real el turno aprobado (como tras entregar_respuesta) y borra el borrador.
+    Las fusiones se serializan: dos turnos aprobados a la vez en la misma sesión leerían
+    el mismo checkpoint y uno pisaría al otro. Es una operación en memoria, así que el
+    camino async la llama directamente.
+    """
+    hilo_real = id_hilo(curso_sistema, sesion_id)
+    try:
+        with _especulacion_lock:
+            nuevos = _mensajes_del_turno(executor, config, hilo_real)
+            if nuevos:
+                executor.update_state(_config_hilo(hilo_real), {"messages": nuevos}, as_node="tools")
+    finally:
+        _borrar_borrador(executor, config)
+
+
+def _borrar_borrador(executor, config: dict):
+    try:
+        executor.checkpointer.delete_thread(config["configurable"]["thread_id"])
+    except Exception as e:
+        print(f"⚠️ No se pudo borrar el hilo especulativo: {type(e).__name__}: {e}")
+
+
+def _procesar_pregunta_especulativa(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> str:
+    """Como _procesar_pregunta_sin_cache, pero con el agente ejecutándose en paralelo al validador."""
+    executor = AGENTS_EXECUTORS.get(curso_sistema)
+    if not executor:
+        return _procesar_pregunta_sin_cache(pregunta, grado_sistema, curso_sistema, sesion_id)
+
+    print(f"Procesando Pregunta (especulativa): Grado={grado_sistema}, Curso={curso_sistema} [traza {id_traza()}]")
+    entrada, config, corte = _preparar_especulacion(executor, pregunta, curso_sistema, sesion_id)
+    # copy_context: el agente especulativo conserva la traza de la pregunta
+    futuro_agente = POOL_ESPECULACION.submit(
+        contextvars.copy_context().run, _ejecutar_agente, executor, curso_sistema, pregunta, entrada, config
+    )
+    _contar_especulacion("lanzadas")
+
+    def _descartar():
+        # Si aún no empezó, cancel() lo evita; si ya corre, el callback lo corta en su
+        # siguiente paso. En ambos casos el borrador se borra al terminar.
+        _contar_especulacion("descartadas")
+        corte.descartado.set()
+        futuro_agente.cancel()
+        futuro_agente.add_done_callback(lambda _: _borrar_borrador(executor, config))
+
+    try:
+        resultado_validacion = _validador().run_eva_pipeline(grado_sistema, curso_sistema, pregunta)
+    except Exception as e:
+        _descartar()
+        return f"❌ **Error Crítico del Sistema (API/LLM):** {type(e).__name__}: {e}"
+
+    respuesta_corte, _, curso_destino = _interpretar_validacion(resultado_validacion, curso_sistema)
+    if respuesta_corte:
+        _descartar()
+        return respuesta_corte
+
+    try:
+        respuesta_llm = futuro_agente.result()
+    except Exception as e:
+        _borrar_borrador(executor, config)
+        return f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+    _confirmar_turno_especulativo(executor, config, curso_sistema, sesion_id)
+    _contar_especulacion("aprovechadas")
+    return _formatear_respuesta_agente(respuesta_llm, curso_destino)
+
+
+async def _procesar_pregunta_especulativa_async(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str) -> str:
+    """Versión asíncrona: el agente es una tarea que se cancela si la validación falla."""
+    executor = AGENTS_EXECUTORS.get(curso_sistema)
+    if not executor:
+        return await _procesar_pregunta_sin_cache_async(pregunta, grado_sistema, curso_sistema, sesion_id)
+
+    print(f"Procesando Pregunta (especulativa, async): Grado={grado_sistema}, Curso={curso_sistema} [traza {id_traza()}]")
+    entrada, config, corte = _preparar_especulacion(executor, pregunta, curso_sistema, sesion_id)
+    tarea_agente = asyncio.create_task(_aejecutar_agente(executor, curso_sistema, pregunta, entrada, config))
+    _contar_especulacion("lanzadas")
+
+    async def _descartar():
+        _contar_especulacion("descartadas")
+        corte.descartado.set()
+        tarea_agente.cancel()
+        try:
+            await tarea_agente
+        except BaseException:
+            pass
+        _borrar_borrador(executor, config)
+
+    try:
+        resultado_validacion = await _validador().run_eva_pipeline_async(grado_sistema, curso_sistema, pregunta)
+    except Exception as e:
+        await _descartar()
+        return f"❌ **Error Crítico del Sistema (API/LLM):** {type(e).__name__}: {e}"
+
+    respuesta_corte, _, curso_destino = _interpretar_validacion(resultado_validacion, curso_sistema)
+    if respuesta_corte:
+        await _descartar()
+        return respuesta_corte
+
+    try:
+        respuesta_llm = await tarea_agente
+    except Exception as e:
+        _borrar_borrador(executor, config)
+        return f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+    _confirmar_turno_especulativo(executor, config, curso_sistema, sesion_id)
+    _contar_especulacion("aprovechadas")
+    return await _aformatear_respuesta_agente(respuesta_llm, curso_destino)
+
+
+# =======================================================================
+# 6. VERSIÓN EN STREAMING (eventos de etapa + tokens de la respuesta)
+# =======================================================================
+def procesar_pregunta_stream(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str = SESION_POR_DEFECTO):
+    """
+    Generador de eventos para la UI. Cada evento es un dict con la clave "evento":
+      - "validado": {"valido", "curso"} tras el validador
+      - "herramienta_inicio" / "herramienta_fin": {"herramienta"} durante el ciclo ReAct
+      - "token": {"texto"} fragmento de la respuesta final del agente
+      - "parcial": {"explicacion_profunda", "parrafo_ejemplo", "texto"} campos extraídos del JSON incompleto
+      - "final": {"respuesta"} el mismo Markdown que devolvería procesar_pregunta
+    Si la misma pregunta ya se está respondiendo (ver _clave_vuelo), solo llega su "final".
+    """
+    with traza(curso_sistema):
+        yield from _eventos_pregunta(pregunta, grado_sistema, curso_sistema, sesion_id)
+
+
+def _eventos_pregunta(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str):
+    if CACHE_ACTIVA:
+        respuesta_cacheada = CACHE_RESPUESTAS.buscar(grado_sistema, curso_sistema, pregunta)
+        if respuesta_cacheada is not None:
+            yield {"evento": "final", "respuesta": respuesta_cacheada, "desde_cache": True}
+            return
+
+    respuesta_banco = buscar_en_banco(grado_sistema, curso_sistema, pregunta)
+    if respuesta_banco is not None:
+        yield {"evento": "final", "respuesta": respuesta_banco, "desde_banco": True}
+        return
+
+    # Como en procesar_pregunta: la llamada líder recorre validador y agente emitiendo sus
+    # eventos; las idénticas que llegan mientras tanto reciben su respuesta final
+    yield from VUELOS_PREGUNTAS.ejecutar_eventos(
+        _clave_vuelo(pregunta, grado_sistema, curso_sistema, sesion_id),
+        lambda: _eventos_agente(pregunta, grado_sistema, curso_sistema, sesion_id),
+        resultado_de=lambda evento: evento["respuesta"] if evento["evento"] == "final" else None,
+        evento_de=lambda respuesta: {"evento": "final", "respuesta": respuesta, "coalescida": True},
+    )
+
+
+def _eventos_agente(pregunta: str, grado_sistema: str, curso_sistema: str, sesion_id: str):
+    """Validador y agente en streaming (lo ejecuta solo la llamada líder)."""
+    print(f"Procesando Pregunta (stream): Grado={grado_sistema}, Curso={curso_sistema} [traza {id_traza()}]")
+    try:
+        resultado_validacion = _validador().run_eva_pipeline(grado_sistema, curso_sistema, pregunta)
+    except Exception as e:
+        yield {"evento": "final", "respuesta": f"❌ **Error Crítico del Sistema (API/LLM):** {type(e).__name__}: {e}"}
+        return
+
+    respuesta_corte, prompt_para_agente, curso_destino = _interpretar_validacion(resultado_validacion, curso_sistema)
+    yield {"evento": "validado", "valido": respuesta_corte is None, "curso": curso_destino}
+    if respuesta_corte:
+        yield {"evento": "final", "respuesta": respuesta_corte}
+        return
+
+    executor = AGENTS_EXECUTORS.get(curso_destino)
+    if not executor:
+        yield {"evento": "final", "respuesta": _sin_agente(curso_destino)}
+        return
+
+    config = {"configurable": {"thread_id": id_hilo(curso_destino, sesion_id)}}
+    ruta = _ruta_directa(curso_destino, pregunta)
+    if ruta:
+        yield {"evento": "herramienta_inicio", "herramienta": ruta.herramienta.name}
+        try:
+            with _hilo_en_uso(config):
+                respuesta_llm = ejecutar_ruta_directa(
+                    executor, ruta, {"messages": [HumanMessage(content=prompt_para_agente)]}, config,
+                )
+            yield {"evento": "herramienta_fin", "herramienta": ruta.herramienta.name}
+            respuesta = _formatear_respuesta_agente(respuesta_llm, curso_destino)
+        except Exception as e:
+            respuesta = f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+        if CACHE_ACTIVA and respuesta.startswith("✅"):
+            CACHE_RESPUESTAS.guardar(grado_sistema, curso_sistema, pregunta, respuesta)
+        yield {"evento": "final", "respuesta": respuesta}
+        return
+
+    mensajes = []
+    texto_en_curso = ""
+    llamada_en_curso = None
+    try:
+        with _hilo_en_uso(config):
+            for modo, datos in executor.stream(
+                {"messages": [HumanMessage(content=prompt_para_agente)]},
+                config=config,
+                stream_mode=["messages", "updates"],
+            ):
+                if modo == "messages":
+                    fragmento, metadatos = datos
+                    # Solo los tokens del nodo del agente (no los LLM internos de las herramientas)
+                    if metadatos.get("langgraph_node") != "agent" or not isinstance(fragmento.content, str):
+                        continue
+                    # La respuesta llega como argumentos (JSON parcial) de la llamada a entregar_respuesta
+                    nuevo = fragmento.content
+                    for trozo in getattr(fragmento, "tool_call_chunks", None) or []:
+                        if trozo.get("name"):
+                            llamada_en_curso = trozo["name"]
+                        if llamada_en_curso == NOMBRE_HERRAMIENTA_RESPUESTA and trozo.get("args"):
+                            nuevo += trozo["args"]
+                    if not nuevo:
+                        continue
+                    texto_en_curso += nuevo
+                    yield {"evento": "token", "texto": nuevo}
+                    yield {"evento": "parcial", "texto": texto_en_curso, **extraer_campos_parciales(texto_en_curso)}
+
+                elif modo == "updates":
+                    for nodo, actualizacion in datos.items():
+                        nuevos = (actualizacion or {}).get("messages", [])
+                        mensajes.extend(nuevos)
+                        for m in nuevos:
+                            if nodo == "agent":
+                                for llamada in getattr(m, "tool_calls", None) or []:
+                                    if llamada["name"] == NOMBRE_HERRAMIENTA_RESPUESTA:
+                                        continue
+                                    texto_en_curso = ""
+                                    yield {"evento": "herramienta_inicio", "herramienta": llamada["name"]}
+                            elif nodo == "tools" and getattr(m, "name", "") != NOMBRE_HERRAMIENTA_RESPUESTA:
+                                yield {"evento": "herramienta_fin", "herramienta": getattr(m, "name", "")}
+
+        respuesta = _formatear_respuesta_agente({"messages": mensajes}, curso_destino)
+    except Exception as e:
+        respuesta = f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+
+    if CACHE_ACTIVA and respuesta.startswith("✅"):
+        CACHE_RESPUESTAS.guardar(grado_sistema, curso_sistema, pregunta, respuesta)
+    yield {"evento": "final", "respuesta": respuesta}
+
+
+# =======================================================================
+# 7. UTILIDADES COMPARTIDAS (validación y formateo de salida)
+# =======================================================================
+def _ruta_directa(curso_destino: str, pregunta: str):
+    if not RUTEO_DIRECTO_ACTIVO:
+        return None
+    return detectar_ruta_directa(AGENTS_EXECUTORS.rutas_directas(curso_destino), pregunta)
+
+
+def _ejecutar_agente(executor, curso_destino: str, pregunta: str, entrada: dict, config: dict):
+    """Llama directamente a la herramienta si la intención es clara; si no, ejecuta el ciclo ReAct."""
+    with medir("agente", curso=curso_destino), _hilo_en_uso(config):
+        ruta = _ruta_directa(curso_destino, pregunta)
+        if ruta:
+            print(f"🎯 Ruteo directo: {curso_destino} → {ruta.herramienta.name}")
+            return ejecutar_ruta_directa(executor, ruta, entrada, config)
+        return executor.invoke(entrada, config=config)
+
+
+async def _aejecutar_agente(executor, curso_destino: str, pregunta: str, entrada: dict, config: dict):
+    """Versión asíncrona de _ejecutar_agente."""
+    with medir("agente", curso=curso_destino), _hilo_en_uso(config):
+        ruta = _ruta_directa(curso_destino, pregunta)
+        if ruta:
+            print(f"🎯 Ruteo directo: {curso_destino} → {ruta.herramienta.name}")
+            return await aejecutar_ruta_directa(executor, ruta, entrada, config)
+        return await executor.ainvoke(entrada, config=config)
+
+
+def _hilo_en_uso(config: dict):
+    """Protege el hilo de la sesión del desalojo mientras el agente lo está usando."""
+    return obtener_memoria_sesiones().en_uso(config["configurable"]["thread_id"])
+
+
+def _sin_agente(curso_destino: str) -> str:
+    """Mensaje cuando no hay ejecutor: curso sin agente o agente que no se pudo construir."""
+    error = AGENTS_EXECUTORS.error(curso_destino)
+    if error:
+        return f"❌ **Error Crítico del Sistema:** No se pudo inicializar el agente de {curso_destino}: {error}"
+    return f"❓ **Error de Ruteo:** No hay agente configurado para '{curso_destino}'."
+
+
+def _interpretar_validacion(resultado_validacion: dict, curso_sistema: str):
+    """
+    Desempaqueta el diagnóstico del validador. Devuelve (respuesta_corte, prompt, curso_destino);
+    respuesta_corte es el mensaje final al usuario si no se debe invocar al agente, o None.
+    """
     # Desempaquetado del Diagnóstico y Control de Formato JSON
     try:
         diagnostico_json_str = resultado_validacion.get(
@@ -75,68 +611,70 @@ def procesar_pregunta(pregunta: str, grado_sistema: str, curso_sistema: str) ->
         prompt_para_agente = resultado_validacion.get("prompt_final", "")
         curso_destino = resultado_validacion.get("curso_final", curso_sistema)
     except json.JSONDecodeError:
-        return "❌ **Error de Parseo:** JSON mal formado desde el validador."
+        return "❌ **Error de Parseo:** JSON mal formado desde el validador.", "", curso_sistema
 
 
     # Bloqueo Lógico y Retorno Anticipado (si el validador es false)
     if not es_valido:
-        valor_limpio = mensaje_diagnostico.strip().lstrip('{ "').rstrip('}" ').split(":", 1)[1].strip()
+        valor_limpio = mensaje_diagnostico.strip().lstrip('{ "').rstrip('}" ').split(":", 1)[1].strip().strip('"')
         mensaje_dict = {"respuesta": valor_limpio}
-        return f"⚠️ **Advertencia del Validador:**\n\n{mensaje_dict['respuesta']}"
+        return f"⚠️ **Advertencia del Validador:**\n\n{mensaje_dict['respuesta']}", "", curso_destino
 
+    return None, prompt_para_agente, curso_destino
 
-    # Verificar si el curso tiene agente
-    executor = AGENTS_EXECUTORS.get(curso_destino) #validador decidio el curso y filtra al agente
-    if not executor:
-        return f"❓ **Error de Ruteo:** No hay agente configurado para '{curso_destino}'."
 
-    # Invocar agente
-    try:
-        respuesta_llm = executor.invoke(
-            {"messages": [HumanMessage(content=prompt_para_agente)]},
-            config={"configurable": {"thread_id": f"{curso_destino}_session_1"}},
-        )
-        
-        # --- Limpieza y Formateo de salida ---
-        respuesta_final = None
-
-        # Extraer contenido principal del resultado del LLM
-        if hasattr(respuesta_llm, "content") and respuesta_llm.content:
-            respuesta_final = respuesta_llm.content.strip()
-        elif isinstance(respuesta_llm, dict) and "messages" in respuesta_llm:
-            mensajes = respuesta_llm["messages"]
-            for m in reversed(mensajes):
-                if hasattr(m, "content") and isinstance(m.content, str) and m.content.strip():
-                    respuesta_final = m.content.strip()
-                    break
-
-        if not respuesta_final:
-            return f"⚠️ El agente de {curso_destino} no devolvió contenido útil."
-
-        # Quitar posibles etiquetas o formato erróneo
-        respuesta_final = respuesta_final.replace("```json", "").replace("```", "").strip()
-
-        # Intentar parsear JSON (estructura estándar de tus agentes)
-        try:
-            data = json.loads(respuesta_final)
-        except Exception:
-            data = None
-
-        if isinstance(data, dict):
-            explicacion = data.get("explicacion_profunda", "").strip()
-            ejemplo = data.get("parrafo_ejemplo", "").strip()
-
-            salida = f"✅ **Respuesta del Agente Especialista ({curso_destino}):**\n\n"
-            if explicacion:
-                salida += f"🧩 **Explicación:**\n{explicacion}\n\n"
-            if ejemplo:
-                salida += f"✏️ **Ejemplo:**\n{ejemplo}"
-            return salida
-        else:
-            return f"✅ **Respuesta del Agente Especialista ({curso_destino}):**\n\n{respuesta_final}"
+def _formatear_respuesta_agente(respuesta_llm, curso_destino: str) -> str:
+    """Toma la RespuestaAgente entregada por el agente y la formatea en Markdown para la UI."""
+    with medir("formateo", curso=curso_destino):
+        mensajes = respuesta_llm.get("messages", []) if isinstance(respuesta_llm, dict) else []
+        # Ruta normal: argumentos de entregar_respuesta, ya validados contra el esquema
+        respuesta = extraer_respuesta(mensajes)
+        if respuesta is None and mensajes:
+            # El agente no entregó una RespuestaAgente válida: el modelo fuerte la reconstruye
+            respuesta = escalar_respuesta(mensajes, curso_destino)
+            _avisar_escalado(respuesta, curso_destino)
+        return _formatear_mensajes(mensajes, respuesta, curso_destino)
 
-    except Exception as e:
-        return f"❌ **Error en la Ejecución del Agente de {curso_destino}:**\n\n`{type(e).__name__}: {e}`"
+
+async def _aformatear_respuesta_agente(respuesta_llm, curso_destino: str) -> str:
+    """Versión asíncrona de _formatear_respuesta_agente: el escalado usa ainvoke."""
+    with medir("formateo", curso=curso_destino):
+        mensajes = respuesta_llm.get("messages", []) if isinstance(respuesta_llm, dict) else []
+        respuesta = extraer_respuesta(mensajes)
+        if respuesta is None and mensajes:
+            respuesta = await aescalar_respuesta(mensajes, curso_destino)
+            _avisar_escalado(respuesta, curso_destino)
+        return _formatear_mensajes(mensajes, respuesta, curso_destino)
+
+
+def _avisar_escalado(respuesta, curso_destino: str) -> None:
+    if respuesta is not None:
+        print(f"⬆️ Respuesta de {curso_destino} escalada al modelo fuerte (esquema inválido)")
+
+
+def _formatear_mensajes(mensajes, respuesta, curso_destino: str) -> str:
+    if respuesta is not None:
+        return formatear_campos_respuesta(curso_destino, respuesta.explicacion_profunda, respuesta.parrafo_ejemplo)
+
+    # Si el escalado no está disponible, el texto libre del agente se muestra tal cual
+    ultimo = mensajes[-1] if mensajes else None
+    texto = ultimo.content.strip() if isinstance(ultimo, AIMessage) and isinstance(ultimo.content, str) else ""
+    if not texto:
+        return f"⚠️ El agente de {curso_destino} no devolvió contenido útil."
+    return f"✅ **Respuesta del Agente Especialista ({curso_destino}):**\n\n{texto}"
+
+
+def formatear_campos_respuesta(curso_destino: str, explicacion: str, ejemplo: str) -> str:
+    """Markdown final a partir de los dos campos del esquema (también sirve para respuestas parciales)."""
+    explicacion = explicacion.strip()
+    ejemplo = ejemplo.strip()
+
+    salida = f"✅ **Respuesta del Agente Especialista ({curso_destino}):**\n\n"
+    if explicacion:
+        salida += f"🧩 **Explicación:**\n{explicacion}\n\n"
+    if ejemplo:
+        salida += f"✏️ **Ejemplo:**\n{ejemplo}"
+    return salida
 
 
 ##if __name__ == "__main__":
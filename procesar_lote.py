@@ -0,0 +1,209 @@
+# =======================================================================
+# procesar_lote.py - Procesamiento por Lotes de Preguntas (JSONL)
+# =======================================================================
+# Entrada: un JSON por línea con "pregunta", "grado" y "curso" (opcionales:
+# "id" y "sesion_id"). Salida: un JSON por línea con la respuesta, el estado y
+# los tiempos de cada pregunta, escrito a medida que terminan. Si el proceso
+# se interrumpe, al relanzarlo con la misma salida se retoma donde quedó: solo
+# se saltan las preguntas con estado "ok"; las advertencias y los errores
+# (tiempo agotado, límite de la API) se vuelven a intentar y su nuevo resultado
+# se añade al final, así que para cada línea vale el último resultado escrito.
+#
+# Uso:
+#   python procesar_lote.py preguntas.jsonl respuestas.jsonl --concurrencia 8
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, Set, Tuple
+
+from main import aprecalentar, procesar_pregunta_async
+
+# ----------------------------------------------------
+# 1. LECTURA Y REANUDACIÓN
+# ----------------------------------------------------
+def leer_entrada(ruta: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(número de línea, item) de cada línea no vacía del JSONL de entrada."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                item = json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, {"_error_entrada": f"JSON inválido: {e}"}
+                continue
+            if not isinstance(item, dict):
+                yield numero, {"_error_entrada": f"Se esperaba un objeto JSON, no {type(item).__name__}"}
+                continue
+            yield numero, item
+
+
+def lineas_procesadas(ruta_salida: str) -> Set[int]:
+    """Líneas de entrada que ya tienen una respuesta correcta en la salida (para reanudar)."""
+    hechas: Set[int] = set()
+    if not os.path.exists(ruta_salida):
+        return hechas
+    with open(ruta_salida, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                resultado = json.loads(linea)
+                if resultado["estado"] == "ok":
+                    hechas.add(int(resultado["linea"]))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue  # última línea a medio escribir tras una caída
+    return hechas
+
+
+def _cerrar_linea_incompleta(ruta_salida: str):
+    """Si una caída dejó la última línea a medias, la termina para no pegarle el siguiente resultado."""
+    if not os.path.exists(ruta_salida) or os.path.getsize(ruta_salida) == 0:
+        return
+    with open(ruta_salida, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _estado(respuesta: str) -> str:
+    if respuesta.startswith("✅"):
+        return "ok"
+    if respuesta.startswith("⚠️"):
+        return "advertencia"
+    return "error"
+
+
+# ----------------------------------------------------
+# 2. PROCESAMIENTO CONCURRENTE
+# ----------------------------------------------------
+async def _procesar_item(numero: int, item: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """Siempre devuelve un resultado: un item defectuoso no debe detener el lote."""
+    inicio = time.perf_counter()
+    try:
+        return await _responder_item(numero, item, timeout, inicio)
+    except Exception as e:
+        return {
+            "linea": numero,
+            "respuesta": f"❌ Entrada no procesable: {type(e).__name__}: {e}",
+            "estado": "error",
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+
+
+async def _responder_item(numero: int, item: Dict[str, Any], timeout: float, inicio: float) -> Dict[str, Any]:
+    resultado = {
+        "linea": numero,
+        "id": item.get("id"),
+        "pregunta": item.get("pregunta"),
+        "grado": item.get("grado"),
+        "curso": item.get("curso"),
+    }
+    resultado["inicio"] = time.time()
+
+    if "_error_entrada" in item or not all(item.get(c) for c in ("pregunta", "grado", "curso")):
+        resultado["respuesta"] = item.get("_error_entrada", "Faltan 'pregunta', 'grado' o 'curso'.")
+        resultado["estado"] = "error"
+    else:
+        sesion_id = item.get("sesion_id") or f"lote_{numero}"
+        try:
+            respuesta = await asyncio.wait_for(
+                procesar_pregunta_async(item["pregunta"], item["grado"], item["curso"], sesion_id),
+                timeout=timeout,
+            )
+            resultado["respuesta"] = respuesta
+            resultado["estado"] = _estado(respuesta)
+        except asyncio.TimeoutError:
+            resultado["respuesta"] = f"❌ Tiempo agotado ({timeout:.0f}s)"
+            resultado["estado"] = "error"
+        except Exception as e:
+            resultado["respuesta"] = f"❌ {type(e).__name__}: {e}"
+            resultado["estado"] = "error"
+
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+async def procesar_lote(ruta_entrada: str, ruta_salida: str, concurrencia: int = 8, timeout: float = 180.0) -> Dict[str, Any]:
+    """Procesa el JSONL con `concurrencia` preguntas a la vez y escribe cada resultado al terminar."""
+    _cerrar_linea_incompleta(ruta_salida)
+    hechas = lineas_procesadas(ruta_salida)
+    if hechas:
+        print(f"↩️ Reanudando: {len(hechas)} preguntas ya procesadas en {ruta_salida}")
+
+    precalentado = asyncio.create_task(aprecalentar())
+    cola: asyncio.Queue = asyncio.Queue(maxsize=concurrencia * 2)
+    contadores = {"ok": 0, "advertencia": 0, "error": 0}
+    segundos_por_item = []
+    inicio = time.perf_counter()
+
+    with open(ruta_salida, "a", encoding="utf-8") as salida:
+
+        async def trabajador():
+            while True:
+                entrada = await cola.get()
+                if entrada is None:
+                    cola.task_done()
+                    return
+                resultado = await _procesar_item(*entrada, timeout=timeout)
+                salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                salida.flush()
+                contadores[resultado["estado"]] += 1
+                segundos_por_item.append(resultado["segundos"])
+                total = sum(contadores.values())
+                if total % 25 == 0:
+                    minutos = (time.perf_counter() - inicio) / 60
+                    print(f"   … {total} procesadas ({total / minutos:.1f} preguntas/min)")
+                cola.task_done()
+
+        trabajadores = [asyncio.create_task(trabajador()) for _ in range(concurrencia)]
+        for numero, item in leer_entrada(ruta_entrada):
+            if numero not in hechas:
+                await cola.put((numero, item))
+        for _ in trabajadores:
+            await cola.put(None)
+        await asyncio.gather(*trabajadores)
+    await precalentado
+
+    duracion = time.perf_counter() - inicio
+    procesadas = sum(contadores.values())
+    segundos_por_item.sort()
+    return {
+        **contadores,
+        "procesadas": procesadas,
+        "omitidas_por_reanudacion": len(hechas),
+        "duracion_s": round(duracion, 2),
+        "preguntas_por_minuto": round(procesadas / (duracion / 60), 2) if duracion > 0 else 0.0,
+        "mediana_item_s": segundos_por_item[len(segundos_por_item) // 2] if segundos_por_item else 0.0,
+    }
+
+
+# ----------------------------------------------------
+# 3. EJECUCIÓN
+# ----------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Responde en lote un JSONL de preguntas con EVA.")
+    parser.add_argument("entrada", help="JSONL con pregunta, grado y curso por línea")
+    parser.add_argument("salida", help="JSONL de resultados (se retoma si ya existe)")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=180.0, help="Segundos máximos por pregunta")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entrada):
+        print(f"🛑 No existe el archivo de entrada: {args.entrada}")
+        sys.exit(1)
+
+    print(f"📦 Procesando {args.entrada} → {args.salida} (concurrencia={args.concurrencia})")
+    resumen = asyncio.run(procesar_lote(args.entrada, args.salida, args.concurrencia, args.timeout))
+    print(
+        f"✅ Lote terminado: {resumen['procesadas']} preguntas en {resumen['duracion_s']}s "
+        f"→ {resumen['preguntas_por_minuto']} preguntas/min "
+        f"(ok={resumen['ok']}, advertencias={resumen['advertencia']}, errores={resumen['error']})"
+    )
+
+
+if __name__ == "__main__":
+    main()